@@ -0,0 +1,253 @@
+# core/api.py
+"""
+API JSON de solo lectura para integraciones (Solicitudes y estructura).
+
+    GET api/<recurso>/            lista paginada por cursor
+    GET api/<recurso>/<id>/       detalle
+
+Parámetros:
+- ?fields=id,titulo           solo esos campos (ver Recurso.campos)
+- ?limite=N                   filas por página (máximo API_MAX_POR_PAGINA)
+- ?cursor=...                 el 'siguiente' de la página anterior (keyset por id, sin OFFSET)
+- ?actualizado_desde=ISO8601  solo filas con updated >= esa fecha
+
+Cada respuesta lleva ETag y Last-Modified calculados desde la columna
+'updated'. En la lista salen de un solo agregado (máximo de updated y total
+de filas, que también detecta eliminaciones) y no se serializa nada si el
+cliente ya tiene la versión: If-None-Match / If-Modified-Since -> 304.
+"""
+import base64
+import calendar
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+
+from organization.models import Departamento
+from requests.listado import solicitudes_visibles
+from surveys.models import Encuesta
+from users.models import Cuadrilla
+
+API_POR_PAGINA = getattr(settings, 'API_POR_PAGINA', 50)
+API_MAX_POR_PAGINA = getattr(settings, 'API_MAX_POR_PAGINA', 200)
+
+
+class ErrorApi(Exception):
+    """ Parámetro inválido: se responde 400 con el mensaje. """
+
+
+class Recurso:
+    """
+    Modelo expuesto por la API. 'campos' es {nombre_en_json: atributo}; el
+    atributo puede ser un attname o una ruta 'relacion.campo' (la relación
+    se agrega a select_related solo si el campo se pide).
+    """
+
+    def __init__(self, nombre, queryset, campos, por_defecto=None):
+        self.nombre = nombre
+        self.queryset = queryset
+        self.campos = campos
+        self.por_defecto = por_defecto or list(campos)
+
+    def campos_pedidos(self, parametro):
+        if not parametro:
+            return self.por_defecto
+        pedidos = [campo.strip() for campo in parametro.split(',') if campo.strip()]
+        desconocidos = [campo for campo in pedidos if campo not in self.campos]
+        if desconocidos:
+            raise ErrorApi(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(self.campos)}.")
+        return pedidos
+
+    def relaciones(self, campos):
+        return sorted({self.campos[campo].rsplit('.', 1)[0].replace('.', '__') for campo in campos if '.' in self.campos[campo]})
+
+    def serializar(self, objeto, campos):
+        datos = {}
+        for campo in campos:
+            valor = objeto
+            for parte in self.campos[campo].split('.'):
+                valor = getattr(valor, parte) if valor is not None else None
+            datos[campo] = valor
+        return datos
+
+
+RECURSOS = {
+    recurso.nombre: recurso for recurso in [
+        Recurso(
+            'solicitudes',
+            lambda request: solicitudes_visibles(request.user, request.role.group_id),
+            {
+                'id': 'id_solicitud', 'titulo': 'titulo', 'descripcion': 'descripcion',
+                'ubicacion': 'ubicacion', 'latitud': 'latitud', 'longitud': 'longitud',
+                'prioridad': 'prioridad', 'estado': 'id_estado_id', 'estado_nombre': 'id_estado.nombre_estado',
+                'encuesta': 'id_encuesta_id', 'territorial': 'id_territorial_id', 'cuadrilla': 'id_cuadrilla_id',
+                'created': 'created', 'updated': 'updated',
+            },
+            por_defecto=['id', 'titulo', 'prioridad', 'estado', 'encuesta', 'cuadrilla', 'created', 'updated'],
+        ),
+        Recurso(
+            'encuestas',
+            lambda request: Encuesta.objects.filter(state='Activo'),
+            {
+                'id': 'id_encuesta', 'titulo': 'titulo', 'descripcion': 'descripcion',
+                'departamento': 'id_departamento_id', 'tipo': 'id_tipo_encuesta_id',
+                'tipo_nombre': 'id_tipo_encuesta.nombre_tipo', 'created': 'created', 'updated': 'updated',
+            },
+        ),
+        Recurso(
+            'departamentos',
+            lambda request: Departamento.objects.filter(state='Activo'),
+            {
+                'id': 'id_departamento', 'nombre': 'nombre_departamento', 'direccion': 'id_direccion_id',
+                'direccion_nombre': 'id_direccion.nombre_direccion', 'encargado': 'usuario_id',
+                'created': 'created', 'updated': 'updated',
+            },
+        ),
+        Recurso(
+            'cuadrillas',
+            lambda request: Cuadrilla.objects.filter(state='Activo'),
+            {
+                'id': 'id_cuadrilla', 'nombre': 'nombre_cuadrilla', 'departamento': 'departamento_id',
+                'jefe': 'jefe_id', 'created': 'created', 'updated': 'updated',
+            },
+        ),
+    ]
+}
+
+
+def _codificar_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorApi('Cursor inválido.')
+
+
+def _limite(parametro):
+    if not parametro:
+        return API_POR_PAGINA
+    try:
+        return max(1, min(int(parametro), API_MAX_POR_PAGINA))
+    except ValueError:
+        raise ErrorApi('limite debe ser un número.')
+
+
+def _etag(*partes):
+    return quote_etag(hashlib.md5(repr(partes).encode()).hexdigest())
+
+
+def _timestamp(momento):
+    return calendar.timegm(momento.utctimetuple()) if momento else None
+
+
+def _con_cabeceras(respuesta, etag, ultimo):
+    respuesta['ETag'] = etag
+    if ultimo:
+        respuesta['Last-Modified'] = http_date(ultimo)
+    # Integraciones: revalidar siempre (la respuesta 304 es barata)
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def _filtrar_lista(request, recurso):
+    campos = recurso.campos_pedidos(request.GET.get('fields'))
+    limite = _limite(request.GET.get('limite'))
+    queryset = recurso.queryset(request)
+    if request.GET.get('actualizado_desde'):
+        desde = parse_datetime(request.GET['actualizado_desde'])
+        if desde is None:
+            raise ErrorApi('actualizado_desde debe ser una fecha ISO 8601.')
+        queryset = queryset.filter(updated__gte=desde)
+    return campos, limite, queryset
+
+
+def _version_lista(request, recurso, campos, limite, resumen):
+    """ (etag, ultimo, respuesta 304 o None) a partir del agregado de la lista. """
+    ultimo = _timestamp(resumen['ultimo'])
+    cursor = request.GET.get('cursor') or ''
+    etag = _etag(recurso.nombre, resumen['ultimo'], resumen['total'], campos, limite, cursor, request.GET.get('actualizado_desde'))
+    return etag, ultimo, get_conditional_response(request, etag=etag, last_modified=ultimo)
+
+
+def _pagina(request, recurso, queryset, campos, limite):
+    pk = queryset.model._meta.pk.attname
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(**{f'{pk}__gt': _decodificar_cursor(cursor)})
+    relaciones = recurso.relaciones(campos)
+    if relaciones:
+        queryset = queryset.select_related(*relaciones)
+    return queryset.order_by(pk)[:limite + 1]
+
+
+def _respuesta_lista(recurso, filas, campos, limite, total, etag, ultimo):
+    siguiente = None
+    if len(filas) > limite:
+        siguiente = _codificar_cursor(filas[limite - 1].pk)
+    return _con_cabeceras(JsonResponse({
+        'resultados': [recurso.serializar(fila, campos) for fila in filas[:limite]],
+        'siguiente': siguiente,
+        'total': total,
+    }), etag, ultimo)
+
+
+def listar(request, recurso):
+    """ JsonResponse de la lista, o 304 si el cliente ya tiene esta versión. """
+    campos, limite, queryset = _filtrar_lista(request, recurso)
+    # Validación barata: un agregado sobre el conjunto filtrado, antes de paginar
+    resumen = queryset.aggregate(ultimo=Max('updated'), total=Count('pk'))
+    etag, ultimo, no_modificado = _version_lista(request, recurso, campos, limite, resumen)
+    if no_modificado is not None:
+        return no_modificado
+    filas = list(_pagina(request, recurso, queryset, campos, limite))
+    return _respuesta_lista(recurso, filas, campos, limite, resumen['total'], etag, ultimo)
+
+
+async def alistar(request, recurso):
+    """ Versión async de listar(). """
+    campos, limite, queryset = _filtrar_lista(request, recurso)
+    resumen = await queryset.aaggregate(ultimo=Max('updated'), total=Count('pk'))
+    etag, ultimo, no_modificado = _version_lista(request, recurso, campos, limite, resumen)
+    if no_modificado is not None:
+        return no_modificado
+    filas = [fila async for fila in _pagina(request, recurso, queryset, campos, limite)]
+    return _respuesta_lista(recurso, filas, campos, limite, resumen['total'], etag, ultimo)
+
+
+def _consulta_detalle(request, recurso, pk):
+    campos = recurso.campos_pedidos(request.GET.get('fields'))
+    queryset = recurso.queryset(request)
+    relaciones = recurso.relaciones(campos)
+    if relaciones:
+        queryset = queryset.select_related(*relaciones)
+    return campos, queryset.filter(pk=pk)
+
+
+def _respuesta_detalle(request, recurso, pk, objeto, campos):
+    if objeto is None:
+        return None
+    ultimo = _timestamp(objeto.updated)
+    etag = _etag(recurso.nombre, pk, objeto.updated, campos)
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=ultimo)
+    if no_modificado is not None:
+        return no_modificado
+    return _con_cabeceras(JsonResponse(recurso.serializar(objeto, campos)), etag, ultimo)
+
+
+def detalle(request, recurso, pk):
+    """ Respuesta del detalle (o 304); None si el objeto no existe o no es visible. """
+    campos, queryset = _consulta_detalle(request, recurso, pk)
+    return _respuesta_detalle(request, recurso, pk, queryset.first(), campos)
+
+
+async def adetalle(request, recurso, pk):
+    """ Versión async de detalle(). """
+    campos, queryset = _consulta_detalle(request, recurso, pk)
+    return _respuesta_detalle(request, recurso, pk, await queryset.afirst(), campos)
@@ -0,0 +1,88 @@
+# core/autocompletar.py
+"""
+Autocompletado de usuarios, cuadrillas, departamentos y encuestas.
+
+Los formularios ya no cargan todas las opciones en el <select>: el widget
+AutocompleteSelect (core/widgets.py) muestra solo el valor elegido y pide
+el resto a la vista 'autocompletar' a medida que se escribe.
+
+La búsqueda es por prefijo sobre columnas normalizadas (minúsculas, sin
+tildes) e indexadas, con un límite de resultados:
+
+- Cuadrilla.nombre_normalizado, Departamento.nombre_normalizado y
+  Encuesta.titulo_normalizado (ver core.texto.NormalizadoMixin).
+- UsuarioBusqueda.nombre / .username para los User (ver users/signals.py).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+
+from organization.models import Departamento
+from surveys.models import Encuesta
+from users.models import Cuadrilla
+from .contadores import obtener as obtener_contadores
+from .texto import normalizar
+
+AUTOCOMPLETAR_LIMITE = getattr(settings, 'AUTOCOMPLETAR_LIMITE', 20)
+# Mayor que cualquier carácter: campo < prefijo + _FIN_PREFIJO equivale a "empieza con prefijo"
+_FIN_PREFIJO = '\U0010ffff'
+
+
+def filtro_prefijo(campo, prefijo):
+    """ Q de "campo empieza con prefijo" que usa el índice del campo. """
+    if connection.vendor == 'sqlite':
+        # LIKE no usa el índice en SQLite: rango equivalente
+        return Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': prefijo + _FIN_PREFIJO})
+    # PostgreSQL crea un índice *_like (varchar_pattern_ops) para los CharField indexados
+    return Q(**{f'{campo}__startswith': prefijo})
+
+
+class Ambito:
+    """ Qué se busca (queryset base), en qué columnas normalizadas y cómo se muestra. """
+
+    def __init__(self, queryset, campos, etiquetas=None):
+        self.queryset = queryset
+        self.campos = campos
+        self.etiquetas = etiquetas or (lambda objetos: [str(objeto) for objeto in objetos])
+
+    def buscar(self, texto, limite=AUTOCOMPLETAR_LIMITE):
+        """ [{'id', 'texto'}] de los primeros 'limite' objetos cuyo nombre empieza con 'texto'. """
+        queryset = self.queryset()
+        prefijo = ' '.join(normalizar(texto).split())
+        if prefijo:
+            filtro = Q()
+            for campo in self.campos:
+                filtro |= filtro_prefijo(campo, prefijo)
+            queryset = queryset.filter(filtro)
+        objetos = list(queryset.order_by(self.campos[0], 'pk')[:limite])
+        return [{'id': objeto.pk, 'texto': texto} for objeto, texto in zip(objetos, self.etiquetas(objetos))]
+
+
+def _usuarios(grupo):
+    return lambda: User.objects.filter(is_active=True, profile__group__name=grupo)
+
+
+def _etiquetas_usuarios(usuarios):
+    return [usuario.get_full_name() or usuario.username for usuario in usuarios]
+
+
+def _etiquetas_cuadrillas(cuadrillas):
+    # Con su carga abierta, para elegir la cuadrilla con criterio
+    cargas = obtener_contadores('cuadrilla_abiertas', [cuadrilla.pk for cuadrilla in cuadrillas])
+    return [f'{cuadrilla} - {cargas.get(cuadrilla.pk, 0)} abiertas' for cuadrilla in cuadrillas]
+
+
+_CAMPOS_USUARIO = ('nombre_busqueda__nombre', 'nombre_busqueda__username')
+
+AMBITOS = {
+    'territoriales': Ambito(_usuarios('Territorial'), _CAMPOS_USUARIO, _etiquetas_usuarios),
+    'jefes_cuadrilla': Ambito(_usuarios('Cuadrilla'), _CAMPOS_USUARIO, _etiquetas_usuarios),
+    'encargados_departamento': Ambito(_usuarios('Departamento'), _CAMPOS_USUARIO, _etiquetas_usuarios),
+    'cuadrillas': Ambito(
+        lambda: Cuadrilla.objects.filter(state='Activo').select_related('departamento'),
+        ('nombre_normalizado',), _etiquetas_cuadrillas,
+    ),
+    'departamentos': Ambito(lambda: Departamento.objects.filter(state='Activo'), ('nombre_normalizado',)),
+    'encuestas': Ambito(lambda: Encuesta.objects.filter(state='Activo'), ('titulo_normalizado',)),
+}
@@ -0,0 +1,161 @@
+# core/benchmark.py
+"""
+Benchmark de vistas: recorre los listados, detalles y dashboards con el
+cliente de pruebas de Django (middleware, vista y plantilla completos) y
+mide por cada caso el tiempo de respuesta, la cantidad de consultas SQL y
+el tiempo pasado en la base de datos.
+
+Las consultas se miden con connection.execute_wrapper, así que no hace
+falta DEBUG=True. El resultado se puede guardar en JSON para comparar
+entre commits (ver el comando 'benchmark_vistas').
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from registration.models import Profile
+from requests.models import Respuesta, Solicitud
+from .roles import GRUPO_ADMIN, GRUPO_CUADRILLA, GRUPO_TERRITORIAL
+
+
+class MedidorSQL:
+    """ Cuenta las consultas ejecutadas dentro del 'with' y suma su duración. """
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+    def __enter__(self):
+        self._contexto = connection.execute_wrapper(self)
+        self._contexto.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._contexto.__exit__(*exc)
+
+
+class Caso:
+    """ Una vista a medir: el rol con el que se entra y su URL (None si no hay datos de muestra). """
+
+    def __init__(self, nombre, rol, url):
+        self.nombre = nombre
+        self.rol = rol
+        self.url = url
+
+
+CASOS = [
+    Caso('main_admin', GRUPO_ADMIN, lambda muestra: reverse('main_admin')),
+    Caso('main_requests_admin', GRUPO_ADMIN, lambda muestra: reverse('main_requests')),
+    Caso('main_requests_filtrado', GRUPO_ADMIN, lambda muestra: reverse('main_requests') + '?prioridad=alta&orden=antiguo'),
+    Caso('main_requests_territorial', GRUPO_TERRITORIAL, lambda muestra: reverse('main_requests')),
+    Caso('main_requests_cuadrilla', GRUPO_CUADRILLA, lambda muestra: reverse('main_requests')),
+    Caso('solicitud_ver', GRUPO_ADMIN,
+         lambda muestra: reverse('solicitud_ver', args=[muestra['solicitud']]) if muestra['solicitud'] else None),
+    Caso('solicitud_buscar', GRUPO_ADMIN, lambda muestra: reverse('solicitud_buscar') + '?q=bache'),
+    Caso('solicitud_reporte_sla', GRUPO_ADMIN, lambda muestra: reverse('solicitud_reporte_sla')),
+    Caso('user_list', GRUPO_ADMIN, lambda muestra: reverse('user_list')),
+    Caso('cuadrilla_list', GRUPO_ADMIN, lambda muestra: reverse('cuadrilla_list')),
+    Caso('api_solicitudes', GRUPO_ADMIN, lambda muestra: reverse('api_lista', args=['solicitudes'])),
+]
+
+
+def datos_de_muestra():
+    """ Usuario de cada rol (con solicitudes propias o asignadas) y una solicitud con respuestas. """
+    muestra = {}
+    admin = Profile.objects.filter(group_id=GRUPO_ADMIN, user__is_active=True).values_list('user_id', flat=True).first()
+    if admin is not None:
+        muestra[GRUPO_ADMIN] = admin
+    ultima = Solicitud.objects.filter(state='Activo').order_by('-pk').values('id_territorial').first()
+    if ultima is not None:
+        muestra[GRUPO_TERRITORIAL] = ultima['id_territorial']
+    asignada = (Solicitud.objects.filter(state='Activo', id_cuadrilla__isnull=False)
+                .order_by('-pk').values('id_cuadrilla__jefe').first())
+    if asignada is not None:
+        muestra[GRUPO_CUADRILLA] = asignada['id_cuadrilla__jefe']
+    respondida = Respuesta.objects.filter(id_solicitud__state='Activo').order_by('-pk').values('id_solicitud').first()
+    muestra['solicitud'] = respondida['id_solicitud'] if respondida else None
+    return muestra
+
+
+def _host():
+    """ Host aceptado por ALLOWED_HOSTS (sin setup_test_environment, que instrumenta las plantillas). """
+    hosts = settings.ALLOWED_HOSTS
+    if not hosts or '*' in hosts or 'testserver' in hosts:
+        return 'localhost' if not hosts else 'testserver'
+    return hosts[0].lstrip('.')
+
+
+def _percentil(valores, porcentaje):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(porcentaje / 100 * (len(ordenados) - 1))))]
+
+
+def medir(cliente, url, repeticiones=5, calentamiento=1):
+    """ Mediana, p95 y mínimo del tiempo total; consultas y tiempo SQL de la última repetición medida. """
+    for _ in range(calentamiento):
+        cliente.get(url)
+    tiempos, tiempos_sql = [], []
+    for _ in range(repeticiones):
+        with MedidorSQL() as medidor:
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url)
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos_sql.append(medidor.segundos)
+    return {
+        'url': url,
+        'status': respuesta.status_code,
+        'ms_mediana': round(statistics.median(tiempos) * 1000, 2),
+        'ms_p95': round(_percentil(tiempos, 95) * 1000, 2),
+        'ms_min': round(min(tiempos) * 1000, 2),
+        'consultas': medidor.consultas,
+        'sql_ms_mediana': round(statistics.median(tiempos_sql) * 1000, 2),
+    }
+
+
+def ejecutar(casos=None, repeticiones=5, calentamiento=1):
+    """ {nombre_caso: resultado de medir()}; los casos sin datos para su rol se omiten con 'omitido'. """
+    muestra = datos_de_muestra()
+    clientes = {}
+    resultados = {}
+    for caso in casos or CASOS:
+        if caso.rol not in muestra:
+            resultados[caso.nombre] = {'omitido': 'No hay un usuario con este rol.'}
+            continue
+        url = caso.url(muestra)
+        if url is None:
+            resultados[caso.nombre] = {'omitido': 'Sin datos de muestra.'}
+            continue
+        if caso.rol not in clientes:
+            clientes[caso.rol] = Client(HTTP_HOST=_host())
+            clientes[caso.rol].force_login(User.objects.get(pk=muestra[caso.rol]))
+        resultados[caso.nombre] = medir(clientes[caso.rol], url, repeticiones, calentamiento)
+    return resultados
+
+
+def comparar(anterior, actual):
+    """ [(caso, métrica, antes, ahora, variación %)] de los casos presentes en ambos resultados. """
+    filas = []
+    for nombre, resultado in actual.items():
+        previo = anterior.get(nombre)
+        if not previo or 'omitido' in previo or 'omitido' in resultado:
+            continue
+        for metrica in ('ms_mediana', 'consultas', 'sql_ms_mediana'):
+            antes, ahora = previo.get(metrica), resultado.get(metrica)
+            if antes is None or ahora is None:
+                continue
+            variacion = (ahora - antes) / antes * 100 if antes else 0.0
+            filas.append((nombre, metrica, antes, ahora, round(variacion, 1)))
+    return filas
@@ -0,0 +1,179 @@
+# core/contadores.py
+"""
+Contadores precalculados (modelo core.Contador).
+
+- cuadrilla_abiertas / departamento_abiertas: Solicitudes abiertas (state
+  'Activo' y estado no cerrado) por cuadrilla y por departamento de la encuesta.
+- estado_solicitudes: todas las Solicitudes por EstadoSolicitud (dashboard),
+  incluidas las archivadas (requests/archivo.py).
+- departamento_cuadrillas / direccion_departamentos: listados de organización.
+
+Las señales de core/signals.py aplican los cambios con UPDATE ... valor = valor
++ delta (F()), de modo que dos procesos no se pisan. Las acciones masivas que
+usan update() llaman a aplicar_actualizacion() en su transacción. El comando
+'reconstruir_contadores' recalcula todo desde cero o, con --verificar, solo
+informa las diferencias.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Contador
+
+# Nombres de EstadoSolicitud que cuentan como cerrados (no abiertas)
+ESTADOS_CERRADOS = getattr(
+    settings, 'CONTADORES_ESTADOS_CERRADOS', ['Finalizada', 'Resuelta', 'Validada', 'Rechazada']
+)
+
+# Columnas de Solicitud que determinan sus aportes (en este orden)
+CAMPOS_FILA = ('state', 'id_estado_id', 'id_cuadrilla_id', 'id_encuesta__id_departamento')
+
+
+def _modelos(get_model=None):
+    if get_model is None:
+        from django.apps import apps
+        get_model = apps.get_model
+    return (
+        get_model('requests', 'Solicitud'),
+        get_model('requests', 'EstadoSolicitud'),
+        get_model('users', 'Cuadrilla'),
+        get_model('organization', 'Departamento'),
+    )
+
+
+def estados_cerrados():
+    _, EstadoSolicitud, _, _ = _modelos()
+    return set(EstadoSolicitud.objects.filter(nombre_estado__in=ESTADOS_CERRADOS).values_list('pk', flat=True))
+
+
+def aportes(fila, cerrados):
+    """ Contadores a los que suma 1 una Solicitud con fila = (state, estado, cuadrilla, departamento). """
+    state, estado_id, cuadrilla_id, departamento_id = fila
+    claves = [('estado_solicitudes', estado_id)]
+    if state == 'Activo' and estado_id not in cerrados:
+        if cuadrilla_id is not None:
+            claves.append(('cuadrilla_abiertas', cuadrilla_id))
+        if departamento_id is not None:
+            claves.append(('departamento_abiertas', departamento_id))
+    return claves
+
+
+def diferencias(antes, despues, cerrados):
+    """ Deltas por (ámbito, clave) entre dos listas de filas. """
+    deltas = Counter()
+    for fila in antes:
+        for clave in aportes(fila, cerrados):
+            deltas[clave] -= 1
+    for fila in despues:
+        for clave in aportes(fila, cerrados):
+            deltas[clave] += 1
+    return deltas
+
+
+def sumar(ambito, clave, delta):
+    """ valor += delta de forma atómica, creando el contador si no existe. """
+    if not delta:
+        return
+    if Contador.objects.filter(ambito=ambito, clave=clave).update(valor=F('valor') + delta):
+        return
+    if delta < 0:
+        # Restar de un contador inexistente: su objeto ya se eliminó (borrado en cascada)
+        return
+    try:
+        with transaction.atomic():
+            Contador.objects.create(ambito=ambito, clave=clave, valor=delta)
+    except IntegrityError:
+        # Otro proceso lo creó entre el UPDATE y el INSERT
+        Contador.objects.filter(ambito=ambito, clave=clave).update(valor=F('valor') + delta)
+
+
+def aplicar(deltas):
+    for (ambito, clave), delta in deltas.items():
+        sumar(ambito, clave, delta)
+
+
+def aplicar_actualizacion(filas, attname, valor, cerrados=None):
+    """
+    Ajusta los contadores tras un update() masivo de una columna de Solicitud.
+    'filas' son las tuplas CAMPOS_FILA leídas antes del UPDATE.
+    """
+    indice = CAMPOS_FILA.index(attname)
+    despues = [fila[:indice] + (valor,) + fila[indice + 1:] for fila in filas]
+    aplicar(diferencias(filas, despues, estados_cerrados() if cerrados is None else cerrados))
+
+
+def eliminar(ambito, clave):
+    Contador.objects.filter(ambito=ambito, clave=clave).delete()
+
+
+def obtener(ambito, claves=None):
+    """ {clave: valor} de un ámbito (las claves sin fila valen 0). """
+    contadores = Contador.objects.filter(ambito=ambito)
+    if claves is not None:
+        contadores = contadores.filter(clave__in=claves)
+    return dict(contadores.values_list('clave', 'valor'))
+
+
+async def aobtener(ambito, claves=None):
+    """ Versión async de obtener(). """
+    contadores = Contador.objects.filter(ambito=ambito)
+    if claves is not None:
+        contadores = contadores.filter(clave__in=claves)
+    return {clave: valor async for clave, valor in contadores.values_list('clave', 'valor')}
+
+
+def calcular(get_model=None):
+    """ Valores correctos de todos los contadores, calculados desde las tablas. """
+    if get_model is None:
+        from django.apps import apps
+        get_model = apps.get_model
+    Solicitud, EstadoSolicitud, Cuadrilla, Departamento = _modelos(get_model)
+    valores = {}
+
+    def agregar(ambito, filas):
+        for clave, total in filas:
+            if clave is not None and total:
+                valores[(ambito, clave)] = total
+
+    por_estado = Counter(dict(Solicitud.objects.values_list('id_estado').annotate(n=Count('pk')).order_by()))
+    try:
+        # Las archivadas siguen contando por estado (ver requests/archivo.py)
+        SolicitudArchivada = get_model('requests', 'SolicitudArchivada')
+    except LookupError:
+        pass  # Estado histórico de las migraciones anterior al archivo
+    else:
+        por_estado.update(dict(SolicitudArchivada.objects.values_list('id_estado').annotate(n=Count('pk')).order_by()))
+    agregar('estado_solicitudes', por_estado.items())
+    abiertas = Solicitud.objects.filter(state='Activo').exclude(id_estado__nombre_estado__in=ESTADOS_CERRADOS)
+    agregar('cuadrilla_abiertas', abiertas.values_list('id_cuadrilla').annotate(n=Count('pk')).order_by())
+    agregar('departamento_abiertas', abiertas.values_list('id_encuesta__id_departamento').annotate(n=Count('pk')).order_by())
+    agregar('departamento_cuadrillas', Cuadrilla.objects.values_list('departamento').annotate(n=Count('pk')).order_by())
+    agregar('direccion_departamentos', Departamento.objects.values_list('id_direccion').annotate(n=Count('pk')).order_by())
+    return valores
+
+
+def verificar():
+    """ Lista de (ámbito, clave, esperado, actual) para los contadores desalineados. """
+    esperados = calcular()
+    actuales = {(ambito, clave): valor for ambito, clave, valor in Contador.objects.values_list('ambito', 'clave', 'valor')}
+    diferentes = []
+    for clave in sorted(set(esperados) | set(actuales)):
+        esperado, actual = esperados.get(clave, 0), actuales.get(clave, 0)
+        if esperado != actual:
+            diferentes.append((*clave, esperado, actual))
+    return diferentes
+
+
+def reconstruir(get_model=None):
+    """ Reemplaza todos los contadores por los valores calculados. """
+    ContadorModelo = get_model('core', 'Contador') if get_model else Contador
+    valores = calcular(get_model)
+    with transaction.atomic():
+        ContadorModelo.objects.all().delete()
+        ContadorModelo.objects.bulk_create(
+            [ContadorModelo(ambito=ambito, clave=clave, valor=valor) for (ambito, clave), valor in valores.items()],
+            batch_size=1000,
+        )
+    return len(valores)
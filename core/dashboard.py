@@ -0,0 +1,97 @@
+# core/dashboard.py
+"""
+Resumen del dashboard de administración (main_admin).
+
+Los contadores por estado se leen de core.Contador (ver core/contadores.py)
+y el resultado completo se guarda en la caché de Django por unos segundos.
+Las señales de core/signals.py invalidan la caché cuando cambia una
+Solicitud o un User.
+
+aobtener_resumen() es la versión para la vista async: las consultas
+independientes se lanzan juntas con asyncio.gather, así el worker sigue
+atendiendo otros requests mientras la base de datos responde.
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from requests.models import Solicitud, EstadoSolicitud
+from .contadores import aobtener as aobtener_contadores, obtener as obtener_contadores
+
+CLAVE_CACHE_DASHBOARD = 'core:dashboard:resumen'
+DASHBOARD_CACHE_SEGUNDOS = getattr(settings, 'DASHBOARD_CACHE_SEGUNDOS', 60)
+
+# Tarjeta del dashboard -> nombres de EstadoSolicitud que agrupa
+GRUPOS_ESTADO = {
+    'incidencias_creadas': ['Abierta', 'Creada'],
+    'incidencias_derivadas': ['Derivada'],
+    'incidencias_rechazadas': ['Rechazada'],
+    'incidencias_finalizadas': ['Finalizada', 'Resuelta', 'Validada'],
+}
+
+
+def _recientes():
+    # Últimas incidencias creadas (máximo 5) con las relaciones que muestra el template
+    return Solicitud.objects.select_related('id_estado', 'id_encuesta__id_departamento').order_by('-created')[:5]
+
+
+def _armar_resumen(por_estado, estado_por_nombre, total_usuarios, incidencias_recientes):
+    resumen = {
+        'total_usuarios': total_usuarios,
+        'incidencias_recientes': incidencias_recientes,
+    }
+    resumen.update({
+        tarjeta: sum(por_estado.get(estado_por_nombre.get(nombre), 0) for nombre in nombres)
+        for tarjeta, nombres in GRUPOS_ESTADO.items()
+    })
+    return resumen
+
+
+def calcular_resumen():
+    """ Calcula el resumen sin pasar por la caché. """
+    # Tarjetas de estado desde los contadores precalculados (sin recorrer Solicitud)
+    return _armar_resumen(
+        obtener_contadores('estado_solicitudes'),
+        dict(EstadoSolicitud.objects.values_list('nombre_estado', 'id_estado')),
+        User.objects.count(),
+        list(_recientes()),
+    )
+
+
+async def _alista(queryset):
+    return [fila async for fila in queryset]
+
+
+async def acalcular_resumen():
+    """ Versión async de calcular_resumen(): las cuatro consultas son independientes. """
+    por_estado, estados, total_usuarios, recientes = await asyncio.gather(
+        aobtener_contadores('estado_solicitudes'),
+        _alista(EstadoSolicitud.objects.values_list('nombre_estado', 'id_estado')),
+        User.objects.acount(),
+        _alista(_recientes()),
+    )
+    return _armar_resumen(por_estado, dict(estados), total_usuarios, recientes)
+
+
+def obtener_resumen():
+    """ Devuelve el resumen desde la caché, calculándolo si expiró o fue invalidado. """
+    resumen = cache.get(CLAVE_CACHE_DASHBOARD)
+    if resumen is None:
+        resumen = calcular_resumen()
+        cache.set(CLAVE_CACHE_DASHBOARD, resumen, DASHBOARD_CACHE_SEGUNDOS)
+    return resumen
+
+
+async def aobtener_resumen():
+    """ Versión async de obtener_resumen(). """
+    resumen = await cache.aget(CLAVE_CACHE_DASHBOARD)
+    if resumen is None:
+        resumen = await acalcular_resumen()
+        await cache.aset(CLAVE_CACHE_DASHBOARD, resumen, DASHBOARD_CACHE_SEGUNDOS)
+    return resumen
+
+
+def invalidar_resumen():
+    cache.delete(CLAVE_CACHE_DASHBOARD)
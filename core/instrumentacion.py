@@ -0,0 +1,129 @@
+# core/instrumentacion.py
+"""
+Instrumentación SQL por vista y detector de N+1.
+
+Con SQL_INSTRUMENTACION = True, InstrumentacionSQLMiddleware (core/middleware.py)
+registra en cada request, mediante connection.execute_wrapper:
+
+- la cantidad de consultas y el tiempo total en la base de datos;
+- la "forma" de cada consulta: el SQL con los literales y las listas IN
+  reemplazados por '?', de modo que el mismo SELECT con otro id cuente como
+  la misma forma.
+
+Una forma que se repite SQL_N1_UMBRAL veces o más en un request es casi
+siempre un N+1 (por ejemplo, {{ solicitud.id_estado }} en un for sin
+select_related). Se registra en el logger 'core.sql' con el nombre de la
+URL y se cuenta en el resumen por vista.
+
+El resumen guarda los últimos SQL_RESUMEN_VENTANA requests de cada vista en
+memoria del proceso (cada worker tiene el suyo) y lo muestra la vista
+'sql_resumen' a los administradores.
+"""
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+
+logger = logging.getLogger('core.sql')
+
+SQL_INSTRUMENTACION = getattr(settings, 'SQL_INSTRUMENTACION', False)
+SQL_N1_UMBRAL = getattr(settings, 'SQL_N1_UMBRAL', 5)
+SQL_RESUMEN_VENTANA = getattr(settings, 'SQL_RESUMEN_VENTANA', 200)
+
+_LISTA_IN = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\d+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r'(?<![\w".])-?\d+(?:\.\d+)?\b')
+_PARAMETRO = re.compile(r'%s|\?')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def forma_consulta(sql):
+    """ SQL sin valores concretos: 'SELECT ... WHERE id = 3' y '... id = 7' tienen la misma forma. """
+    forma = _LISTA_IN.sub('IN (...)', sql)
+    forma = _TEXTO.sub('?', forma)
+    forma = _NUMERO.sub('?', forma)
+    forma = _PARAMETRO.sub('?', forma)
+    return _ESPACIOS.sub(' ', forma).strip()
+
+
+class RegistroConsultas:
+    """ execute_wrapper que acumula consultas, tiempo y formas de un request. """
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.formas[forma_consulta(sql)] += 1
+
+    def repetidas(self, umbral=SQL_N1_UMBRAL):
+        """ [(forma, veces)] de las formas que alcanzan el umbral de N+1, de más a menos repetidas. """
+        return [(forma, veces) for forma, veces in self.formas.most_common() if veces >= umbral]
+
+
+class ResumenVista:
+    """ Últimos requests de una vista y las formas N+1 detectadas en ellos. """
+
+    def __init__(self, ventana):
+        self.requests = deque(maxlen=ventana)
+        self.formas_n1 = Counter()
+
+    def fila(self, vista):
+        consultas = [r[0] for r in self.requests]
+        sql_ms = [r[1] for r in self.requests]
+        total_ms = sorted(r[2] for r in self.requests)
+        forma, veces = self.formas_n1.most_common(1)[0] if self.formas_n1 else (None, 0)
+        return {
+            'vista': vista,
+            'requests': len(self.requests),
+            'consultas_promedio': round(statistics.mean(consultas), 1),
+            'consultas_max': max(consultas),
+            'sql_ms_promedio': round(statistics.mean(sql_ms), 1),
+            'ms_promedio': round(statistics.mean(total_ms), 1),
+            'ms_p95': round(total_ms[min(len(total_ms) - 1, int(0.95 * len(total_ms)))], 1),
+            'requests_n1': sum(1 for r in self.requests if r[3]),
+            'forma_n1': forma,
+            'forma_n1_veces': veces,
+        }
+
+
+_resumen = {}
+_bloqueo = threading.Lock()
+
+
+def registrar_request(vista, registro, segundos_total):
+    """ Agrega el request al resumen de la vista y registra en el log las formas N+1. """
+    repetidas = registro.repetidas()
+    for forma, veces in repetidas:
+        logger.warning('Posible N+1 en %s: %d consultas con la forma %s', vista, veces, forma)
+    with _bloqueo:
+        resumen = _resumen.get(vista)
+        if resumen is None:
+            resumen = _resumen[vista] = ResumenVista(SQL_RESUMEN_VENTANA)
+        resumen.requests.append((registro.consultas, registro.segundos * 1000, segundos_total * 1000, bool(repetidas)))
+        for forma, veces in repetidas:
+            resumen.formas_n1[forma] += 1
+    return repetidas
+
+
+def resumen_vistas():
+    """ Una fila por vista, primero las que tienen N+1 y luego por consultas promedio. """
+    with _bloqueo:
+        filas = [resumen.fila(vista) for vista, resumen in _resumen.items() if resumen.requests]
+    return sorted(filas, key=lambda fila: (-fila['requests_n1'], -fila['consultas_promedio']))
+
+
+def reiniciar_resumen():
+    with _bloqueo:
+        _resumen.clear()
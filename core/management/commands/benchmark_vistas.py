@@ -0,0 +1,83 @@
+# core/management/commands/benchmark_vistas.py
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo, consultas SQL y tiempo SQL de las vistas principales (ver core/benchmark.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Mediciones por vista.')
+        parser.add_argument('--calentamiento', type=int, default=1, help='Requests sin medir antes de cada vista.')
+        parser.add_argument('--casos', nargs='+', metavar='CASO',
+                            help=f"Solo estas vistas: {', '.join(caso.nombre for caso in benchmark.CASOS)}.")
+        parser.add_argument('--json', metavar='ARCHIVO', help='Guarda el resultado en JSON (- para la salida estándar).')
+        parser.add_argument('--comparar', metavar='ARCHIVO', help='JSON de una ejecución anterior para mostrar la variación.')
+        parser.add_argument('--etiqueta', help='Nombre de la ejecución (por defecto, el commit actual de git).')
+
+    def handle(self, *args, **options):
+        casos = benchmark.CASOS
+        if options['casos']:
+            por_nombre = {caso.nombre: caso for caso in benchmark.CASOS}
+            desconocidos = [nombre for nombre in options['casos'] if nombre not in por_nombre]
+            if desconocidos:
+                raise CommandError(f"Casos desconocidos: {', '.join(desconocidos)}.")
+            casos = [por_nombre[nombre] for nombre in options['casos']]
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {error}')
+
+        resultados = benchmark.ejecutar(casos, options['repeticiones'], options['calentamiento'])
+        informe = {
+            'etiqueta': options['etiqueta'] or self.commit_actual(),
+            'fecha': timezone.now().isoformat(),
+            'repeticiones': options['repeticiones'],
+            'resultados': resultados,
+        }
+
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(informe, indent=2, ensure_ascii=False))
+            return
+        self.mostrar(resultados)
+        if anterior is not None:
+            self.mostrar_comparacion(anterior, resultados)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultado guardado en {options['json']}.")
+
+    def commit_actual(self):
+        try:
+            salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return salida.stdout.strip()
+
+    def mostrar(self, resultados):
+        self.stdout.write(f"{'vista':<28}{'status':>7}{'ms (mediana)':>14}{'ms (p95)':>10}{'consultas':>11}{'ms SQL':>9}")
+        for nombre, resultado in resultados.items():
+            if 'omitido' in resultado:
+                self.stdout.write(f"{nombre:<28}  omitido: {resultado['omitido']}")
+                continue
+            self.stdout.write(
+                f"{nombre:<28}{resultado['status']:>7}{resultado['ms_mediana']:>14.1f}{resultado['ms_p95']:>10.1f}"
+                f"{resultado['consultas']:>11}{resultado['sql_ms_mediana']:>9.1f}"
+            )
+
+    def mostrar_comparacion(self, anterior, resultados):
+        etiqueta = anterior.get('etiqueta') or 'anterior'
+        self.stdout.write(f'\nComparación con {etiqueta}:')
+        for nombre, metrica, antes, ahora, variacion in benchmark.comparar(anterior.get('resultados', {}), resultados):
+            linea = f'{nombre:<28}{metrica:<16}{antes:>10}{ahora:>10}{variacion:>+9.1f}%'
+            # Más consultas o más de un 10% de tiempo: posible regresión
+            regresion = ahora > antes if metrica == 'consultas' else variacion > 10
+            self.stdout.write(self.style.WARNING(linea) if regresion else linea)
@@ -0,0 +1,286 @@
+# core/management/commands/generar_datos.py
+"""
+Genera un conjunto de datos sintético y realista para medir rendimiento
+(ver el comando 'benchmark_vistas').
+
+Todo se inserta con bulk_create por lotes, sin pasar por save() ni señales,
+así que el comando completa a mano lo que harían ellas: columnas
+normalizadas, UsuarioBusqueda, celda geohash, documento de búsqueda, firmas
+de duplicados, historial inicial y, al final, los contadores precalculados.
+
+    python manage.py generar_datos                 # 1M solicitudes, 5M respuestas, 10k usuarios
+    python manage.py generar_datos --escala 0.01   # 10k solicitudes, 50k respuestas, 100 usuarios
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import contadores
+from core.dashboard import invalidar_resumen
+from core.roles import GRUPO_ADMIN, GRUPO_CUADRILLA, GRUPO_TERRITORIAL
+from core.texto import normalizar
+from organization.models import Direccion, Departamento
+from registration.models import Profile
+from requests.duplicados import claves_solicitud, firma_texto
+from requests.geo import codificar_geohash
+from requests.models import (
+    EstadoSolicitud, Respuesta, Solicitud, SolicitudBusqueda, SolicitudEvento, SolicitudFirma, SolicitudTiempoEstado,
+)
+from surveys.models import Encuesta, Pregunta, TipoEncuesta
+from users.models import Cuadrilla, UsuarioBusqueda
+
+GRUPO_DIRECCION, GRUPO_DEPARTAMENTO = 2, 3
+GRUPOS = {GRUPO_ADMIN: 'Admin', GRUPO_DIRECCION: 'Direccion', GRUPO_DEPARTAMENTO: 'Departamento',
+          GRUPO_TERRITORIAL: 'Territorial', GRUPO_CUADRILLA: 'Cuadrilla'}
+
+# Estado inicial -> peso en la distribución
+ESTADOS = {'Creada': 30, 'En Proceso': 25, 'Derivada': 10, 'Finalizada': 20, 'Validada': 10, 'Rechazada': 5}
+PRIORIDADES = {'normal': 60, 'alta': 20, 'baja': 20}
+
+NOMBRES = ['Ana', 'José', 'María', 'Luis', 'Camila', 'Pedro', 'Sofía', 'Tomás', 'Valentina', 'Matías', 'Ignacia', 'Joaquín']
+APELLIDOS = ['Pérez', 'González', 'Muñoz', 'Rojas', 'Díaz', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda', 'Núñez']
+DIRECCIONES = ['Obras', 'Aseo y Ornato', 'Tránsito', 'Medio Ambiente', 'Seguridad', 'Desarrollo Comunitario', 'Operaciones']
+AREAS = ['Vialidad', 'Áreas Verdes', 'Alumbrado', 'Señalética', 'Residuos', 'Arbolado', 'Pavimentos', 'Plazas', 'Fiscalización']
+PROBLEMAS = ['Bache', 'Luminaria apagada', 'Microbasural', 'Árbol caído', 'Semáforo en falla', 'Vereda rota',
+             'Grafiti', 'Señal dañada', 'Fuga de agua', 'Ramas sobre cables', 'Auto abandonado', 'Tapa de cámara suelta']
+LUGARES = ['frente al colegio', 'en la esquina', 'junto a la plaza', 'afuera del consultorio', 'en el pasaje',
+           'cerca del paradero', 'a la salida del metro', 'en la ciclovía', 'frente a la feria']
+DETALLES = ['Es peligroso para los peatones.', 'Lleva más de una semana así.', 'Los vecinos ya reclamaron antes.',
+            'Hay niños que pasan todos los días.', 'De noche no se ve nada.', 'Se acumula agua cuando llueve.',
+            'Un vecino casi se cae.', 'Bloquea el paso de autos.']
+CALLES = ['Av. Matta', 'Los Aromos', 'Gran Avenida', 'Pasaje 3', 'Santa Rosa', 'Av. Central', 'Las Acacias', 'El Roble']
+RESPUESTAS = ['Sí', 'No', 'Se revisó en terreno.', 'Falta material para repararlo.', 'Se derivó a la empresa contratista.',
+              'Reparado parcialmente.', 'El vecino no estaba.', 'Se tomaron fotos del daño.']
+
+# Coordenadas alrededor del centro de Santiago
+CENTRO = (-33.45, -70.65)
+
+
+def _elegir(azar, pesos):
+    return azar.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos (organización, usuarios, encuestas, solicitudes y respuestas) para medir rendimiento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help='Multiplica las cantidades por defecto (p. ej. 0.01 para una prueba rápida).')
+        parser.add_argument('--solicitudes', type=int, help='Solicitudes a generar (por defecto 1.000.000 × escala).')
+        parser.add_argument('--respuestas-por-solicitud', type=int, default=5)
+        parser.add_argument('--usuarios', type=int, help='Usuarios a generar (por defecto 10.000 × escala).')
+        parser.add_argument('--direcciones', type=int, default=len(DIRECCIONES))
+        parser.add_argument('--departamentos', type=int, help='Departamentos en total (por defecto 100 × escala, mínimo 1 por dirección).')
+        parser.add_argument('--cuadrillas', type=int, help='Cuadrillas en total (por defecto 500 × escala, mínimo 1 por departamento).')
+        parser.add_argument('--encuestas-por-departamento', type=int, default=3)
+        parser.add_argument('--preguntas-por-encuesta', type=int, default=5)
+        parser.add_argument('--dias', type=int, default=365, help='Las solicitudes se reparten en los últimos N días.')
+        parser.add_argument('--lote', type=int, default=5000, help='Solicitudes por transacción.')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla del generador (mismos datos con la misma semilla).')
+        parser.add_argument('--password', default='benchmark', help='Contraseña de todos los usuarios generados.')
+        parser.add_argument('--sin-firmas', action='store_true', help='No calcula las firmas de duplicados (más rápido).')
+
+    def handle(self, *args, **options):
+        escala = options['escala']
+        self.azar = random.Random(options['semilla'])
+        n_solicitudes = options['solicitudes'] if options['solicitudes'] is not None else int(1_000_000 * escala)
+        n_direcciones = max(options['direcciones'], 1)
+        n_departamentos = max(options['departamentos'] or int(100 * escala), n_direcciones)
+        n_cuadrillas = max(options['cuadrillas'] or int(500 * escala), n_departamentos)
+        # Cada dirección, departamento y cuadrilla necesita su usuario responsable, más un admin y un territorial
+        necesarios = n_direcciones + n_departamentos + n_cuadrillas + 2
+        n_usuarios = options['usuarios'] if options['usuarios'] is not None else max(int(10_000 * escala), necesarios)
+        if n_usuarios < necesarios:
+            raise CommandError(f'Se necesitan al menos {necesarios} usuarios para esta organización.')
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            usuarios = self.crear_usuarios(n_usuarios, n_direcciones, n_departamentos, n_cuadrillas, options['password'])
+            departamentos, cuadrillas = self.crear_organizacion(usuarios, n_direcciones, n_departamentos, n_cuadrillas)
+            encuestas = self.crear_encuestas(departamentos, options['encuestas_por_departamento'], options['preguntas_por_encuesta'])
+        self.stdout.write(f'{n_usuarios} usuarios, {n_departamentos} departamentos, {n_cuadrillas} cuadrillas, '
+                          f'{len(encuestas)} encuestas ({time.perf_counter() - inicio:.1f}s).')
+
+        estados = {
+            nombre: EstadoSolicitud.objects.get_or_create(nombre_estado=nombre)[0].pk for nombre in ESTADOS
+        }
+        self.crear_solicitudes(
+            n_solicitudes, options['respuestas_por_solicitud'], options['dias'], options['lote'],
+            usuarios[GRUPO_TERRITORIAL], encuestas, cuadrillas, estados, not options['sin_firmas'],
+        )
+
+        total = contadores.reconstruir()
+        invalidar_resumen()
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos generados en {time.perf_counter() - inicio:.1f}s ({total} contadores reconstruidos).'
+        ))
+
+    def crear_usuarios(self, total, n_direcciones, n_departamentos, n_cuadrillas, password):
+        """ {group_id: [ids]}: responsables de la organización, algunos admins y el resto territoriales. """
+        for group_id, nombre in GRUPOS.items():
+            Group.objects.get_or_create(pk=group_id, defaults={'name': nombre})
+        n_admins = max(1, total // 1000)
+        roles = ([GRUPO_DIRECCION] * n_direcciones + [GRUPO_DEPARTAMENTO] * n_departamentos
+                 + [GRUPO_CUADRILLA] * n_cuadrillas + [GRUPO_ADMIN] * n_admins)
+        roles += [GRUPO_TERRITORIAL] * max(total - len(roles), 0)
+
+        # Nombres de usuario únicos aunque el comando se ejecute varias veces
+        base = (User.objects.aggregate(maximo=Max('pk'))['maximo'] or 0) + 1
+        clave = make_password(password)  # Un solo hash: calcularlo por usuario tomaría minutos
+        nuevos = []
+        for numero in range(len(roles)):
+            nombre, apellido = self.azar.choice(NOMBRES), self.azar.choice(APELLIDOS)
+            nuevos.append(User(
+                username=f'gen_{base + numero}', first_name=nombre, last_name=apellido,
+                email=f'gen_{base + numero}@ejemplo.cl', password=clave,
+            ))
+        nuevos = User.objects.bulk_create(nuevos, batch_size=1000)
+        Profile.objects.bulk_create(
+            [Profile(user=usuario, group_id=rol) for usuario, rol in zip(nuevos, roles)], batch_size=1000
+        )
+        UsuarioBusqueda.objects.bulk_create([
+            UsuarioBusqueda(user=usuario, nombre=normalizar(f'{usuario.first_name} {usuario.last_name}'),
+                            username=normalizar(usuario.username))
+            for usuario in nuevos
+        ], batch_size=1000)
+
+        usuarios = {group_id: [] for group_id in GRUPOS}
+        for usuario, rol in zip(nuevos, roles):
+            usuarios[rol].append(usuario.pk)
+        return usuarios
+
+    def crear_organizacion(self, usuarios, n_direcciones, n_departamentos, n_cuadrillas):
+        direcciones = Direccion.objects.bulk_create([
+            Direccion(usuario_id=usuario_id, nombre_direccion=f'{DIRECCIONES[n % len(DIRECCIONES)]} {n // len(DIRECCIONES) + 1}')
+            for n, usuario_id in enumerate(usuarios[GRUPO_DIRECCION][:n_direcciones])
+        ])
+        departamentos = []
+        for n, usuario_id in enumerate(usuarios[GRUPO_DEPARTAMENTO][:n_departamentos]):
+            nombre = f'{AREAS[n % len(AREAS)]} {n // len(AREAS) + 1}'
+            departamentos.append(Departamento(
+                id_direccion=direcciones[n % len(direcciones)], usuario_id=usuario_id,
+                nombre_departamento=nombre, nombre_normalizado=normalizar(nombre),
+            ))
+        departamentos = Departamento.objects.bulk_create(departamentos)
+        cuadrillas = []
+        for n, jefe_id in enumerate(usuarios[GRUPO_CUADRILLA][:n_cuadrillas]):
+            nombre = f'Cuadrilla {n + 1}'
+            cuadrillas.append(Cuadrilla(
+                departamento=departamentos[n % len(departamentos)], jefe_id=jefe_id,
+                nombre_cuadrilla=nombre, nombre_normalizado=normalizar(nombre),
+            ))
+        cuadrillas = Cuadrilla.objects.bulk_create(cuadrillas)
+
+        por_departamento = {}
+        for cuadrilla in cuadrillas:
+            por_departamento.setdefault(cuadrilla.departamento_id, []).append(cuadrilla.pk)
+        return departamentos, por_departamento
+
+    def crear_encuestas(self, departamentos, por_departamento, n_preguntas):
+        """ [(id_encuesta, id_departamento, [ids de preguntas])] """
+        tipo, _ = TipoEncuesta.objects.get_or_create(nombre_tipo='Reclamo')
+        encuestas = []
+        for departamento in departamentos:
+            for n in range(por_departamento):
+                titulo = f'{self.azar.choice(PROBLEMAS)} - {departamento.nombre_departamento} {n + 1}'
+                encuestas.append(Encuesta(
+                    id_departamento=departamento, id_tipo_encuesta=tipo, titulo=titulo,
+                    titulo_normalizado=normalizar(titulo), descripcion=f'Reclamos de {titulo.lower()}',
+                ))
+        encuestas = Encuesta.objects.bulk_create(encuestas, batch_size=1000)
+        preguntas = Pregunta.objects.bulk_create([
+            Pregunta(id_encuesta=encuesta, texto_pregunta=f'Pregunta {n + 1} de {encuesta.titulo}')
+            for encuesta in encuestas for n in range(n_preguntas)
+        ], batch_size=1000)
+        por_encuesta = {}
+        for pregunta in preguntas:
+            por_encuesta.setdefault(pregunta.id_encuesta_id, []).append(pregunta.pk)
+        return [(encuesta.pk, encuesta.id_departamento_id, por_encuesta.get(encuesta.pk, [])) for encuesta in encuestas]
+
+    def crear_solicitudes(self, total, por_solicitud, dias, lote, territoriales, encuestas, cuadrillas, estados, firmar):
+        if not total:
+            return
+        if not territoriales:
+            raise CommandError('No hay usuarios territoriales para crear solicitudes.')
+        ahora = timezone.now()
+        # Los textos salen de un vocabulario acotado: la firma MinHash se calcula una vez por texto
+        self.firmas = {}
+        inicio = time.perf_counter()
+        creadas = 0
+        while creadas < total:
+            cantidad = min(lote, total - creadas)
+            with transaction.atomic():
+                self.crear_lote(cantidad, por_solicitud, dias, ahora, territoriales, encuestas, cuadrillas, estados, firmar)
+            creadas += cantidad
+            transcurrido = time.perf_counter() - inicio
+            self.stdout.write(f'  {creadas}/{total} solicitudes ({creadas / transcurrido:.0f}/s)')
+
+    def crear_lote(self, cantidad, por_solicitud, dias, ahora, territoriales, encuestas, cuadrillas, estados, firmar):
+        azar = self.azar
+        solicitudes, fechas, preguntas_de = [], [], []
+        for _ in range(cantidad):
+            encuesta_id, departamento_id, preguntas = azar.choice(encuestas)
+            latitud = longitud = celda = None
+            if azar.random() < 0.7:
+                latitud = round(CENTRO[0] + azar.uniform(-0.1, 0.1), 6)
+                longitud = round(CENTRO[1] + azar.uniform(-0.1, 0.1), 6)
+                celda = codificar_geohash(latitud, longitud)
+            problema, lugar = azar.choice(PROBLEMAS), azar.choice(LUGARES)
+            candidatas = cuadrillas.get(departamento_id)
+            solicitudes.append(Solicitud(
+                id_encuesta_id=encuesta_id,
+                id_territorial_id=azar.choice(territoriales),
+                id_cuadrilla_id=azar.choice(candidatas) if candidatas and azar.random() < 0.8 else None,
+                id_estado_id=estados[_elegir(azar, ESTADOS)],
+                titulo=f'{problema} {lugar}',
+                descripcion=f'{problema} {lugar}. {azar.choice(DETALLES)}',
+                ubicacion=f'{azar.choice(CALLES)} {azar.randint(1, 9999)}',
+                latitud=latitud, longitud=longitud, celda=celda,
+                prioridad=_elegir(azar, PRIORIDADES),
+                state='Bloqueado' if azar.random() < 0.03 else 'Activo',
+            ))
+            fechas.append(ahora - timedelta(seconds=azar.randint(0, dias * 86400)))
+            preguntas_de.append(preguntas)
+
+        solicitudes = Solicitud.objects.bulk_create(solicitudes)
+        # auto_now_add pisa 'created' al insertar: se reparte en el tiempo con un bulk_update
+        for solicitud, fecha in zip(solicitudes, fechas):
+            solicitud.created = solicitud.updated = fecha
+        Solicitud.objects.bulk_update(solicitudes, ['created', 'updated'], batch_size=1000)
+
+        respuestas, documentos, firmas, eventos, tiempos = [], [], [], [], []
+        for solicitud, preguntas in zip(solicitudes, preguntas_de):
+            textos = []
+            for n in range(por_solicitud if preguntas else 0):
+                texto = azar.choice(RESPUESTAS)
+                textos.append(texto)
+                respuestas.append(Respuesta(id_solicitud_id=solicitud.pk, id_pregunta_id=preguntas[n % len(preguntas)], respuesta=texto))
+            documentos.append(SolicitudBusqueda(
+                id_solicitud_id=solicitud.pk,
+                documento=normalizar(' '.join([solicitud.titulo, solicitud.descripcion, solicitud.ubicacion, *textos])),
+            ))
+            if firmar:
+                texto = (solicitud.titulo, solicitud.descripcion)
+                if texto not in self.firmas:
+                    self.firmas[texto] = firma_texto(*texto)
+                claves = claves_solicitud(*texto, solicitud.latitud, solicitud.longitud,
+                                          timezone.localdate(solicitud.created), firma=self.firmas[texto])
+                firmas.extend(SolicitudFirma(id_solicitud_id=solicitud.pk, clave=clave) for clave in claves)
+            # Historial de creación, como el que deja la señal registrar_historial
+            for campo, valor in (('estado', solicitud.id_estado_id), ('cuadrilla', solicitud.id_cuadrilla_id), ('state', solicitud.state)):
+                if valor is not None:
+                    eventos.append(SolicitudEvento(id_solicitud_id=solicitud.pk, campo=campo, valor_nuevo=str(valor), created=solicitud.created))
+            tiempos.append(SolicitudTiempoEstado(id_solicitud_id=solicitud.pk, id_estado_id=solicitud.id_estado_id, veces=1, desde=solicitud.created))
+
+        Respuesta.objects.bulk_create(respuestas, batch_size=5000)
+        SolicitudBusqueda.objects.bulk_create(documentos, batch_size=5000)
+        SolicitudFirma.objects.bulk_create(firmas, batch_size=5000)
+        SolicitudEvento.objects.bulk_create(eventos, batch_size=5000)
+        SolicitudTiempoEstado.objects.bulk_create(tiempos, batch_size=5000)
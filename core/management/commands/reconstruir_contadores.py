@@ -0,0 +1,27 @@
+# core/management/commands/reconstruir_contadores.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores precalculados (core.Contador) desde las tablas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Solo compara los contadores con los valores reales; termina con error si hay diferencias.',
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = contadores.verificar()
+            for ambito, clave, esperado, actual in diferencias:
+                self.stdout.write(f'{ambito}[{clave}]: esperado {esperado}, actual {actual}')
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} contador(es) desalineado(s). Ejecuta reconstruir_contadores.')
+            self.stdout.write(self.style.SUCCESS('Contadores consistentes.'))
+            return
+
+        total = contadores.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{total} contador(es) reconstruido(s).'))
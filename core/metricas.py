@@ -0,0 +1,283 @@
+# core/metricas.py
+"""
+Métricas por ruta en formato de texto de Prometheus.
+
+MetricasMiddleware (core/middleware.py) registra por cada request,
+etiquetado con el nombre de la URL resuelta ('vista'):
+
+- cim_request_duracion_segundos  histograma de latencia (vista, metodo)
+- cim_response_tamano_bytes      histograma del tamaño del cuerpo (vista)
+- cim_request_consultas_sql      histograma de consultas SQL (vista)
+- cim_requests_total             contador (vista, metodo, status)
+- cim_errores_total              contador de respuestas 4xx/5xx (vista, clase)
+
+Modo multiproceso por archivos: cada worker acumula en memoria y, como
+mucho cada METRICAS_INTERVALO segundos, reescribe su archivo
+METRICAS_DIR/metricas_<pid>_<uuid>.json (escritura atómica con os.replace;
+el uuid evita pisar el archivo de un proceso anterior con el mismo pid). La
+vista 'metricas' suma los archivos de todos los procesos. Los de procesos
+terminados se compactan en metricas_finalizados.json, así los contadores no
+retroceden y el directorio no crece con cada reinicio de un worker (la
+compactación usa fcntl; sin él, en Windows, los archivos se conservan). El
+directorio debe vaciarse al reiniciar el servicio.
+
+Con METRICAS_TOKEN definido, el endpoint acepta 'Authorization: Bearer
+<token>' (para el scraper de Prometheus); los administradores logueados
+siempre pueden verlo.
+"""
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin compactación de los archivos de procesos terminados
+    fcntl = None
+
+METRICAS_DIR = getattr(settings, 'METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'metricas_cim'))
+METRICAS_INTERVALO = getattr(settings, 'METRICAS_INTERVALO', 1.0)
+METRICAS_TOKEN = getattr(settings, 'METRICAS_TOKEN', None)
+
+# Límites superiores de cada bucket (el +Inf es implícito)
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# nombre -> (tipo, ayuda, buckets)
+METRICAS = {
+    'cim_request_duracion_segundos': ('histogram', 'Duración de los requests por vista.', BUCKETS_SEGUNDOS),
+    'cim_response_tamano_bytes': ('histogram', 'Tamaño del cuerpo de las respuestas por vista.', BUCKETS_BYTES),
+    'cim_request_consultas_sql': ('histogram', 'Consultas SQL por request y vista.', BUCKETS_CONSULTAS),
+    'cim_requests_total': ('counter', 'Requests atendidos por vista, método y status.', None),
+    'cim_errores_total': ('counter', 'Respuestas con error (4xx/5xx) por vista.', None),
+}
+
+ARCHIVO_FINALIZADOS = 'metricas_finalizados.json'
+
+_series = {}
+_bloqueo = threading.Lock()
+_pid = os.getpid()
+_instancia = uuid.uuid4().hex
+_ultima_escritura = 0.0
+
+
+def _valores_vacios(nombre):
+    buckets = METRICAS[nombre][2]
+    # Histograma: un contador por bucket (no acumulado) + el de +Inf, la suma y el total
+    return [0] * (len(buckets) + 3) if buckets else [0]
+
+
+def _reiniciar_si_fork():
+    # Tras un fork el hijo hereda lo acumulado por el padre: se descarta para no contarlo dos veces
+    global _pid, _instancia
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _instancia = uuid.uuid4().hex
+        _series.clear()
+
+
+def observar(nombre, etiquetas, valor):
+    """ Suma 'valor' al histograma 'nombre' con las etiquetas dadas (tupla de pares). """
+    buckets = METRICAS[nombre][2]
+    with _bloqueo:
+        _reiniciar_si_fork()
+        valores = _series.get((nombre, etiquetas))
+        if valores is None:
+            valores = _series[(nombre, etiquetas)] = _valores_vacios(nombre)
+        indice = next((i for i, limite in enumerate(buckets) if valor <= limite), len(buckets))
+        valores[indice] += 1
+        valores[-2] += valor
+        valores[-1] += 1
+
+
+def incrementar(nombre, etiquetas, cantidad=1):
+    with _bloqueo:
+        _reiniciar_si_fork()
+        valores = _series.get((nombre, etiquetas))
+        if valores is None:
+            valores = _series[(nombre, etiquetas)] = _valores_vacios(nombre)
+        valores[0] += cantidad
+
+
+def _archivo_proceso():
+    return os.path.join(METRICAS_DIR, f'metricas_{_pid}_{_instancia}.json')
+
+
+def escribir(forzar=False):
+    """ Guarda las series del proceso en su archivo (como mucho cada METRICAS_INTERVALO segundos). """
+    global _ultima_escritura
+    ahora = time.monotonic()
+    if not forzar and ahora - _ultima_escritura < METRICAS_INTERVALO:
+        return
+    with _bloqueo:
+        _reiniciar_si_fork()
+        if not _series:
+            return
+        datos = [[nombre, list(map(list, etiquetas)), valores] for (nombre, etiquetas), valores in _series.items()]
+        _ultima_escritura = ahora
+    os.makedirs(METRICAS_DIR, exist_ok=True)
+    destino = _archivo_proceso()
+    temporal = f'{destino}.{threading.get_ident()}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, destino)
+
+
+atexit.register(escribir, forzar=True)
+
+
+@contextmanager
+def _bloqueo_directorio(exclusivo=False):
+    """ Compactar (exclusivo) y leer (compartido) no se cruzan: nada se cuenta dos veces. """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(METRICAS_DIR, exist_ok=True)
+    with open(os.path.join(METRICAS_DIR, '.bloqueo'), 'a') as archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return None  # Archivo de un proceso que terminó a medio escribir
+
+
+def _sumar(total, datos):
+    for nombre, etiquetas, valores in datos:
+        if nombre not in METRICAS:
+            continue
+        clave = (nombre, tuple(map(tuple, etiquetas)))
+        acumulado = total.setdefault(clave, [0] * len(valores))
+        for i, valor in enumerate(valores):
+            acumulado[i] += valor
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Existe, pero es de otro usuario
+    return True
+
+
+def _pid_de_archivo(nombre):
+    # metricas_<pid>_<uuid>.json (o metricas_<pid>.json de versiones anteriores)
+    try:
+        return int(nombre[len('metricas_'):-len('.json')].split('_')[0])
+    except ValueError:
+        return None
+
+
+def compactar():
+    """
+    Suma a ARCHIVO_FINALIZADOS los archivos de procesos que ya no existen y los
+    borra. Retorna cuántos se compactaron.
+    """
+    if fcntl is None:
+        return 0
+    with _bloqueo_directorio(exclusivo=True):
+        ruta_finalizados = os.path.join(METRICAS_DIR, ARCHIVO_FINALIZADOS)
+        finalizados = _leer(ruta_finalizados) or {'archivos': [], 'series': []}
+        presentes = {os.path.basename(ruta) for ruta in glob.glob(os.path.join(METRICAS_DIR, 'metricas_*.json'))}
+        # Sumados en una compactación que no alcanzó a borrarlos: solo falta borrar
+        ya_sumados = [nombre for nombre in finalizados['archivos'] if nombre in presentes]
+        terminados = []
+        for nombre in sorted(presentes - set(ya_sumados) - {ARCHIVO_FINALIZADOS}):
+            pid = _pid_de_archivo(nombre)
+            if pid is not None and pid != os.getpid() and not _proceso_vivo(pid):
+                terminados.append(nombre)
+        if terminados:
+            total = {}
+            _sumar(total, finalizados['series'])
+            for nombre in terminados:
+                _sumar(total, _leer(os.path.join(METRICAS_DIR, nombre)) or [])
+            datos = {
+                'archivos': ya_sumados + terminados,
+                'series': [[nombre, list(map(list, etiquetas)), valores] for (nombre, etiquetas), valores in total.items()],
+            }
+            temporal = f'{ruta_finalizados}.{os.getpid()}.tmp'
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo)
+            os.replace(temporal, ruta_finalizados)
+        for nombre in ya_sumados + terminados:
+            try:
+                os.remove(os.path.join(METRICAS_DIR, nombre))
+            except FileNotFoundError:
+                pass
+    return len(terminados)
+
+
+def agregar():
+    """ {(nombre, etiquetas): valores} sumando los archivos de todos los procesos. """
+    escribir(forzar=True)
+    compactar()
+    total = {}
+    with _bloqueo_directorio():
+        for ruta in glob.glob(os.path.join(METRICAS_DIR, 'metricas_*.json')):
+            datos = _leer(ruta)
+            if isinstance(datos, dict):
+                datos = datos['series']  # ARCHIVO_FINALIZADOS
+            _sumar(total, datos or [])
+    return total
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(pares):
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exposicion():
+    """ Texto en formato de exposición de Prometheus (versión 0.0.4). """
+    series = agregar()
+    lineas = []
+    for nombre, (tipo, ayuda, buckets) in METRICAS.items():
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+        for (serie, etiquetas), valores in sorted(series.items()):
+            if serie != nombre:
+                continue
+            if not buckets:
+                lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valores[0])}')
+                continue
+            acumulado = 0
+            for limite, cantidad in zip((*buckets, '+Inf'), valores):
+                acumulado += cantidad
+                lineas.append(f'{nombre}_bucket{_etiquetas((*etiquetas, ("le", limite)))} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(valores[-2])}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {valores[-1]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def registrar_request(vista, metodo, status, segundos, tamano, consultas):
+    """ Registra un request terminado y guarda el archivo del proceso si corresponde. """
+    observar('cim_request_duracion_segundos', (('vista', vista), ('metodo', metodo)), segundos)
+    if tamano is not None:
+        observar('cim_response_tamano_bytes', (('vista', vista),), tamano)
+    observar('cim_request_consultas_sql', (('vista', vista),), consultas)
+    incrementar('cim_requests_total', (('vista', vista), ('metodo', metodo), ('status', str(status))))
+    if status >= 400:
+        incrementar('cim_errores_total', (('vista', vista), ('clase', f'{status // 100}xx')))
+    escribir()
@@ -0,0 +1,172 @@
+# core/middleware.py
+"""
+RolMiddleware y MetricasMiddleware funcionan en modo síncrono (WSGI) y async
+(ASGI): bajo ASGI no obligan a Django a pasar cada request por un hilo.
+
+MetricasMiddleware cuenta las consultas con un execute_wrapper global
+(_contar_consulta) que se instala en cada conexión al abrirse y suma en el
+contador del request actual, guardado en una ContextVar. sync_to_async copia
+el contexto al hilo donde corren las consultas de una vista async, así cada
+request (o tarea) cuenta solo las suyas aunque compartan hilo y conexión.
+
+InstrumentacionSQLMiddleware (solo para desarrollo) sigue siendo síncrono:
+instala su execute_wrapper en las conexiones del hilo actual mientras dura el
+request, y como middleware síncrono Django lo ejecuta en un hilo al que
+vuelven las consultas de la vista, incluso las async (thread_sensitive).
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from . import instrumentacion, metricas
+from .roles import resolver_rol
+
+
+@contextmanager
+def _envolver_conexiones(wrapper):
+    """ Instala el execute_wrapper en todas las conexiones mientras dura el 'with'. """
+    with ExitStack() as pila:
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(wrapper))
+        yield
+
+
+def _nombre_vista(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else None) or '(sin vista)'
+
+
+class _MiddlewareSyncAsync:
+    """ Base: en modo async __call__ devuelve la corrutina de _acall. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+
+class RolMiddleware(_MiddlewareSyncAsync):
+    """
+    Expone ``request.role`` (core.roles.Rol). Se resuelve de forma perezosa,
+    así las vistas que no lo usan no pagan la consulta.
+    Debe ir después de AuthenticationMiddleware.
+    """
+
+    def __call__(self, request):
+        # Las vistas async no lo evalúan: role_required lo reemplaza (ver core.roles.aobtener_rol)
+        request.role = SimpleLazyObject(lambda: resolver_rol(request.user))
+        # En modo async get_response devuelve una corrutina, que el handler espera
+        return self.get_response(request)
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Mide las consultas SQL de cada request y detecta N+1 (ver
+    core/instrumentacion.py). Solo se activa con SQL_INSTRUMENTACION = True.
+    Las consultas de un StreamingHttpResponse (exportaciones) ocurren al
+    enviar el cuerpo, después de este middleware, y no se cuentan.
+    """
+    sync_capable = True
+    async_capable = False  # Ver el docstring del módulo
+
+    def __init__(self, get_response):
+        if not instrumentacion.SQL_INSTRUMENTACION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registro, inicio = instrumentacion.RegistroConsultas(), time.perf_counter()
+        with _envolver_conexiones(registro):
+            response = self.get_response(request)
+        return self._registrar(request, response, registro, inicio)
+
+    def _registrar(self, request, response, registro, inicio):
+        instrumentacion.registrar_request(_nombre_vista(request), registro, time.perf_counter() - inicio)
+        # Visible en las herramientas de desarrollo del navegador (pestaña Timing)
+        response['Server-Timing'] = f'sql;dur={registro.segundos * 1000:.1f};desc="{registro.consultas} consultas"'
+        return response
+
+
+class _ContadorConsultas:
+    """ Consultas SQL del request en curso (ver _contar_consulta). """
+
+    def __init__(self):
+        self.consultas = 0
+
+
+# Contador del request en curso; None fuera de MetricasMiddleware
+_contador_request = ContextVar('contador_consultas', default=None)
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    """ execute_wrapper global: suma la consulta al request del contexto actual, si lo hay. """
+    contador = _contador_request.get()
+    if contador is not None:
+        contador.consultas += 1
+    return execute(sql, params, many, context)
+
+
+def _instalar_contador(conexion):
+    if _contar_consulta not in conexion.execute_wrappers:
+        # Al principio: execute_wrapper() saca el último al salir de su 'with'
+        conexion.execute_wrappers.insert(0, _contar_consulta)
+
+
+@receiver(connection_created)
+def instalar_contador(sender, connection, **kwargs):
+    _instalar_contador(connection)
+
+
+# Conexiones que ya estaban abiertas al importar el módulo
+for _conexion in connections.all(initialized_only=True):
+    _instalar_contador(_conexion)
+
+
+class MetricasMiddleware(_MiddlewareSyncAsync):
+    """
+    Registra latencia, tamaño de respuesta, consultas SQL y errores por
+    vista para el endpoint de Prometheus (ver core/metricas.py). Conviene
+    ponerlo primero en MIDDLEWARE para medir también a los demás.
+    """
+
+    def __call__(self, request):
+        if self.es_async:
+            return self._acall(request)
+        contador, inicio = _ContadorConsultas(), time.perf_counter()
+        token = _contador_request.set(contador)
+        try:
+            response = self.get_response(request)
+        finally:
+            _contador_request.reset(token)
+        return self._registrar(request, response, contador, inicio)
+
+    async def _acall(self, request):
+        contador, inicio = _ContadorConsultas(), time.perf_counter()
+        token = _contador_request.set(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contador_request.reset(token)
+        return self._registrar(request, response, contador, inicio)
+
+    def _registrar(self, request, response, contador, inicio):
+        segundos = time.perf_counter() - inicio
+        if response.streaming:
+            tamano = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            tamano = len(response.content)
+        # Solo nombres de URL como etiqueta: las rutas con IDs dispararían la cardinalidad
+        metricas.registrar_request(
+            _nombre_vista(request), request.method, response.status_code, segundos, tamano, contador.consultas
+        )
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    from core.contadores import reconstruir
+    reconstruir(apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('organization', '0001_initial'),
+        ('requests', '0007_solicitud_historial'),
+        ('users', '0002_alter_cuadrilla_departamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ambito', models.CharField(choices=[('cuadrilla_abiertas', 'Solicitudes abiertas por cuadrilla'), ('departamento_abiertas', 'Solicitudes abiertas por departamento'), ('estado_solicitudes', 'Solicitudes por estado'), ('departamento_cuadrillas', 'Cuadrillas por departamento'), ('direccion_departamentos', 'Departamentos por dirección')], max_length=30)),
+                ('clave', models.IntegerField()),
+                ('valor', models.BigIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ambito', 'clave'), name='contador_ambito_clave_uniq')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,28 @@
 from django.db import models
 
 # Create your models here.
+
+class Contador(models.Model):
+    """
+    Contador precalculado (ver core/contadores.py). 'clave' es el ID del objeto
+    contado según el ámbito: cuadrilla, departamento, estado o dirección.
+    """
+    AMBITOS = [
+        ('cuadrilla_abiertas', 'Solicitudes abiertas por cuadrilla'),
+        ('departamento_abiertas', 'Solicitudes abiertas por departamento'),
+        ('estado_solicitudes', 'Solicitudes por estado'),
+        ('departamento_cuadrillas', 'Cuadrillas por departamento'),
+        ('direccion_departamentos', 'Departamentos por dirección'),
+    ]
+    ambito = models.CharField(max_length=30, choices=AMBITOS)
+    clave = models.IntegerField()
+    valor = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ambito', 'clave'], name='contador_ambito_clave_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.ambito}[{self.clave}] = {self.valor}"
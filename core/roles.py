@@ -0,0 +1,164 @@
+# core/roles.py
+"""
+Resolución del rol (Profile.group_id) del usuario, una vez por request.
+
+RolMiddleware deja en ``request.role`` un objeto Rol perezoso; el decorador
+``role_required`` lo usa para reemplazar el bloque repetido en cada vista:
+
+    try:
+        profile = Profile.objects.get(user=request.user)
+        if profile.group_id != 1: ...
+    except Profile.DoesNotExist: ...
+
+El group_id se guarda en la caché de Django (compartida entre procesos) y se
+invalida con ``invalidar_rol`` cuando un formulario cambia el grupo del
+usuario. Se usa la caché y no la sesión porque el cambio lo hace un admin y
+la sesión que habría que invalidar es la del usuario editado.
+
+Para activarlo, agregar 'core.middleware.RolMiddleware' a MIDDLEWARE después
+de AuthenticationMiddleware. Si el middleware no está, el decorador resuelve
+el rol por su cuenta.
+
+``role_required`` también decora vistas async: en ese caso el rol se resuelve
+con la caché y el ORM async (``aresolver_rol``), sin evaluar ``request.role``.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import redirect
+
+from registration.models import Profile
+
+# Grupos (Profile.group_id) del sistema
+GRUPO_ADMIN = 1
+GRUPO_TERRITORIAL = 4
+GRUPO_CUADRILLA = 5
+
+ROL_CACHE_SEGUNDOS = getattr(settings, 'ROL_CACHE_SEGUNDOS', 300)
+
+# Valor guardado en caché para usuarios sin Profile (None significa "no cacheado")
+_SIN_PERFIL = 0
+
+
+class Rol:
+    """ Rol del usuario autenticado. group_id es None si no tiene Profile. """
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+
+    @property
+    def tiene_perfil(self):
+        return self.group_id is not None
+
+    @property
+    def es_admin(self):
+        return self.group_id == GRUPO_ADMIN
+
+    @property
+    def es_territorial(self):
+        return self.group_id == GRUPO_TERRITORIAL
+
+    @property
+    def es_cuadrilla(self):
+        return self.group_id == GRUPO_CUADRILLA
+
+    def __repr__(self):
+        return f"Rol(group_id={self.group_id})"
+
+
+def _clave_cache(user_id):
+    return f'core:rol:{user_id}'
+
+
+def resolver_rol(user):
+    """ Devuelve el Rol del usuario usando la caché; consulta Profile solo si hace falta. """
+    if not user.is_authenticated:
+        return Rol(None)
+    group_id = cache.get(_clave_cache(user.pk))
+    if group_id is None:
+        group_id = (
+            Profile.objects.filter(user_id=user.pk).values_list('group_id', flat=True).first()
+            or _SIN_PERFIL
+        )
+        cache.set(_clave_cache(user.pk), group_id, ROL_CACHE_SEGUNDOS)
+    return Rol(group_id if group_id != _SIN_PERFIL else None)
+
+
+async def aresolver_rol(user):
+    """ Versión async de resolver_rol. """
+    if not user.is_authenticated:
+        return Rol(None)
+    group_id = await cache.aget(_clave_cache(user.pk))
+    if group_id is None:
+        group_id = (
+            await Profile.objects.filter(user_id=user.pk).values_list('group_id', flat=True).afirst()
+            or _SIN_PERFIL
+        )
+        await cache.aset(_clave_cache(user.pk), group_id, ROL_CACHE_SEGUNDOS)
+    return Rol(group_id if group_id != _SIN_PERFIL else None)
+
+
+def invalidar_rol(user_id):
+    """ Llamar cuando cambia el grupo (o el Profile) de un usuario. """
+    cache.delete(_clave_cache(user_id))
+
+
+def obtener_rol(request):
+    """ Rol del request, resolviéndolo si RolMiddleware no está instalado. """
+    if not hasattr(request, 'role'):
+        request.role = resolver_rol(request.user)
+    return request.role
+
+
+async def aobtener_rol(request):
+    """
+    Rol del request para vistas async. El request.role perezoso de
+    RolMiddleware consultaría la BD de forma síncrona, así que se reemplaza.
+    """
+    # request.user también queda cargado: el código síncrono que lo reciba
+    # (filtros de QuerySet, plantillas) ya no necesita consultar la BD
+    request.user = await request.auser()
+    request.role = await aresolver_rol(request.user)
+    return request.role
+
+
+def _rechazo(request, rol, grupos, redirect_url, mensaje):
+    """ Redirección si el rol no cumple lo exigido por role_required, o None. """
+    if not rol.tiene_perfil:
+        messages.error(request, 'Tu perfil no está configurado.')
+        return redirect('logout')
+    if grupos and rol.group_id not in grupos:
+        if mensaje:
+            messages.error(request, mensaje)
+        return redirect(redirect_url)
+    return None
+
+
+def role_required(*grupos, redirect_url='main_admin', mensaje='No tienes permiso para ver esta página.'):
+    """
+    Exige que el usuario tenga Profile y, si se indican grupos, que pertenezca a uno.
+
+    Sin Profile se redirige a 'logout'. Con un grupo no permitido se muestra
+    ``mensaje`` (si no es None) y se redirige a ``redirect_url``.
+    Usar después de @login_required. Acepta vistas síncronas y async.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                rechazo = _rechazo(request, await aobtener_rol(request), grupos, redirect_url, mensaje)
+                if rechazo is not None:
+                    return rechazo
+                return await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def _wrapped_view(request, *args, **kwargs):
+                rechazo = _rechazo(request, obtener_rol(request), grupos, redirect_url, mensaje)
+                if rechazo is not None:
+                    return rechazo
+                return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,162 @@
+# core/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from organization.models import Departamento
+from requests.models import CAMPOS_ORIGINALES, Solicitud, EstadoSolicitud
+from surveys.models import Encuesta
+from users.models import Cuadrilla
+from . import contadores
+from .dashboard import invalidar_resumen
+
+
+@receiver(post_save, sender=Solicitud)
+@receiver(post_delete, sender=Solicitud)
+@receiver(post_delete, sender=User)
+def invalidar_dashboard(sender, **kwargs):
+    """ Cualquier cambio en Solicitudes, o un usuario eliminado, deja obsoleto el resumen del dashboard. """
+    invalidar_resumen()
+
+
+@receiver(post_save, sender=User)
+def invalidar_dashboard_usuario(sender, created, **kwargs):
+    # Del usuario el dashboard solo muestra el total: editarlo (o el last_login
+    # que se guarda en cada inicio de sesión) no lo cambia
+    if created:
+        invalidar_resumen()
+
+
+# ===================================================================
+# Contadores (core/contadores.py)
+# ===================================================================
+
+def _departamento_de_encuesta(encuesta_id):
+    return Encuesta.objects.filter(pk=encuesta_id).values_list('id_departamento_id', flat=True).first()
+
+
+def _fila_guardada(instance):
+    """
+    (fila, encuesta) con los valores que había en la BD antes del save()/delete().
+    fila = (state, estado, cuadrilla, departamento) como en contadores.CAMPOS_FILA.
+    """
+    originales = getattr(instance, '_valores_originales', None) or {}
+    if not all(attname in originales for attname in CAMPOS_ORIGINALES):
+        # Instancia no leída de la BD (o con campos diferidos): se consulta
+        guardada = Solicitud.objects.filter(pk=instance.pk).values_list(*contadores.CAMPOS_FILA, 'id_encuesta_id').first()
+        return (guardada[:4], guardada[4]) if guardada else None
+    fila = (
+        originales['state'], originales['id_estado_id'], originales['id_cuadrilla_id'],
+        _departamento_de_encuesta(originales['id_encuesta_id']),
+    )
+    return fila, originales['id_encuesta_id']
+
+
+@receiver(pre_save, sender=Solicitud)
+def contadores_antes_solicitud(sender, instance, **kwargs):
+    # Con pk asignado puede ser una fila existente aunque la instancia no venga de la BD
+    instance._fila_contadores = None if instance.pk is None else _fila_guardada(instance)
+
+
+@receiver(post_save, sender=Solicitud)
+def contadores_solicitud(sender, instance, **kwargs):
+    guardada = getattr(instance, '_fila_contadores', None)
+    antes, encuesta_antes = guardada if guardada else (None, None)
+    if antes is not None and encuesta_antes == instance.id_encuesta_id:
+        departamento = antes[3]
+    else:
+        departamento = _departamento_de_encuesta(instance.id_encuesta_id)
+    despues = (instance.state, instance.id_estado_id, instance.id_cuadrilla_id, departamento)
+    if antes == despues:
+        return  # Nada que afecte a los contadores
+    contadores.aplicar(contadores.diferencias([antes] if antes else [], [despues], contadores.estados_cerrados()))
+
+
+@receiver(post_delete, sender=Solicitud)
+def contadores_solicitud_eliminada(sender, instance, **kwargs):
+    # Tras el DELETE la fila ya no está en la BD: sin foto se usan los valores de la instancia
+    guardada = _fila_guardada(instance)
+    if guardada:
+        fila = guardada[0]
+    else:
+        fila = (
+            instance.state, instance.id_estado_id, instance.id_cuadrilla_id,
+            _departamento_de_encuesta(instance.id_encuesta_id),
+        )
+    contadores.aplicar(contadores.diferencias([fila], [], contadores.estados_cerrados()))
+
+
+@receiver(pre_save, sender=EstadoSolicitud)
+def contadores_antes_estado(sender, instance, **kwargs):
+    # Nombre actual en la BD, para saber si el save() cambia si el estado es cerrado
+    instance._nombre_contadores = None if instance._state.adding else (
+        sender.objects.filter(pk=instance.pk).values_list('nombre_estado', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=EstadoSolicitud)
+def contadores_estado(sender, instance, created, **kwargs):
+    # Renombrar un estado puede convertirlo en cerrado (o al revés): solo entonces se recalcula todo
+    anterior = getattr(instance, '_nombre_contadores', None)
+    if created or anterior is None:
+        return
+    if (anterior in contadores.ESTADOS_CERRADOS) != (instance.nombre_estado in contadores.ESTADOS_CERRADOS):
+        contadores.reconstruir()
+
+
+@receiver(post_delete, sender=EstadoSolicitud)
+def contadores_estado_eliminado(sender, instance, **kwargs):
+    contadores.eliminar('estado_solicitudes', instance.pk)
+
+
+@receiver(pre_save, sender=Cuadrilla)
+@receiver(pre_save, sender=Departamento)
+@receiver(pre_save, sender=Encuesta)
+def contadores_antes_organizacion(sender, instance, **kwargs):
+    # Padre actual en la BD (departamento de la cuadrilla o de la encuesta / dirección del departamento)
+    campo = {Cuadrilla: 'departamento_id', Departamento: 'id_direccion_id', Encuesta: 'id_departamento_id'}[sender]
+    instance._padre_contadores = None if instance._state.adding else (
+        sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Cuadrilla)
+@receiver(post_save, sender=Departamento)
+def contadores_organizacion(sender, instance, **kwargs):
+    ambito, padre = (
+        ('departamento_cuadrillas', instance.departamento_id) if sender is Cuadrilla
+        else ('direccion_departamentos', instance.id_direccion_id)
+    )
+    anterior = getattr(instance, '_padre_contadores', None)
+    if anterior == padre:
+        return
+    if anterior is not None:
+        contadores.sumar(ambito, anterior, -1)
+    contadores.sumar(ambito, padre, 1)
+
+
+@receiver(post_save, sender=Encuesta)
+def contadores_encuesta(sender, instance, **kwargs):
+    # Las solicitudes abiertas de la encuesta cuentan en su departamento: si cambia, se trasladan
+    anterior = getattr(instance, '_padre_contadores', None)
+    if anterior is None or anterior == instance.id_departamento_id:
+        return
+    abiertas = (
+        Solicitud.objects.filter(id_encuesta=instance, state='Activo')
+        .exclude(id_estado__nombre_estado__in=contadores.ESTADOS_CERRADOS).count()
+    )
+    contadores.sumar('departamento_abiertas', anterior, -abiertas)
+    contadores.sumar('departamento_abiertas', instance.id_departamento_id, abiertas)
+
+
+@receiver(post_delete, sender=Cuadrilla)
+def contadores_cuadrilla_eliminada(sender, instance, **kwargs):
+    contadores.sumar('departamento_cuadrillas', instance.departamento_id, -1)
+    contadores.eliminar('cuadrilla_abiertas', instance.pk)
+
+
+@receiver(post_delete, sender=Departamento)
+def contadores_departamento_eliminado(sender, instance, **kwargs):
+    contadores.sumar('direccion_departamentos', instance.id_direccion_id, -1)
+    contadores.eliminar('departamento_abiertas', instance.pk)
+    contadores.eliminar('departamento_cuadrillas', instance.pk)
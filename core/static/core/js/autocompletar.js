@@ -0,0 +1,54 @@
+// core/static/core/js/autocompletar.js
+// Buscador para los <select data-autocompletar="url"> de AutocompleteSelect:
+// agrega un campo de texto y reemplaza las opciones con los resultados de la url.
+(function () {
+    function iniciar(select) {
+        var buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control mb-1';
+        buscador.placeholder = 'Escribe para buscar...';
+        buscador.autocomplete = 'off';
+        select.parentNode.insertBefore(buscador, select);
+
+        var vacia = select.querySelector('option[value=""]');
+        var espera = null;
+        var ultima = null;
+
+        function mostrar(resultados) {
+            var elegida = select.value;
+            select.innerHTML = '';
+            if (vacia) select.appendChild(vacia);
+            resultados.forEach(function (resultado) {
+                var opcion = new Option(resultado.texto, resultado.id);
+                select.appendChild(opcion);
+            });
+            if (resultados.some(function (r) { return String(r.id) === elegida; })) {
+                select.value = elegida;
+            } else if (resultados.length) {
+                select.value = String(resultados[0].id);
+            }
+        }
+
+        function buscar() {
+            var texto = buscador.value.trim();
+            if (texto === ultima) return;
+            ultima = texto;
+            var url = select.dataset.autocompletar + '?q=' + encodeURIComponent(texto);
+            fetch(url, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+                .then(function (respuesta) { return respuesta.ok ? respuesta.json() : { resultados: [] }; })
+                .then(function (datos) {
+                    // Ignorar respuestas de búsquedas ya reemplazadas
+                    if (texto === ultima) mostrar(datos.resultados);
+                });
+        }
+
+        buscador.addEventListener('input', function () {
+            clearTimeout(espera);
+            espera = setTimeout(buscar, 250);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();
@@ -1,3 +1,506 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import Group, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.urls import path
+from django.urls import reverse
+from django.utils import timezone
+
+from organization.models import Direccion, Departamento
+from registration.models import Profile
+from requests.models import Solicitud, EstadoSolicitud, Respuesta, SolicitudBusqueda
+from surveys.models import TipoEncuesta, Encuesta
+from users.models import Cuadrilla, UsuarioBusqueda
+from requests.forms import SolicitudForm
+from . import api, benchmark, contadores, dashboard, instrumentacion, metricas, views
+from .autocompletar import AMBITOS
+from .middleware import InstrumentacionSQLMiddleware, MetricasMiddleware, RolMiddleware
+from .roles import GRUPO_ADMIN, GRUPO_TERRITORIAL, Rol, invalidar_rol, role_required
+
+
+class ContadoresTest(TestCase):
+    """ Los contadores mantenidos por señales coinciden con un recálculo completo. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin_contadores')
+        cls.direccion = Direccion.objects.create(usuario=cls.user, nombre_direccion='Obras')
+        cls.departamento = Departamento.objects.create(id_direccion=cls.direccion, usuario=cls.user, nombre_departamento='Vialidad')
+        cls.cuadrilla = Cuadrilla.objects.create(nombre_cuadrilla='C1', departamento=cls.departamento, jefe=cls.user)
+        tipo = TipoEncuesta.objects.create(nombre_tipo='Reclamo')
+        cls.encuesta = Encuesta.objects.create(id_departamento=cls.departamento, id_tipo_encuesta=tipo, titulo='Baches', descripcion='d')
+        cls.creada = EstadoSolicitud.objects.create(nombre_estado='Creada')
+        cls.finalizada = EstadoSolicitud.objects.create(nombre_estado='Finalizada')
+
+    def crear_solicitud(self, **campos):
+        return Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=self.user, id_estado=self.creada, **campos
+        )
+
+    def test_cambios_de_solicitud(self):
+        solicitudes = [self.crear_solicitud(id_cuadrilla=self.cuadrilla) for _ in range(3)]
+        self.assertEqual(contadores.obtener('cuadrilla_abiertas'), {self.cuadrilla.pk: 3})
+
+        solicitud = Solicitud.objects.get(pk=solicitudes[0].pk)
+        solicitud.id_estado = self.finalizada
+        solicitud.save()
+        Solicitud.objects.get(pk=solicitudes[1].pk).delete()
+
+        self.assertEqual(contadores.obtener('cuadrilla_abiertas'), {self.cuadrilla.pk: 1})
+        self.assertEqual(contadores.obtener('departamento_abiertas'), {self.departamento.pk: 1})
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_actualizacion_masiva(self):
+        solicitudes = [self.crear_solicitud() for _ in range(4)]
+        filas = list(Solicitud.objects.values_list(*contadores.CAMPOS_FILA))
+        Solicitud.objects.filter(pk__in=[s.pk for s in solicitudes]).update(id_cuadrilla=self.cuadrilla)
+        contadores.aplicar_actualizacion(filas, 'id_cuadrilla_id', self.cuadrilla.pk)
+        self.assertEqual(contadores.obtener('cuadrilla_abiertas'), {self.cuadrilla.pk: 4})
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_organizacion_y_reconstruir(self):
+        otro = Departamento.objects.create(id_direccion=self.direccion, usuario=self.user, nombre_departamento='Aseo')
+        self.cuadrilla.departamento = otro
+        self.cuadrilla.save()
+        self.assertEqual(contadores.obtener('direccion_departamentos'), {self.direccion.pk: 2})
+        self.assertEqual(contadores.obtener('departamento_cuadrillas'), {self.departamento.pk: 0, otro.pk: 1})
+
+        contadores.sumar('direccion_departamentos', self.direccion.pk, 5)
+        self.assertEqual(len(contadores.verificar()), 1)
+        contadores.reconstruir()
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_encuesta_cambia_de_departamento(self):
+        self.crear_solicitud()
+        self.crear_solicitud()
+        self.crear_solicitud(state='Bloqueado')
+        otro = Departamento.objects.create(id_direccion=self.direccion, usuario=self.user, nombre_departamento='Aseo')
+        self.encuesta.id_departamento = otro
+        self.encuesta.save()
+        self.assertEqual(contadores.obtener('departamento_abiertas'), {self.departamento.pk: 0, otro.pk: 2})
+        self.assertEqual(contadores.verificar(), [])
+
+    def test_renombrar_estado(self):
+        self.crear_solicitud(id_cuadrilla=self.cuadrilla)
+        # Renombrar sin cambiar si es cerrado no recalcula
+        with mock.patch.object(contadores, 'reconstruir') as reconstruir:
+            self.creada.nombre_estado = 'Ingresada'
+            self.creada.save()
+        reconstruir.assert_not_called()
+
+        self.creada.nombre_estado = 'Resuelta'
+        self.creada.save()
+        self.assertEqual(contadores.obtener('cuadrilla_abiertas').get(self.cuadrilla.pk, 0), 0)
+        self.assertEqual(contadores.verificar(), [])
+
+
+class AutocompletarTest(TestCase):
+    """ Búsqueda por prefijo sobre columnas normalizadas y widget que solo renderiza lo elegido. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jperez', first_name='José', last_name='Pérez')
+        direccion = Direccion.objects.create(usuario=cls.user, nombre_direccion='Obras')
+        departamento = Departamento.objects.create(id_direccion=direccion, usuario=cls.user, nombre_departamento='Vialidad')
+        cls.cuadrillas = [
+            Cuadrilla.objects.create(nombre_cuadrilla=nombre, departamento=departamento, jefe=cls.user)
+            for nombre in ('Ñandú Norte', 'Ñandú Sur', 'Árboles', 'Baches')
+        ]
+
+    def test_prefijo_sin_tildes_y_con_limite(self):
+        self.assertEqual(self.cuadrillas[0].nombre_normalizado, 'nandu norte')
+        resultados = AMBITOS['cuadrillas'].buscar('ÑANDU', limite=10)
+        self.assertEqual([r['id'] for r in resultados], [self.cuadrillas[0].pk, self.cuadrillas[1].pk])
+        self.assertEqual(resultados[0]['texto'], 'Ñandú Norte (Vialidad) - 0 abiertas')
+        self.assertEqual(len(AMBITOS['cuadrillas'].buscar('', limite=3)), 3)
+        self.assertEqual(AMBITOS['cuadrillas'].buscar('arb')[0]['id'], self.cuadrillas[2].pk)
+
+    def test_usuario_busqueda_sigue_al_user(self):
+        self.assertEqual(UsuarioBusqueda.objects.get(user=self.user).nombre, 'jose perez')
+        self.user.last_name = 'Muñoz'
+        self.user.save()
+        self.assertEqual(UsuarioBusqueda.objects.get(user=self.user).nombre, 'jose munoz')
+        # Guardar solo el last_login (en cada inicio de sesión) no toca el índice
+        with self.assertNumQueries(1):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+
+    def test_widget_solo_renderiza_la_opcion_elegida(self):
+        html = str(SolicitudForm(initial={'id_cuadrilla': self.cuadrillas[1].pk})['id_cuadrilla'])
+        self.assertIn('data-autocompletar="', html)
+        self.assertIn('Ñandú Sur', html)
+        self.assertNotIn('Ñandú Norte', html)
+        self.assertNotIn('Baches', html)
+
+
+class GenerarDatosBenchmarkTest(TestCase):
+    """ El generador deja datos consistentes y el benchmark recorre todas las vistas. """
+
+    def test_generar_y_medir(self):
+        call_command(
+            'generar_datos', solicitudes=60, usuarios=30, direcciones=1, departamentos=2, cuadrillas=3,
+            respuestas_por_solicitud=2, lote=25, stdout=StringIO(),
+        )
+        self.assertEqual(Solicitud.objects.count(), 60)
+        self.assertEqual(Respuesta.objects.count(), 120)
+        self.assertEqual(SolicitudBusqueda.objects.count(), 60)
+        self.assertEqual(UsuarioBusqueda.objects.filter(username__startswith='gen_').count(), 30)
+        self.assertEqual(contadores.verificar(), [])
+
+        resultados = benchmark.ejecutar(repeticiones=1, calentamiento=0)
+        self.assertEqual(set(resultados), {caso.nombre for caso in benchmark.CASOS})
+        for nombre, resultado in resultados.items():
+            self.assertEqual(resultado.get('status'), 200, f'{nombre}: {resultado}')
+            self.assertGreater(resultado['consultas'], 0)
+
+
+class InstrumentacionSQLTest(TestCase):
+    """ Formas de consulta y detección de N+1 del middleware. """
+
+    def setUp(self):
+        instrumentacion.reiniciar_resumen()
+
+    def test_forma_consulta_ignora_valores(self):
+        self.assertEqual(
+            instrumentacion.forma_consulta("SELECT * FROM t WHERE id IN (%s, %s) AND x = 'a'  AND n = 3"),
+            instrumentacion.forma_consulta("SELECT * FROM t WHERE id IN (%s) AND x = 'b' AND n = 10"),
+        )
+
+    def test_middleware_detecta_n_mas_uno(self):
+        usuarios = [User.objects.create_user(f'n1_{n}') for n in range(6)]
+
+        def vista(request):
+            for usuario in usuarios:
+                User.objects.get(pk=usuario.pk)
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        request.resolver_match = mock.Mock(view_name='vista_prueba')
+        with mock.patch.object(instrumentacion, 'SQL_INSTRUMENTACION', True), self.assertLogs('core.sql', 'WARNING'):
+            respuesta = InstrumentacionSQLMiddleware(vista)(request)
+
+        self.assertIn('6 consultas', respuesta['Server-Timing'])
+        fila, = instrumentacion.resumen_vistas()
+        self.assertEqual((fila['vista'], fila['consultas_max'], fila['requests_n1']), ('vista_prueba', 6, 1))
+
+
+class MetricasTest(TestCase):
+    """ Histogramas por vista sumados entre los archivos de varios procesos. """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        parche = mock.patch.object(metricas, 'METRICAS_DIR', self.directorio)
+        parche.start()
+        self.addCleanup(parche.stop)
+        metricas._series.clear()
+        self.addCleanup(metricas._series.clear)
+
+    def test_exposicion_suma_procesos(self):
+        metricas.registrar_request('main_requests', 'GET', 200, 0.03, 2048, 4)
+        metricas.registrar_request('main_requests', 'GET', 500, 2.0, 100, 1)
+        # Archivo de otro worker (vivo)
+        self.archivo_worker(f'metricas_{os.getppid()}_otro.json', 3)
+
+        texto = metricas.exposicion()
+        self.assertIn('cim_requests_total{vista="main_requests",metodo="GET",status="200"} 4', texto)
+        self.assertIn('cim_errores_total{vista="main_requests",clase="5xx"} 1', texto)
+        self.assertIn('cim_request_duracion_segundos_bucket{vista="main_requests",metodo="GET",le="0.05"} 1', texto)
+        self.assertIn('cim_request_duracion_segundos_bucket{vista="main_requests",metodo="GET",le="+Inf"} 2', texto)
+        self.assertIn('cim_request_consultas_sql_sum{vista="main_requests"} 5', texto)
+        self.assertIn(f'metricas_{os.getpid()}_{metricas._instancia}.json', os.listdir(self.directorio))
+
+    def archivo_worker(self, nombre, cantidad):
+        with open(os.path.join(self.directorio, nombre), 'w') as archivo:
+            json.dump([['cim_requests_total', [['vista', 'main_requests'], ['metodo', 'GET'], ['status', '200']], [cantidad]]], archivo)
+
+    @skipUnless(metricas.fcntl is not None, 'La compactación usa fcntl')
+    def test_compacta_procesos_terminados(self):
+        self.archivo_worker('metricas_999998_a.json', 2)
+        self.archivo_worker('metricas_999999_b.json', 3)
+        serie = 'cim_requests_total{vista="main_requests",metodo="GET",status="200"}'
+        with mock.patch.object(metricas, '_proceso_vivo', lambda pid: pid != 999998):
+            self.assertIn(f'{serie} 5', metricas.exposicion())
+            self.assertEqual(sorted(os.listdir(self.directorio)), ['.bloqueo', 'metricas_999999_b.json', metricas.ARCHIVO_FINALIZADOS])
+
+        # Otro worker termina: se suma a los ya compactados y el total no retrocede
+        with mock.patch.object(metricas, '_proceso_vivo', lambda pid: False):
+            self.assertIn(f'{serie} 5', metricas.exposicion())
+            self.assertEqual(metricas.compactar(), 0)
+        self.assertEqual(sorted(os.listdir(self.directorio)), ['.bloqueo', metricas.ARCHIVO_FINALIZADOS])
+
+    def test_vista_sin_rol_middleware(self):
+        Group.objects.create(pk=GRUPO_ADMIN, name='Admin')
+        admin = User.objects.create_user('admin_metricas')
+        Profile.objects.create(user=admin, group_id=GRUPO_ADMIN)
+        sin_perfil = User.objects.create_user('sin_perfil_metricas')
+        for usuario, status in ((admin, 200), (sin_perfil, 403)):
+            invalidar_rol(usuario.pk)
+            request = RequestFactory().get('/metricas')
+            request.user = usuario
+            self.assertEqual(views.metricas_prometheus(request).status_code, status)
+
+
+async def _vista_async(request):
+    return HttpResponse(str(await User.objects.acount()))
+
+
+async def _vista_async_tres(request):
+    for _ in range(3):
+        await User.objects.acount()
+        await asyncio.sleep(0)  # Intercala sus consultas con las de otros requests
+    return HttpResponse('ok')
+
+
+# URLs para MiddlewareAsgiTest (ROOT_URLCONF='core.tests')
+urlpatterns = [
+    path('async/', _vista_async, name='vista_async'),
+    path('async/tres/', _vista_async_tres, name='vista_async_tres'),
+]
+
+
+@override_settings(ROOT_URLCONF='core.tests', MIDDLEWARE=[
+    'core.middleware.MetricasMiddleware', 'core.middleware.InstrumentacionSQLMiddleware',
+])
+class MiddlewareAsgiTest(TestCase):
+    """ Bajo ASGI, con una vista async, los middlewares cuentan solo las consultas de su request. """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        for parche in (
+            mock.patch.object(metricas, 'METRICAS_DIR', directorio.name),
+            mock.patch.object(instrumentacion, 'SQL_INSTRUMENTACION', True),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+        metricas._series.clear()
+        self.addCleanup(metricas._series.clear)
+        instrumentacion.reiniciar_resumen()
+        self.addCleanup(instrumentacion.reiniciar_resumen)
+
+    async def test_consultas_de_vista_async(self):
+        respuesta = await AsyncClient().get('/async/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('desc="1 consultas"', respuesta['Server-Timing'])
+        consultas = metricas._series[('cim_request_consultas_sql', (('vista', 'vista_async'),))]
+        self.assertEqual(consultas[-2], 1)
+
+    @override_settings(MIDDLEWARE=['core.middleware.MetricasMiddleware'])
+    async def test_metricas_async_cuenta_por_request(self):
+        self.assertTrue(iscoroutinefunction(MetricasMiddleware(_vista_async)))
+        cliente = AsyncClient()
+        respuestas = await asyncio.gather(cliente.get('/async/tres/'), cliente.get('/async/'), cliente.get('/async/tres/'))
+        self.assertEqual([respuesta.status_code for respuesta in respuestas], [200, 200, 200])
+        # Requests simultáneos: cada uno suma solo sus consultas
+        for vista, consultas in (('vista_async', 1), ('vista_async_tres', 6)):
+            serie = metricas._series[('cim_request_consultas_sql', (('vista', vista),))]
+            self.assertEqual(serie[-2], consultas)
+
+
+class VistasAsyncTest(TestCase):
+    """ Las versiones async del dashboard, la API y role_required responden igual que las síncronas. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin_async')
+        direccion = Direccion.objects.create(usuario=cls.user, nombre_direccion='Obras')
+        departamento = Departamento.objects.create(id_direccion=direccion, usuario=cls.user, nombre_departamento='Vialidad')
+        tipo = TipoEncuesta.objects.create(nombre_tipo='Reclamo')
+        cls.encuestas = [
+            Encuesta.objects.create(id_departamento=departamento, id_tipo_encuesta=tipo, titulo=f'E{i}', descripcion='d')
+            for i in range(3)
+        ]
+        creada = EstadoSolicitud.objects.create(nombre_estado='Creada')
+        for i in range(4):
+            Solicitud.objects.create(id_encuesta=cls.encuestas[0], id_territorial=cls.user, id_estado=creada, titulo=f'S{i}')
+
+    def request(self, ruta):
+        request = AsyncRequestFactory().get(ruta)
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        return request
+
+    async def test_resumen_async_igual_al_sincrono(self):
+        sincrono = await sync_to_async(dashboard.calcular_resumen)()
+        asincrono = await dashboard.acalcular_resumen()
+        self.assertEqual(asincrono, sincrono)
+        self.assertEqual(len(asincrono['incidencias_recientes']), 4)
+
+    async def test_api_async_igual_a_la_sincrona(self):
+        recurso = api.RECURSOS['encuestas']
+        sincrona = await sync_to_async(api.listar)(self.request('/api/encuestas/?limite=2'), recurso)
+        asincrona = await api.alistar(self.request('/api/encuestas/?limite=2'), recurso)
+        self.assertEqual(json.loads(asincrona.content), json.loads(sincrona.content))
+        self.assertEqual(asincrona['ETag'], sincrona['ETag'])
+
+        pk = self.encuestas[1].pk
+        detalle = await api.adetalle(self.request(f'/api/encuestas/{pk}/?fields=id,tipo_nombre'), recurso, pk)
+        self.assertEqual(json.loads(detalle.content), {'id': pk, 'tipo_nombre': 'Reclamo'})
+        self.assertIsNone(await api.adetalle(self.request('/api/encuestas/0/'), recurso, 0))
+
+    async def test_role_required_en_vista_async(self):
+        @role_required(GRUPO_ADMIN, redirect_url='home', mensaje=None)
+        async def vista(request):
+            return HttpResponse('ok')
+
+        with mock.patch('core.roles.aresolver_rol', return_value=Rol(GRUPO_ADMIN)):
+            respuesta = await vista(self.request('/'))
+        self.assertEqual(respuesta.content, b'ok')
+        with mock.patch('core.roles.aresolver_rol', return_value=Rol(GRUPO_TERRITORIAL)):
+            respuesta = await vista(self.request('/'))
+        self.assertEqual(respuesta.status_code, 302)
+
+
+class DashboardCacheTest(TestCase):
+    """ El resumen cacheado se invalida al crear usuarios, pero no en cada inicio de sesión. """
+
+    def test_invalidacion_por_usuarios(self):
+        dashboard.invalidar_resumen()
+        self.assertEqual(dashboard.obtener_resumen()['total_usuarios'], 0)
+        usuario = User.objects.create_user('nuevo_dashboard')
+        self.assertEqual(dashboard.obtener_resumen()['total_usuarios'], 1)
+
+        usuario.last_login = usuario.date_joined
+        usuario.save(update_fields=['last_login'])
+        self.assertIsNotNone(cache.get(dashboard.CLAVE_CACHE_DASHBOARD))
+        usuario.delete()
+        self.assertIsNone(cache.get(dashboard.CLAVE_CACHE_DASHBOARD))
+
+
+class RoleRequiredTest(TestCase):
+    """ role_required con y sin RolMiddleware: el rol se resuelve una vez y se cachea. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Group.objects.create(pk=GRUPO_ADMIN, name='Admin')
+        Group.objects.create(pk=GRUPO_TERRITORIAL, name='Territorial')
+        cls.admin = User.objects.create_user('admin_roles')
+        Profile.objects.create(user=cls.admin, group_id=GRUPO_ADMIN)
+        cls.territorial = User.objects.create_user('territorial_roles')
+        Profile.objects.create(user=cls.territorial, group_id=GRUPO_TERRITORIAL)
+        cls.sin_perfil = User.objects.create_user('sin_perfil_roles')
+
+    def setUp(self):
+        for usuario in (self.admin, self.territorial, self.sin_perfil):
+            invalidar_rol(usuario.pk)
+
+    def request(self, usuario, middleware=False):
+        request = RequestFactory().get('/')
+        request.user = usuario
+        request._messages = CookieStorage(request)
+        if middleware:
+            RolMiddleware(lambda request: None)(request)
+        return request
+
+    def test_sin_middleware(self):
+        vista = role_required(GRUPO_ADMIN, redirect_url='home', mensaje='Sin permiso.')(lambda request: HttpResponse('ok'))
+        request = self.request(self.admin)
+        self.assertFalse(hasattr(request, 'role'))
+        self.assertEqual(vista(request).content, b'ok')
+        self.assertTrue(request.role.es_admin)
+
+        respuesta = vista(self.request(self.territorial))
+        self.assertEqual((respuesta.status_code, respuesta.url), (302, reverse('home')))
+        self.assertEqual(vista(self.request(self.sin_perfil)).url, reverse('logout'))
+
+    def test_con_middleware_y_cache(self):
+        vista = role_required()(lambda request: HttpResponse('ok'))
+        with self.assertNumQueries(1):
+            self.assertEqual(vista(self.request(self.territorial, middleware=True)).content, b'ok')
+        # Segundo request del mismo usuario: el rol sale de la caché
+        with self.assertNumQueries(0):
+            self.assertEqual(vista(self.request(self.territorial, middleware=True)).content, b'ok')
+        invalidar_rol(self.territorial.pk)
+        with self.assertNumQueries(1):
+            vista(self.request(self.territorial, middleware=True))
+
+
+class ApiTest(TestCase):
+    """ API JSON: paginación por cursor, campos, GET condicional y alcance por rol. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Group.objects.create(pk=GRUPO_ADMIN, name='Admin')
+        Group.objects.create(pk=GRUPO_TERRITORIAL, name='Territorial')
+        cls.admin = User.objects.create_user('admin_api')
+        Profile.objects.create(user=cls.admin, group_id=GRUPO_ADMIN)
+        cls.territorial = User.objects.create_user('territorial_api')
+        Profile.objects.create(user=cls.territorial, group_id=GRUPO_TERRITORIAL)
+        direccion = Direccion.objects.create(usuario=cls.admin, nombre_direccion='Obras')
+        departamento = Departamento.objects.create(id_direccion=direccion, usuario=cls.admin, nombre_departamento='Vialidad')
+        tipo = TipoEncuesta.objects.create(nombre_tipo='Reclamo')
+        encuesta = Encuesta.objects.create(id_departamento=departamento, id_tipo_encuesta=tipo, titulo='Baches', descripcion='d')
+        creada = EstadoSolicitud.objects.create(nombre_estado='Creada')
+        cls.solicitudes = [
+            Solicitud.objects.create(
+                id_encuesta=encuesta, id_estado=creada, titulo=f'S{i}',
+                id_territorial=cls.territorial if i < 2 else cls.admin,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        for usuario in (self.admin, self.territorial):
+            invalidar_rol(usuario.pk)
+        self.client.force_login(self.admin)
+
+    def lista(self, etag=None, **parametros):
+        cabeceras = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('api_lista', args=['solicitudes']), parametros, headers=cabeceras)
+
+    def test_cursor_recorre_todas(self):
+        ids, parametros = [], {'limite': 2}
+        while True:
+            pagina = self.lista(**parametros).json()
+            self.assertEqual(pagina['total'], 5)
+            ids += [fila['id'] for fila in pagina['resultados']]
+            if not pagina['siguiente']:
+                break
+            parametros['cursor'] = pagina['siguiente']
+        self.assertEqual(ids, [s.pk for s in self.solicitudes])
+        self.assertEqual(self.lista(cursor='no-es-un-cursor').status_code, 400)
+
+    def test_campos(self):
+        fila = self.lista(fields='id,estado_nombre', limite=1).json()['resultados'][0]
+        self.assertEqual(fila, {'id': self.solicitudes[0].pk, 'estado_nombre': 'Creada'})
+        respuesta = self.lista(fields='id,clave')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('clave', respuesta.json()['error'])
+
+    def test_no_modificado(self):
+        etag = self.lista()['ETag']
+        self.assertEqual(self.lista(etag=etag).status_code, 304)
+        detalle = reverse('api_detalle', args=['solicitudes', self.solicitudes[0].pk])
+        etag_detalle = self.client.get(detalle)['ETag']
+        self.assertEqual(self.client.get(detalle, HTTP_IF_NONE_MATCH=etag_detalle).status_code, 304)
+
+        # Un cambio o una eliminación cambian la versión
+        self.solicitudes[0].titulo = 'Cambiada'
+        self.solicitudes[0].save()
+        self.assertEqual(self.lista(etag=etag).status_code, 200)
+        self.assertEqual(self.client.get(detalle, HTTP_IF_NONE_MATCH=etag_detalle).status_code, 200)
+        etag = self.lista()['ETag']
+        self.solicitudes[4].delete()
+        self.assertEqual(self.lista(etag=etag).status_code, 200)
+
+    def test_alcance_por_rol(self):
+        self.client.force_login(self.territorial)
+        pagina = self.lista().json()
+        self.assertEqual([fila['id'] for fila in pagina['resultados']], [s.pk for s in self.solicitudes[:2]])
+        self.assertEqual(pagina['total'], 2)
+        ajena = reverse('api_detalle', args=['solicitudes', self.solicitudes[3].pk])
+        self.assertEqual(self.client.get(ajena).status_code, 404)
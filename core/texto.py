@@ -0,0 +1,26 @@
+# core/texto.py
+import unicodedata
+
+
+def normalizar(texto):
+    """ Minúsculas y sin tildes: 'Pérez Ñuñoa' -> 'perez nunoa'. """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+class NormalizadoMixin:
+    """
+    Modelo con columnas normalizadas (indexadas para el autocompletado):
+    CAMPOS_NORMALIZADOS = {campo_origen: campo_normalizado}, recalculados en save().
+    """
+    CAMPOS_NORMALIZADOS = {}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        for origen, destino in self.CAMPOS_NORMALIZADOS.items():
+            setattr(self, destino, normalizar(getattr(self, origen)))
+            if update_fields is not None and origen in update_fields:
+                update_fields = {*update_fields, destino}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
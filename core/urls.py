@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path #importa el metodo path
 from core import views #improta los metodos de que se implementan en el views,py de este directorio
 '''
@@ -7,8 +8,19 @@ parametros el primero indica el como se llamara desde el navegador, se deja en b
 la pagina de inicio, el segundo parametro indica que función del views que importamos en la línea 3
 usaremos para la url consultada, esta debe existir, el tercer parametro el nombre que le daremos
 '''
+# Con VISTAS_ASYNC = True (despliegue ASGI) el dashboard y la API usan sus versiones async
+VISTAS_ASYNC = getattr(settings, 'VISTAS_ASYNC', False)
+
 core_urlpatterns = [
     path('', views.home, name='home'),    
     path('check_profile', views.check_profile, name='check_profile'), 
-    path('main_admin', views.main_admin, name='main_admin'),     
+    path('main_admin', views.main_admin_async if VISTAS_ASYNC else views.main_admin, name='main_admin'),     
+    path('autocompletar/<slug:ambito>/', views.autocompletar, name='autocompletar'),
+    # API JSON de solo lectura (ver core/api.py)
+    path('api/<slug:recurso>/', views.api_lista_async if VISTAS_ASYNC else views.api_lista, name='api_lista'),
+    path('api/<slug:recurso>/<int:pk>/', views.api_detalle_async if VISTAS_ASYNC else views.api_detalle, name='api_detalle'),
+    # Consultas SQL por vista y N+1 (ver core/instrumentacion.py)
+    path('sql-resumen/', views.sql_resumen, name='sql_resumen'),
+    # Métricas en formato Prometheus (ver core/metricas.py)
+    path('metricas', views.metricas_prometheus, name='metricas'),
     ]
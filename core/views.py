@@ -1,18 +1,23 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from django.conf import settings #importa el archivo settings
 from django.contrib import messages #habilita la mesajería entre vistas
 from django.contrib.auth.decorators import login_required #habilita el decorador que se niega el acceso a una función si no se esta logeado
-from django.contrib.auth.models import Group, User # importa los models de usuarios y grupos
+from django.contrib.auth.models import Group # importa los models de usuarios y grupos
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator #permite la paqinación
 from django.db.models import Avg, Count, Q #agrega funcionalidades de agregación a nuestros QuerySets
 from django.http import (HttpResponse, HttpResponseBadRequest,
-                         HttpResponseNotFound, HttpResponseRedirect) #Salidas alternativas al flujo de la aplicación se explicará mas adelante
+                         HttpResponseNotFound, HttpResponseRedirect, JsonResponse) #Salidas alternativas al flujo de la aplicación se explicará mas adelante
 from django.shortcuts import redirect, render #permite renderizar vistas basadas en funciones o redireccionar a otras funciones
 from django.template import RequestContext # contexto del sistema
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.csrf import csrf_exempt #decorador que nos permitira realizar conexiones csrf
+from django.views.decorators.http import require_GET, require_http_methods
 
-from registration.models import Profile #importa el modelo profile, el que usaremos para los perfiles de usuarios
-from requests.models import Solicitud
+from . import api, instrumentacion, metricas
+from .autocompletar import AMBITOS, AUTOCOMPLETAR_LIMITE
+from .dashboard import aobtener_resumen, obtener_resumen
+from .roles import GRUPO_ADMIN, obtener_rol, role_required
 
 # Create your views here.
 def home(request):
@@ -25,12 +30,11 @@ def pre_check_profile(request):
 
 @login_required
 def check_profile(request):  
-    try:
-        profile = Profile.objects.filter(user_id=request.user.id).get()    
-    except:
+    rol = obtener_rol(request)
+    if not rol.tiene_perfil:
         messages.add_message(request, messages.INFO, 'Hubo un error con su usuario, por favor contactese con los administradores')              
         return redirect('login')
-    if profile.group_id == 1:        
+    if rol.es_admin:        
         return redirect('main_admin')
     else:
         return redirect('logout')
@@ -52,47 +56,117 @@ def main_admin(request):
 """
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def main_admin(request):  
+    # ===== CONTADORES DEL DASHBOARD =====
+    # Conteos por estado desde los contadores precalculados (core.Contador), con el
+    # resumen cacheado e invalidado por señales (ver core/dashboard.py)
+    context = obtener_resumen()
+
+    template_name = 'core/main_admin.html'
+    return render(request, template_name, context)
+
+@login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
+async def main_admin_async(request):
+    """ main_admin para ASGI (ver VISTAS_ASYNC en core/urls.py): las consultas del resumen van en paralelo. """
+    context = await aobtener_resumen()
+    # Los context processors y la plantilla son síncronos
+    return await sync_to_async(render)(request, 'core/main_admin.html', context)
+
+@login_required
+@role_required()
+def autocompletar(request, ambito):
+    """ JSON con los primeros objetos del ámbito cuyo nombre empieza con ?q= (ver core/autocompletar.py). """
+    if ambito not in AMBITOS:
+        return JsonResponse({'error': 'Ámbito de autocompletado desconocido.'}, status=404)
     try:
-        profile = Profile.objects.filter(user_id=request.user.id).get()    
-    except:
-        messages.add_message(request, messages.INFO, 'Hubo un error con su usuario, por favor contactese con los administradores')              
-        return redirect('login')
+        limite = min(int(request.GET.get('limite', AUTOCOMPLETAR_LIMITE)), AUTOCOMPLETAR_LIMITE)
+    except ValueError:
+        limite = AUTOCOMPLETAR_LIMITE
+    return JsonResponse({'resultados': AMBITOS[ambito].buscar(request.GET.get('q', ''), max(limite, 1))})
 
-    if profile.group_id == 1: 
-        # ===== CONTADORES DEL DASHBOARD =====
-        total_usuarios = User.objects.count()
+# ===================================================================
+# API JSON de solo lectura (ver core/api.py)
+# ===================================================================
 
-        incidencias_creadas = Solicitud.objects.filter(
-            id_estado__nombre_estado__in=['Abierta', 'Creada']
-        ).count()
+def _recurso_api(nombre):
+    recurso = api.RECURSOS.get(nombre)
+    if recurso is None:
+        raise api.ErrorApi(f"Recurso desconocido. Disponibles: {', '.join(api.RECURSOS)}.")
+    return recurso
 
-        incidencias_derivadas = Solicitud.objects.filter(
-            id_estado__nombre_estado='Derivada'
-        ).count()
+@login_required
+@role_required()
+@require_GET
+def api_lista(request, recurso):
+    try:
+        return api.listar(request, _recurso_api(recurso))
+    except api.ErrorApi as error:
+        return JsonResponse({'error': str(error)}, status=400)
 
-        incidencias_rechazadas = Solicitud.objects.filter(
-            id_estado__nombre_estado='Rechazada'
-        ).count()
+@login_required
+@role_required()
+@require_GET
+def api_detalle(request, recurso, pk):
+    try:
+        respuesta = api.detalle(request, _recurso_api(recurso), pk)
+    except api.ErrorApi as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if respuesta is None:
+        return JsonResponse({'error': 'No encontrado.'}, status=404)
+    return respuesta
 
-        incidencias_finalizadas = Solicitud.objects.filter(
-            id_estado__nombre_estado__in=['Finalizada', 'Resuelta', 'Validada']
-        ).count()
+@login_required
+@role_required()
+@require_GET
+async def api_lista_async(request, recurso):
+    try:
+        return await api.alistar(request, _recurso_api(recurso))
+    except api.ErrorApi as error:
+        return JsonResponse({'error': str(error)}, status=400)
 
-        # Últimas incidencias creadas (máximo 5)
-        incidencias_recientes = Solicitud.objects.order_by('-created')[:5]
+@login_required
+@role_required()
+@require_GET
+async def api_detalle_async(request, recurso, pk):
+    try:
+        respuesta = await api.adetalle(request, _recurso_api(recurso), pk)
+    except api.ErrorApi as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if respuesta is None:
+        return JsonResponse({'error': 'No encontrado.'}, status=404)
+    return respuesta
 
-        context = {
-            'total_usuarios': total_usuarios,
-            'incidencias_creadas': incidencias_creadas,
-            'incidencias_derivadas': incidencias_derivadas,
-            'incidencias_rechazadas': incidencias_rechazadas,
-            'incidencias_finalizadas': incidencias_finalizadas,
-            'incidencias_recientes': incidencias_recientes,
-        }
+# ===================================================================
+# Instrumentación SQL (ver core/instrumentacion.py)
+# ===================================================================
 
-        template_name = 'core/main_admin.html'
-        return render(request, template_name, context)
+@login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_admin', mensaje='No tienes permiso para ver la instrumentación SQL.')
+@require_http_methods(['GET', 'POST'])
+def sql_resumen(request):
+    """ Consultas por vista de los últimos requests de este proceso; POST reinicia el resumen. """
+    if request.method == 'POST':
+        instrumentacion.reiniciar_resumen()
+        messages.success(request, 'Resumen de consultas reiniciado.')
+        return redirect('sql_resumen')
+    return render(request, 'core/sql_resumen.html', {
+        'activa': instrumentacion.SQL_INSTRUMENTACION,
+        'umbral': instrumentacion.SQL_N1_UMBRAL,
+        'ventana': instrumentacion.SQL_RESUMEN_VENTANA,
+        'filas': instrumentacion.resumen_vistas(),
+    })
 
-    else:
-        return redirect('logout')
+# ===================================================================
+# Métricas para Prometheus (ver core/metricas.py)
+# ===================================================================
+
+@require_GET
+def metricas_prometheus(request):
+    """ Métricas de todos los procesos; con token (METRICAS_TOKEN) o para administradores logueados. """
+    token = metricas.METRICAS_TOKEN
+    autorizado = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not autorizado and not (request.user.is_authenticated and obtener_rol(request).es_admin):
+        return HttpResponse('No autorizado.\n', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(metricas.exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,47 @@
+# core/widgets.py
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    <select> de un ModelChoiceField que solo renderiza la opción elegida (y la
+    vacía). El resto se busca con core/js/autocompletar.js contra la vista
+    'autocompletar' del ámbito indicado (ver core/autocompletar.py).
+    """
+
+    class Media:
+        js = ('core/js/autocompletar.js',)
+
+    def __init__(self, ambito, attrs=None):
+        super().__init__(attrs)
+        self.ambito = ambito
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = reverse('autocompletar', args=[self.ambito])
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        opciones = self.choices
+        field = getattr(opciones, 'field', None)
+        if field is None:
+            # No es un ModelChoiceField: se comporta como un Select normal
+            return super().optgroups(name, value, attrs)
+
+        seleccionadas = []
+        if field.empty_label is not None:
+            seleccionadas.append(('', field.empty_label))
+        valores = [valor for valor in value if valor not in ('', None)]
+        if valores:
+            clave = field.to_field_name or 'pk'
+            try:
+                seleccionadas.extend(opciones.choice(obj) for obj in opciones.queryset.filter(**{f'{clave}__in': valores}))
+            except (ValueError, TypeError, ValidationError):
+                pass  # Valor inválido enviado en el POST: el campo ya muestra el error
+        self.choices = seleccionadas
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = opciones
@@ -2,6 +2,7 @@
 from django import forms
 from .models import Departamento
 from django.contrib.auth.models import User, Group # Import User and Group
+from core.widgets import AutocompleteSelect
 
 class DepartamentoForm(forms.ModelForm):
     # Sobrescribir el campo 'usuario' (renombrado de id_usuario) para filtrar
@@ -11,7 +12,9 @@ class DepartamentoForm(forms.ModelForm):
             # Filtra por el nombre del grupo asignado en el Profile
             profile__group__name='Departamento' 
         ),
-        label="Encargado (Departamento)" # Etiqueta más clara
+        label="Encargado (Departamento)", # Etiqueta más clara
+        # Solo se renderiza el elegido; el resto se busca al escribir (core/autocompletar.py)
+        widget=AutocompleteSelect('encargados_departamento', attrs={'class': 'form-select'})
     )
     
     class Meta:
@@ -21,5 +24,4 @@ class DepartamentoForm(forms.ModelForm):
         widgets = { # Opcional: añadir clases para estilos si usas Bootstrap
             'nombre_departamento': forms.TextInput(attrs={'class': 'form-control'}),
             'id_direccion': forms.Select(attrs={'class': 'form-select'}),
-            'usuario': forms.Select(attrs={'class': 'form-select'}),
         }
\ No newline at end of file
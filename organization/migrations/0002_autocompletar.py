@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+def normalizar_existentes(apps, schema_editor):
+    """ Completa los nombres de departamento normalizados de las filas existentes. """
+    from core.texto import normalizar
+
+    Departamento = apps.get_model('organization', 'Departamento')
+    filas = list(Departamento.objects.only('pk', 'nombre_departamento'))
+    for fila in filas:
+        fila.nombre_normalizado = normalizar(fila.nombre_departamento)
+    Departamento.objects.bulk_update(filas, ['nombre_normalizado'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departamento',
+            name='nombre_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(normalizar_existentes, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 # organization/models.py
 from django.db import models
 from django.contrib.auth.models import User # Importar User de Django
+from core.texto import NormalizadoMixin
 
 class Direccion(models.Model):
     id_direccion = models.AutoField(primary_key=True)
@@ -14,12 +15,16 @@ class Direccion(models.Model):
     def __str__(self):
         return self.nombre_direccion
     
-class Departamento(models.Model):
+class Departamento(NormalizadoMixin, models.Model):
+    CAMPOS_NORMALIZADOS = {'nombre_departamento': 'nombre_normalizado'}
+
     id_departamento = models.AutoField(primary_key=True)
     id_direccion = models.ForeignKey(Direccion, on_delete=models.CASCADE)
      # Cambiar ForeignKey para apuntar a User de Django
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     nombre_departamento = models.CharField(max_length=50, null=False, blank=False)
+    # Para el autocompletado (ver core/autocompletar.py)
+    nombre_normalizado = models.CharField(max_length=50, default='', editable=False, db_index=True)
     state = models.CharField(max_length=20, default='Activo')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
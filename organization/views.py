@@ -7,29 +7,28 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User, Group
 from .models import Direccion, Departamento
 from .forms import DepartamentoForm
-from registration.models import Profile # Para verificar el rol del usuario
+from core.roles import GRUPO_ADMIN, role_required
 from django.core.exceptions import ValidationError
-from django.db.models import Count, Q 
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from core.models import Contador
 from users.models import Cuadrilla  # Importar el modelo Cuadrilla para conteos
 from django import forms
 from users.models import Cuadrilla
 
+def _contador(ambito):
+    """ Valor del contador del ámbito para cada fila (clave = pk), 0 si no existe. """
+    valor = Contador.objects.filter(ambito=ambito, clave=OuterRef('pk')).values('valor')[:1]
+    return Coalesce(Subquery(valor), Value(0))
+
 # ===================================================================
 # CRUD para DIRECCION
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout')
 def main_direccion(request):
     """ Muestra la lista de Direcciones activas y sus conteos (CON BÚSQUEDA). """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: # Solo Admin (ID=1)
-            messages.error(request, 'No tienes permiso para ver esta página.')
-            return redirect('logout') # O a 'main_admin'
-    except Profile.DoesNotExist:
-        messages.error(request, 'Error de perfil de usuario.')
-        return redirect('login')
 
 
     query = request.GET.get('q', None) 
@@ -47,8 +46,9 @@ def main_direccion(request):
 
 
 
+    # Conteo precalculado (core.Contador) en vez de un JOIN + GROUP BY por página
     direccion_listado = direccion_listado_base.annotate(
-        num_departamentos=Count('departamento')
+        num_departamentos=_contador('direccion_departamentos')
     ).order_by('nombre_direccion')
 
 
@@ -66,13 +66,9 @@ def main_direccion(request):
     return render(request, template_name, context)
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_crear(request):
     """ Muestra el formulario para crear una nueva Dirección. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
 
     try:
@@ -86,13 +82,9 @@ def direccion_crear(request):
     return render(request, template_name, {'usuarios': usuarios_direccion})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_guardar(request):
     """ Guarda la nueva Dirección enviada por POST. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     if request.method == 'POST':
         nombre = request.POST.get('nombre_direccion')
@@ -132,13 +124,9 @@ def direccion_guardar(request):
         return redirect('direccion_crear')
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_ver(request, direccion_id):
     """ Muestra los detalles de una Dirección específica y sus Departamentos. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     direccion_data = get_object_or_404(Direccion, pk=direccion_id)
     
@@ -155,13 +143,9 @@ def direccion_ver(request, direccion_id):
 
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_editar(request, direccion_id):
     """ Muestra el formulario para editar una Dirección existente. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     direccion_data = get_object_or_404(Direccion, pk=direccion_id)
 
@@ -179,13 +163,9 @@ def direccion_editar(request, direccion_id):
     })
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_actualizar(request):
     """ Actualiza una Dirección existente enviada por POST. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     if request.method == 'POST':
         direccion_id = request.POST.get('id_direccion')
@@ -239,13 +219,9 @@ def direccion_actualizar(request):
         return redirect('main_direccion')
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_bloquea(request, direccion_id):
     """ Cambia el estado de una Dirección a 'Bloqueado'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     direccion_obj = get_object_or_404(Direccion, pk=direccion_id)
     direccion_obj.state = 'Bloqueado'
@@ -254,27 +230,17 @@ def direccion_bloquea(request, direccion_id):
     return redirect('main_direccion')
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def direccion_list_bloqueadas(request):
     """ Muestra la lista de Direcciones bloqueadas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1:
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     direcciones_bloqueadas = Direccion.objects.filter(state='Bloqueado').order_by('nombre_direccion')
     return render(request, 'organization/direccion_list_bloqueadas.html', {'direcciones_bloqueadas': direcciones_bloqueadas})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_desbloquear(request, direccion_id):
     """ Cambia el estado de una Dirección a 'Activo'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     direccion_obj = get_object_or_404(Direccion, pk=direccion_id)
     direccion_obj.state = 'Activo'
@@ -284,13 +250,9 @@ def direccion_desbloquear(request, direccion_id):
     return redirect('direccion_list_bloqueadas')
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def direccion_elimina(request, direccion_id):
     """ Elimina permanentemente una Dirección. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     direccion_obj = get_object_or_404(Direccion, pk=direccion_id)
     nombre_direccion = direccion_obj.nombre_direccion
@@ -304,17 +266,9 @@ def direccion_elimina(request, direccion_id):
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout')
 def main_departamento(request):
     """ Muestra la lista de Departamentos activos (CON BÚSQUEDA Y CONTEOS). """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: # Solo Admin (ID=1)
-            messages.error(request, 'No tienes permiso para ver esta página.')
-            return redirect('logout')
-    except Profile.DoesNotExist:
-        messages.error(request, 'Error de perfil de usuario.')
-        return redirect('login')
 
     query = request.GET.get('q', None)
     
@@ -332,8 +286,8 @@ def main_departamento(request):
     
     # 1. Anotación para la lista (cuántas cuadrillas por depto)
     departamento_listado = departamento_listado_base.annotate(
-        # Usamos 'cuadrilla_set' (el related_name por defecto)
-        num_cuadrillas=Count('cuadrilla') 
+        # Conteo precalculado (core.Contador) en vez de un JOIN + GROUP BY por página
+        num_cuadrillas=_contador('departamento_cuadrillas')
     ).order_by('nombre_departamento')
 
     # 2. Conteo para la tarjeta de resumen (cuántas cuadrillas activas en total)
@@ -351,12 +305,9 @@ def main_departamento(request):
     return render(request, template_name, context)
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_crear(request):
     """ Muestra y procesa el formulario para crear un Departamento. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     if request.method == 'POST':
         form = DepartamentoForm(request.POST)
@@ -387,13 +338,9 @@ def departamento_crear(request):
     return render(request, template_name, {'form': form})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_ver(request, departamento_id):
     """ Muestra los detalles de un Departamento específico y sus cuadrillas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     departamento_data = get_object_or_404(Departamento, pk=departamento_id)
     
@@ -414,13 +361,9 @@ def departamento_ver(request, departamento_id):
 
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_editar(request, departamento_id):
     """ Myectra y procesa el formulario para editar un Departamento. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     departamento = get_object_or_404(Departamento, pk=departamento_id)
     if request.method == 'POST':
@@ -438,13 +381,9 @@ def departamento_editar(request, departamento_id):
     return render(request, template_name, {'form': form, 'departamento': departamento})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_bloquea(request, departamento_id):
     """ Cambia el estado de un Departamento a 'Bloqueado'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     departamento_obj = get_object_or_404(Departamento, pk=departamento_id)
     departamento_obj.state = 'Bloqueado'
@@ -453,27 +392,17 @@ def departamento_bloquea(request, departamento_id):
     return redirect('main_departamento')
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def departamento_list_bloqueados(request):
     """ Muestra la lista de Departamentos bloqueados. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1:
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     departamentos_bloqueados = Departamento.objects.filter(state='Bloqueado').order_by('nombre_departamento')
     return render(request, 'organization/departamento_list_bloqueados.html', {'departamentos_bloqueados': departamentos_bloqueados})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_desbloquear(request, departamento_id):
     """ Cambia el estado de un Departamento a 'Activo'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     departamento_obj = get_object_or_404(Departamento, pk=departamento_id)
     departamento_obj.state = 'Activo'
@@ -492,13 +421,9 @@ def departamento_desbloquear(request, departamento_id):
     return redirect('departamento_list_bloqueados')
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def departamento_elimina(request, departamento_id):
     """ Elimina permanentemente un Departamento. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # --- VERIFICACIÓN POR ID ---
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     departamento_obj = get_object_or_404(Departamento, pk=departamento_id)
     nombre_departamento = departamento_obj.nombre_departamento
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'requests'
+
+    def ready(self):
+        # Registra los receptores de señales (derivados de imágenes, índice de búsqueda, historial)
+        from . import signals  # noqa: F401
@@ -0,0 +1,138 @@
+# requests/archivo.py
+"""
+Archivo de solicitudes cerradas (tablas frías).
+
+Las Solicitudes en un estado de ARCHIVO_ESTADOS desde hace más de
+ARCHIVO_DIAS días se mueven, con sus Respuestas y Multimedia, a
+SolicitudArchivada / RespuestaArchivada / MultimediaArchivada conservando
+la PK. Así las tablas y los índices que recorren los listados diarios solo
+contienen las solicitudes vigentes.
+
+- La fecha de cierre es el inicio de la estadía en el estado actual
+  (SolicitudTiempoEstado.desde); sin ese dato se usa 'updated'.
+- Cada lote se copia y se borra en una transacción. Los borrados no pasan
+  por las señales (serían varias consultas por fila): los contadores se
+  ajustan una vez por lote. Las archivadas siguen sumando en
+  'estado_solicitudes', así el dashboard no cambia al archivar.
+- El historial (SolicitudEvento, SolicitudTiempoEstado) no se mueve: no
+  tiene restricción de FK y se sigue leyendo por id.
+- solicitud_ver busca en el archivo los ids que ya no están en Solicitud.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core import contadores
+from core.dashboard import invalidar_resumen
+from .cargas import ruta_temporal
+from .models import (
+    CargaMultimedia, Multimedia, MultimediaArchivada, Respuesta, RespuestaArchivada, Solicitud,
+    SolicitudArchivada, SolicitudBusqueda, SolicitudFirma, SolicitudTiempoEstado,
+)
+
+ARCHIVO_ESTADOS = getattr(settings, 'ARCHIVO_ESTADOS', ['Finalizada', 'Validada'])
+ARCHIVO_DIAS = getattr(settings, 'ARCHIVO_DIAS', 365)
+ARCHIVO_LOTE = getattr(settings, 'ARCHIVO_LOTE', 200)
+
+
+def _campos(modelo_archivo):
+    # Columnas en común: las del archivo menos 'archivada'
+    return [campo.attname for campo in modelo_archivo._meta.concrete_fields if campo.attname != 'archivada']
+
+
+def archivables(dias=ARCHIVO_DIAS, momento=None):
+    """ QuerySet de Solicitudes cerradas hace más de 'dias' días. """
+    limite = (momento or timezone.now()) - timedelta(days=dias)
+    cierre = SolicitudTiempoEstado.objects.filter(
+        id_solicitud=OuterRef('pk'), id_estado=OuterRef('id_estado'), desde__isnull=False
+    ).values('desde')[:1]
+    return (
+        Solicitud.objects.filter(id_estado__nombre_estado__in=ARCHIVO_ESTADOS)
+        .annotate(cerrada=Coalesce(Subquery(cierre), 'updated'))
+        .filter(cerrada__lt=limite)
+    )
+
+
+def _borrar(queryset):
+    # DELETE directo, sin recorrer las filas para enviar señales ni resolver cascadas:
+    # los dependientes se borran antes, de forma explícita
+    return queryset._raw_delete(queryset.db)
+
+
+def archivar_lote(ids, dias=ARCHIVO_DIAS, momento=None):
+    """ Mueve al archivo las Solicitudes 'ids' que sigan siendo archivables. Retorna cuántas. """
+    momento = momento or timezone.now()
+    with transaction.atomic():
+        # Bloquea las filas y vuelve a aplicar todo el filtro: una solicitud reabierta
+        # (o vuelta a cerrar hace poco) desde que se eligió el lote queda fuera
+        filas = list(
+            archivables(dias, momento).select_for_update(of=('self',))
+            .filter(pk__in=ids)
+            .values_list('pk', *contadores.CAMPOS_FILA)
+        )
+        ids = [fila[0] for fila in filas]
+        if not ids:
+            return 0
+
+        respuestas = Respuesta.objects.filter(id_solicitud__in=ids)
+        multimedia = Multimedia.objects.filter(Q(id_solicitud__in=ids) | Q(id_respuesta__id_solicitud__in=ids))
+        SolicitudArchivada.objects.bulk_create([
+            SolicitudArchivada(archivada=momento, **valores)
+            for valores in Solicitud.objects.filter(pk__in=ids).values(*_campos(SolicitudArchivada))
+        ])
+        RespuestaArchivada.objects.bulk_create(
+            [RespuestaArchivada(**valores) for valores in respuestas.values(*_campos(RespuestaArchivada))],
+            batch_size=1000,
+        )
+        multimedia_ids = []
+        copias = []
+        for valores in multimedia.values(*_campos(MultimediaArchivada)):
+            multimedia_ids.append(valores['id_multimedia'])
+            copias.append(MultimediaArchivada(**valores))
+        MultimediaArchivada.objects.bulk_create(copias, batch_size=1000)
+
+        # Subidas por partes sin terminar: su archivo temporal se borra tras el commit
+        cargas = CargaMultimedia.objects.filter(id_respuesta__id_solicitud__in=ids)
+        temporales = [ruta_temporal(carga) for carga in cargas.filter(state='Activo').only('id_carga')]
+        _borrar(cargas)
+        _borrar(Multimedia.objects.filter(pk__in=multimedia_ids))
+        _borrar(Respuesta.objects.filter(id_solicitud__in=ids))
+        _borrar(SolicitudBusqueda.objects.filter(id_solicitud__in=ids))
+        _borrar(SolicitudFirma.objects.filter(id_solicitud__in=ids))
+        _borrar(Solicitud.objects.filter(pk__in=ids))
+
+        # Las archivadas dejan de estar abiertas (si lo estaban) pero siguen contando por estado
+        deltas = contadores.diferencias([fila[1:] for fila in filas], [], contadores.estados_cerrados())
+        contadores.aplicar({clave: delta for clave, delta in deltas.items() if clave[0] != 'estado_solicitudes'})
+        transaction.on_commit(lambda: _quitar_temporales(temporales))
+        transaction.on_commit(invalidar_resumen)
+    return len(ids)
+
+
+def _quitar_temporales(rutas):
+    for ruta in rutas:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def archivar(dias=ARCHIVO_DIAS, lote=ARCHIVO_LOTE, limite=None, momento=None):
+    """ Archiva por lotes (en orden de id) todas las archivables, o las primeras 'limite'. Retorna cuántas. """
+    momento = momento or timezone.now()
+    total, ultimo = 0, 0
+    while limite is None or total < limite:
+        tamano = lote if limite is None else min(lote, limite - total)
+        # Keyset por id: un lote que no se pudo archivar no se vuelve a intentar en bucle
+        ids = list(archivables(dias, momento).filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:tamano])
+        if not ids:
+            break
+        ultimo = ids[-1]
+        total += archivar_lote(ids, dias, momento)
+    return total
+
@@ -0,0 +1,134 @@
+# requests/asignacion.py
+"""
+Asignación automática de cuadrillas según su carga.
+
+Por cada Departamento se arma un heap de sus cuadrillas activas, ordenado
+por (solicitudes abiertas, id_cuadrilla). La carga inicial sale de los
+contadores precalculados ('cuadrilla_abiertas' en core.Contador), así que
+basta una consulta y no hay que contar filas de Solicitud.
+
+Para asignar se toma la cuadrilla menos cargada y se reinserta con carga + 1
+(O(log k) con k cuadrillas en el departamento). La asignación masiva
+recorre las pendientes por prioridad y antigüedad, de modo que las urgentes
+y las más antiguas se reparten primero entre las cuadrillas más libres. En
+total es O(n log k).
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from core import contadores
+from users.models import Cuadrilla
+from .historial import registrar_cambios
+from .models import Solicitud
+
+# Asignar cuadrilla al crear una solicitud que no la trae (desactivado salvo que se habilite en settings)
+ASIGNACION_AUTOMATICA = getattr(settings, 'ASIGNACION_AUTOMATICA', False)
+ASIGNACION_LOTE = getattr(settings, 'ASIGNACION_LOTE', 500)
+# Orden de atención (menor primero)
+ORDEN_PRIORIDAD = {'alta': 0, 'normal': 1, 'baja': 2}
+
+
+class Planificador:
+    """ Heaps de cuadrillas por departamento, actualizados en memoria a medida que se asigna. """
+
+    def __init__(self, departamentos=None):
+        cuadrillas = Cuadrilla.objects.filter(state='Activo')
+        if departamentos is not None:
+            cuadrillas = cuadrillas.filter(departamento_id__in=departamentos)
+        filas = list(cuadrillas.values_list('pk', 'departamento_id'))
+        cargas = contadores.obtener('cuadrilla_abiertas', [pk for pk, _ in filas])
+        self._heaps = defaultdict(list)
+        for cuadrilla_id, departamento_id in filas:
+            self._heaps[departamento_id].append((cargas.get(cuadrilla_id, 0), cuadrilla_id))
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def siguiente(self, departamento_id):
+        """ Cuadrilla menos cargada del departamento (None si no tiene), sumándole una solicitud. """
+        heap = self._heaps.get(departamento_id)
+        if not heap:
+            return None
+        carga, cuadrilla_id = heap[0]
+        heapq.heapreplace(heap, (carga + 1, cuadrilla_id))
+        return cuadrilla_id
+
+    def cargas(self):
+        """ {id_cuadrilla: solicitudes abiertas} según el estado actual de los heaps. """
+        return {cuadrilla_id: carga for heap in self._heaps.values() for carga, cuadrilla_id in heap}
+
+
+def asignar_cuadrilla(solicitud):
+    """
+    Completa solicitud.id_cuadrilla con la cuadrilla menos cargada del
+    departamento de su encuesta (sin guardar). Devuelve la cuadrilla o None.
+    """
+    departamento_id = solicitud.id_encuesta.id_departamento_id
+    cuadrilla_id = Planificador([departamento_id]).siguiente(departamento_id)
+    if cuadrilla_id is None:
+        return None
+    solicitud.id_cuadrilla = Cuadrilla.objects.get(pk=cuadrilla_id)
+    return solicitud.id_cuadrilla
+
+
+def pendientes():
+    """ Solicitudes abiertas sin cuadrilla, en orden de atención (prioridad y antigüedad). """
+    return (
+        Solicitud.objects.filter(state='Activo', id_cuadrilla__isnull=True)
+        .exclude(id_estado__nombre_estado__in=contadores.ESTADOS_CERRADOS)
+        .annotate(orden_prioridad=Case(
+            *[When(prioridad=prioridad, then=Value(orden)) for prioridad, orden in ORDEN_PRIORIDAD.items()],
+            default=Value(len(ORDEN_PRIORIDAD)), output_field=IntegerField(),
+        ))
+        .order_by('orden_prioridad', 'created', 'pk')
+    )
+
+
+def planificar_pendientes(planificador=None, limite=None):
+    """ Lista de (id_solicitud, id_cuadrilla) para las pendientes, sin escribir nada. """
+    planificador = planificador or Planificador()
+    filas = pendientes().values_list('pk', 'id_encuesta__id_departamento')
+    if limite:
+        filas = filas[:limite]
+    plan = []
+    for solicitud_id, departamento_id in filas.iterator():
+        cuadrilla_id = planificador.siguiente(departamento_id)
+        if cuadrilla_id is not None:
+            plan.append((solicitud_id, cuadrilla_id))
+    return plan
+
+
+def aplicar_plan(plan, usuario=None, lote=ASIGNACION_LOTE):
+    """
+    Escribe el plan en lotes: por lote, un UPDATE por cuadrilla, el historial
+    y los contadores en la misma transacción. Las solicitudes que alguien
+    asignó entretanto se saltan. Devuelve {id_cuadrilla: asignadas}.
+    """
+    asignadas = Counter()
+    cerrados = contadores.estados_cerrados()
+    for inicio in range(0, len(plan), lote):
+        destino = dict(plan[inicio:inicio + lote])
+        ahora = timezone.now()
+        with transaction.atomic():
+            filas = {
+                pk: tuple(fila)
+                for pk, *fila in Solicitud.objects.filter(pk__in=list(destino), id_cuadrilla__isnull=True)
+                .select_for_update(of=('self',)).values_list('pk', *contadores.CAMPOS_FILA)
+            }
+            por_cuadrilla = defaultdict(list)
+            for pk in filas:
+                por_cuadrilla[destino[pk]].append(pk)
+            for cuadrilla_id, ids in por_cuadrilla.items():
+                Solicitud.objects.filter(pk__in=ids).update(id_cuadrilla_id=cuadrilla_id, updated=ahora)
+                asignadas[cuadrilla_id] += len(ids)
+
+            # update() no dispara señales: historial y contadores en lote
+            indice = contadores.CAMPOS_FILA.index('id_cuadrilla_id')
+            registrar_cambios([(pk, 'cuadrilla', None, destino[pk]) for pk in filas], usuario=usuario, momento=ahora)
+            despues = [fila[:indice] + (destino[pk],) + fila[indice + 1:] for pk, fila in filas.items()]
+            contadores.aplicar(contadores.diferencias(filas.values(), despues, cerrados))
+    return asignadas
@@ -0,0 +1,108 @@
+# requests/busqueda.py
+"""
+Búsqueda de texto completo sobre Solicitudes.
+
+Cada Solicitud tiene un SolicitudBusqueda con su título, descripción,
+ubicación y respuestas normalizados (minúsculas, sin tildes), que se
+actualiza al guardar (ver requests/signals.py). Sobre esa tabla:
+
+- SQLite: tabla virtual FTS5 'requests_solicitud_fts' (contenido externo,
+  sincronizada por triggers) y orden por bm25().
+- PostgreSQL: índice GIN sobre to_tsvector('spanish', documento) y orden
+  por ts_rank().
+
+Las tablas e índices se crean en la migración 0006_solicitud_busqueda.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from core.texto import normalizar
+from .models import Solicitud, Respuesta, SolicitudBusqueda
+
+# Tope de resultados rankeados que se consideran (luego se paginan)
+BUSQUEDA_MAX_RESULTADOS = getattr(settings, 'BUSQUEDA_MAX_RESULTADOS', 500)
+
+CAMPOS_BUSQUEDA = ('titulo', 'descripcion', 'ubicacion')
+
+
+def construir_documento(solicitud_id):
+    campos = Solicitud.objects.filter(pk=solicitud_id).values_list(*CAMPOS_BUSQUEDA).first()
+    if campos is None:
+        return None
+    respuestas = Respuesta.objects.filter(id_solicitud_id=solicitud_id).values_list('respuesta', flat=True)
+    return normalizar(' '.join(filter(None, [*campos, *respuestas])))
+
+
+def actualizar_indice(solicitud_id, crear=True):
+    """
+    Recalcula el documento de búsqueda de la Solicitud. Con crear=False solo
+    actualiza un documento existente (p. ej. al borrar respuestas en cascada).
+    """
+    documento = construir_documento(solicitud_id)
+    if documento is None:
+        return
+    actualizadas = SolicitudBusqueda.objects.filter(pk=solicitud_id).update(documento=documento)
+    if not actualizadas and crear:
+        SolicitudBusqueda.objects.create(id_solicitud_id=solicitud_id, documento=documento)
+
+
+def _terminos(texto):
+    # Solo caracteres de palabra: evita inyectar sintaxis de FTS5/tsquery
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def _alcance(columna, queryset):
+    """ Condición 'columna IN (subconsulta)' para filtrar el ranking por un QuerySet de Solicitudes. """
+    if queryset is None:
+        return '', []
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    return f' AND {columna} IN ({sql})', list(params)
+
+
+def buscar_ids(texto, limite=BUSQUEDA_MAX_RESULTADOS, queryset=None):
+    """
+    IDs de Solicitudes que contienen todos los términos (por prefijo), de más a
+    menos relevante. Con 'queryset' el alcance se aplica dentro de la consulta
+    rankeada, antes del LIMIT: el tope cuenta solo resultados visibles.
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return []
+
+    if connection.vendor == 'sqlite':
+        consulta = ' '.join(f'"{t}"*' for t in terminos)
+        alcance, params_alcance = _alcance('rowid', queryset)
+        sql = (
+            'SELECT rowid FROM requests_solicitud_fts '
+            f'WHERE requests_solicitud_fts MATCH %s{alcance} '
+            'ORDER BY bm25(requests_solicitud_fts) LIMIT %s'
+        )
+        params = [consulta, *params_alcance, limite]
+    elif connection.vendor == 'postgresql':
+        consulta = ' & '.join(f'{t}:*' for t in terminos)
+        alcance, params_alcance = _alcance('id_solicitud_id', queryset)
+        sql = (
+            'SELECT id_solicitud_id FROM requests_solicitudbusqueda '
+            f"WHERE to_tsvector('spanish', documento) @@ to_tsquery('spanish', %s){alcance} "
+            "ORDER BY ts_rank(to_tsvector('spanish', documento), to_tsquery('spanish', %s)) DESC LIMIT %s"
+        )
+        params = [consulta, *params_alcance, consulta, limite]
+    else:
+        # Otros motores: sin índice de texto, coincidencia simple sobre el documento
+        busqueda = SolicitudBusqueda.objects.all()
+        if queryset is not None:
+            busqueda = busqueda.filter(id_solicitud__in=queryset.order_by().values('pk'))
+        for termino in terminos:
+            busqueda = busqueda.filter(documento__contains=termino)
+        return list(busqueda.order_by('-id_solicitud').values_list('id_solicitud', flat=True)[:limite])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_solicitudes(queryset, texto, limite=BUSQUEDA_MAX_RESULTADOS):
+    """ Busca solo dentro de un QuerySet (alcance por rol), manteniendo el orden por relevancia. """
+    return buscar_ids(texto, limite, queryset=queryset)
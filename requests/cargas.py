@@ -0,0 +1,179 @@
+# requests/cargas.py
+"""
+Protocolo de subida de multimedia por partes (reanudable).
+
+1. POST  respuesta/<id>/cargas/                -> crea la carga, responde id_carga y recibido=0
+2. PUT   cargas/<id_carga>/  (Upload-Offset: N) -> escribe la parte en el offset N
+   GET   cargas/<id_carga>/                     -> estado; tras un corte el cliente sigue desde 'recibido'
+3. POST  cargas/<id_carga>/finalizar/           -> crea el Multimedia con el archivo ensamblado
+
+Cada parte se copia del stream del request al archivo temporal en bloques
+pequeños, sin pasar por los upload handlers de Django ni cargarla completa
+en memoria.
+
+Las cargas sin actividad en MULTIMEDIA_CARGAS_ABANDONO_HORAS se eliminan con
+el comando 'limpiar_cargas' (ver limpiar_abandonadas).
+"""
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CargaMultimedia, Multimedia
+
+MULTIMEDIA_MAX_BYTES = getattr(settings, 'MULTIMEDIA_MAX_BYTES', 500 * 1024 * 1024)
+MULTIMEDIA_MAX_PARTE = getattr(settings, 'MULTIMEDIA_MAX_PARTE', 8 * 1024 * 1024)
+MULTIMEDIA_CARGAS_DIR = getattr(
+    settings, 'MULTIMEDIA_CARGAS_DIR', os.path.join(tempfile.gettempdir(), 'cargas_multimedia')
+)
+
+MULTIMEDIA_CARGAS_ABANDONO_HORAS = getattr(settings, 'MULTIMEDIA_CARGAS_ABANDONO_HORAS', 48)
+
+_BLOQUE_LECTURA = 64 * 1024
+
+
+class ErrorCarga(Exception):
+    """ Error del protocolo de carga; 'status' es el código HTTP a responder. """
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def ruta_temporal(carga):
+    return os.path.join(MULTIMEDIA_CARGAS_DIR, f'{carga.id_carga}.part')
+
+
+def iniciar_carga(respuesta, usuario, tipo, nombre_archivo, tamano_total, descripcion=None, id_carga=None):
+    """ Crea la carga; 'id_carga' permite que el cliente fije el UUID (clave de idempotencia). """
+    if tamano_total <= 0:
+        raise ErrorCarga('El tamaño del archivo debe ser mayor que cero.')
+    if tamano_total > MULTIMEDIA_MAX_BYTES:
+        raise ErrorCarga(f'El archivo supera el máximo permitido ({MULTIMEDIA_MAX_BYTES} bytes).', status=413)
+    carga = CargaMultimedia(
+        id_respuesta=respuesta,
+        usuario=usuario,
+        tipo=tipo,
+        descripcion=descripcion,
+        nombre_archivo=os.path.basename(nombre_archivo),
+        tamano_total=tamano_total,
+    )
+    if id_carga:
+        carga.id_carga = id_carga
+    carga.save(force_insert=True)
+    os.makedirs(MULTIMEDIA_CARGAS_DIR, exist_ok=True)
+    # Archivo vacío: las partes se escriben con seek al offset indicado
+    open(ruta_temporal(carga), 'wb').close()
+    return carga
+
+
+def escribir_parte(carga, offset, stream, largo):
+    """
+    Copia 'largo' bytes del stream al archivo temporal a partir de 'offset'.
+    Solo se acepta el offset confirmado (carga.recibido); cualquier otro
+    responde 409 para que el cliente retome desde el valor correcto.
+    """
+    if carga.state != 'Activo':
+        raise ErrorCarga('La carga ya fue finalizada.', status=409)
+    if offset != carga.recibido:
+        raise ErrorCarga(f'Offset inválido, se esperaba {carga.recibido}.', status=409)
+    if largo <= 0 or largo > MULTIMEDIA_MAX_PARTE:
+        raise ErrorCarga(f'Cada parte debe tener entre 1 y {MULTIMEDIA_MAX_PARTE} bytes.', status=413)
+    if offset + largo > carga.tamano_total:
+        raise ErrorCarga('La parte excede el tamaño declarado del archivo.', status=413)
+
+    escritos = 0
+    with open(ruta_temporal(carga), 'r+b') as destino:
+        destino.seek(offset)
+        while escritos < largo:
+            bloque = stream.read(min(_BLOQUE_LECTURA, largo - escritos))
+            if not bloque:
+                break
+            destino.write(bloque)
+            escritos += len(bloque)
+    if escritos != largo:
+        # Conexión cortada a mitad de la parte: no se confirma nada
+        raise ErrorCarga('La parte llegó incompleta; reintenta desde el último offset confirmado.', status=400)
+
+    # Confirmar el avance solo si nadie más lo movió mientras tanto ('updated' marca la última actividad)
+    actualizadas = CargaMultimedia.objects.filter(pk=carga.pk, state='Activo', recibido=offset).update(
+        recibido=offset + largo, updated=timezone.now()
+    )
+    if not actualizadas:
+        raise ErrorCarga('La carga fue modificada por otra petición.', status=409)
+    carga.recibido = offset + largo
+    return carga
+
+
+def finalizar_carga(carga):
+    """ Crea el Multimedia de la Respuesta con el archivo ensamblado y borra el temporal. """
+    ruta = ruta_temporal(carga)
+    with transaction.atomic():
+        # UPDATE condicional como candado: de dos finalizaciones simultáneas solo
+        # una pasa de 'Activo' a 'Completada'; la otra espera el commit y recibe 409
+        tomada = CargaMultimedia.objects.filter(
+            pk=carga.pk, state='Activo', recibido=F('tamano_total')
+        ).update(state='Completada')
+        if not tomada:
+            actual = CargaMultimedia.objects.filter(pk=carga.pk).values('state', 'recibido').first()
+            if actual is None or actual['state'] != 'Activo':
+                raise ErrorCarga('La carga ya fue finalizada.', status=409)
+            carga.recibido = actual['recibido']
+            raise ErrorCarga(f'Faltan datos: recibido {carga.recibido} de {carga.tamano_total} bytes.', status=409)
+
+        with open(ruta, 'rb') as archivo:
+            multimedia = Multimedia(
+                id_respuesta_id=carga.id_respuesta_id,
+                tipo=carga.tipo,
+                descripcion=carga.descripcion,
+            )
+            multimedia.archivo.save(carga.nombre_archivo, File(archivo), save=False)
+            multimedia.save()
+        carga.id_multimedia = multimedia
+        carga.state = 'Completada'
+        carga.save(update_fields=['id_multimedia', 'state', 'updated'])
+    _quitar_temporal(ruta)
+    return multimedia
+
+
+def _quitar_temporal(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def limpiar_abandonadas(horas=MULTIMEDIA_CARGAS_ABANDONO_HORAS):
+    """
+    Elimina las cargas 'Activo' sin actividad en 'horas' horas y los .part
+    huérfanos (sin carga) igual de antiguos. Retorna (cargas, archivos) eliminados.
+    """
+    limite = timezone.now() - timedelta(hours=horas)
+    abandonadas = list(
+        CargaMultimedia.objects.filter(state='Activo', updated__lt=limite).values_list('id_carga', flat=True)
+    )
+    # Condición repetida en el DELETE: una parte que llegó entretanto salva la carga
+    CargaMultimedia.objects.filter(pk__in=abandonadas, state='Activo', updated__lt=limite).delete()
+    vigentes = {str(pk) for pk in CargaMultimedia.objects.filter(state='Activo').values_list('id_carga', flat=True)}
+
+    archivos = 0
+    if os.path.isdir(MULTIMEDIA_CARGAS_DIR):
+        antiguedad = time.time() - horas * 3600
+        for nombre in os.listdir(MULTIMEDIA_CARGAS_DIR):
+            ruta = os.path.join(MULTIMEDIA_CARGAS_DIR, nombre)
+            if not nombre.endswith('.part') or nombre[:-len('.part')] in vigentes:
+                continue
+            try:
+                if os.path.getmtime(ruta) >= antiguedad:
+                    continue  # Puede ser una carga recién iniciada (el INSERT va antes que el archivo)
+                os.remove(ruta)
+            except FileNotFoundError:
+                continue
+            archivos += 1
+    return len(abandonadas), archivos
@@ -0,0 +1,98 @@
+# requests/derivados.py
+"""
+Derivados de imágenes (miniatura y mediana) para Multimedia.
+
+Al guardarse un Multimedia de tipo 'imagen' se encola su procesamiento en un
+pool de hilos (ver requests/signals.py), después del commit, para no demorar
+la respuesta de la subida. Las rutas de los derivados quedan en los campos
+'miniatura' y 'mediana' del modelo.
+
+Requiere Pillow; si no está instalado, las imágenes se siguen mostrando con
+el archivo original.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from .models import Multimedia
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow es opcional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor (en px) de cada derivado
+TAMANOS_DERIVADOS = getattr(settings, 'MULTIMEDIA_TAMANOS_DERIVADOS', {'miniatura': 320, 'mediana': 1280})
+DERIVADOS_WORKERS = getattr(settings, 'MULTIMEDIA_DERIVADOS_WORKERS', 2)
+
+_executor = None
+
+
+def _obtener_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DERIVADOS_WORKERS, thread_name_prefix='derivados')
+    return _executor
+
+
+def _formato_salida():
+    """ WebP si Pillow fue compilado con soporte, si no JPEG. """
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def _redimensionar(imagen, lado_maximo, formato):
+    copia = imagen.copy()
+    copia.thumbnail((lado_maximo, lado_maximo))
+    salida = BytesIO()
+    copia.save(salida, formato, quality=80)
+    return ContentFile(salida.getvalue())
+
+
+def generar_derivados(multimedia_id):
+    """ Genera y guarda los derivados de un Multimedia de tipo imagen. """
+    multimedia = Multimedia.objects.filter(pk=multimedia_id, tipo='imagen').first()
+    if multimedia is None or not multimedia.archivo:
+        return
+
+    with multimedia.archivo.open('rb') as original:
+        imagen = Image.open(original)
+        # Las fotos de teléfono traen la orientación en EXIF
+        imagen = ImageOps.exif_transpose(imagen).convert('RGB')
+
+    formato, extension = _formato_salida()
+    base = os.path.splitext(os.path.basename(multimedia.archivo.name))[0]
+    rutas = {}
+    for campo, lado_maximo in TAMANOS_DERIVADOS.items():
+        archivo_campo = getattr(multimedia, campo)
+        archivo_campo.save(f'{base}_{campo}.{extension}', _redimensionar(imagen, lado_maximo, formato), save=False)
+        rutas[campo] = archivo_campo.name
+
+    # update() en vez de save() para no volver a disparar post_save
+    Multimedia.objects.filter(pk=multimedia_id).update(**rutas)
+
+
+def _procesar(multimedia_id):
+    try:
+        generar_derivados(multimedia_id)
+    except Exception:
+        logger.exception('No se pudieron generar los derivados del Multimedia %s', multimedia_id)
+    finally:
+        # El hilo del pool abre su propia conexión a la BD
+        close_old_connections()
+
+
+def encolar_derivados(multimedia):
+    """ Encola la generación de derivados una vez confirmada la transacción. """
+    if Image is None or multimedia.tipo != 'imagen':
+        return
+    multimedia_id = multimedia.pk
+    transaction.on_commit(lambda: _obtener_executor().submit(_procesar, multimedia_id))
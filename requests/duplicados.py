@@ -0,0 +1,163 @@
+# requests/duplicados.py
+"""
+Detección de posibles Solicitudes duplicadas al crearlas.
+
+1. El título y la descripción (sin tildes, en minúsculas) se cortan en
+   shingles de DUPLICADOS_K caracteres.
+2. Con ellos se calcula una firma MinHash de BANDAS * FILAS_POR_BANDA
+   valores, cuya coincidencia estima la similitud de Jaccard.
+3. La firma se divide en bandas (LSH). Cada banda, combinada con la zona
+   (geohash de precisión ZONA_PRECISION) y la semana de creación, es una
+   clave en SolicitudFirma. Dos textos parecidos comparten al menos una
+   banda con alta probabilidad.
+
+Buscar duplicados es entonces un IN sobre claves indexadas. Los pocos
+candidatos se confirman con la similitud de Jaccard exacta.
+"""
+import random
+import re
+import zlib
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .busqueda import normalizar
+from .geo import caja_alrededor, codificar_geohash, parsear_coordenadas, prefijos_para_caja
+from .models import Solicitud, SolicitudFirma
+
+DUPLICADOS_K = 4
+BANDAS = 16
+FILAS_POR_BANDA = 4
+# Similitud de Jaccard mínima para mostrar una solicitud como posible duplicado
+DUPLICADOS_UMBRAL = getattr(settings, 'DUPLICADOS_UMBRAL', 0.5)
+DUPLICADOS_RADIO_M = getattr(settings, 'DUPLICADOS_RADIO_M', 300)
+DUPLICADOS_DIAS = getattr(settings, 'DUPLICADOS_DIAS', 7)
+ZONA_PRECISION = 6
+SIN_ZONA = 'x'
+
+_PRIMO = (1 << 61) - 1
+# Coeficientes fijos: las firmas guardadas deben poder compararse entre procesos
+_aleatorio = random.Random(20240501)
+_PERMUTACIONES = [
+    (_aleatorio.randrange(1, _PRIMO), _aleatorio.randrange(0, _PRIMO))
+    for _ in range(BANDAS * FILAS_POR_BANDA)
+]
+
+
+def shingles(texto):
+    """ Conjunto de hashes de los shingles de caracteres del texto normalizado. """
+    texto = ' '.join(re.findall(r'\w+', normalizar(texto)))
+    if len(texto) <= DUPLICADOS_K:
+        return {zlib.crc32(texto.encode())} if texto else set()
+    return {zlib.crc32(texto[i:i + DUPLICADOS_K].encode()) for i in range(len(texto) - DUPLICADOS_K + 1)}
+
+
+def firma_minhash(conjunto):
+    return [min((a * h + b) % _PRIMO for h in conjunto) for a, b in _PERMUTACIONES]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _texto(titulo, descripcion):
+    return f"{titulo or ''} {descripcion or ''}"
+
+
+def _bandas(firma):
+    for banda in range(BANDAS):
+        valores = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA]
+        yield banda, format(zlib.crc32(repr(valores).encode()), '08x')
+
+
+def _periodo(fecha):
+    return fecha.toordinal() // DUPLICADOS_DIAS
+
+
+def _zona(latitud, longitud):
+    if latitud is None or longitud is None:
+        return SIN_ZONA
+    return codificar_geohash(latitud, longitud, ZONA_PRECISION)
+
+
+def _zonas_cercanas(latitud, longitud):
+    if latitud is None or longitud is None:
+        return [SIN_ZONA]
+    caja = caja_alrededor(latitud, longitud, DUPLICADOS_RADIO_M)
+    return prefijos_para_caja(*caja, precision=ZONA_PRECISION)
+
+
+def _claves(firma, zonas, periodos):
+    return [
+        f'{banda:02d}:{valor}:{zona}:{periodo}'
+        for banda, valor in _bandas(firma) for zona in zonas for periodo in periodos
+    ]
+
+
+def firma_texto(titulo, descripcion):
+    """ Firma MinHash del título y la descripción, o None si no tienen texto. """
+    conjunto = shingles(_texto(titulo, descripcion))
+    return firma_minhash(conjunto) if conjunto else None
+
+
+def claves_solicitud(titulo, descripcion, latitud, longitud, fecha, firma=None):
+    """
+    Claves LSH que se guardan para una Solicitud (una por banda). 'firma'
+    permite reutilizar la de firma_texto() cuando muchas comparten el texto.
+    """
+    firma = firma or firma_texto(titulo, descripcion)
+    if firma is None:
+        return []
+    return _claves(firma, [_zona(latitud, longitud)], [_periodo(fecha)])
+
+
+def actualizar_firmas(solicitud):
+    """ Reemplaza las claves guardadas de la Solicitud. """
+    SolicitudFirma.objects.filter(id_solicitud=solicitud).delete()
+    claves = claves_solicitud(
+        solicitud.titulo, solicitud.descripcion, solicitud.latitud, solicitud.longitud,
+        timezone.localdate(solicitud.created) if solicitud.created else timezone.localdate(),
+    )
+    SolicitudFirma.objects.bulk_create([SolicitudFirma(id_solicitud=solicitud, clave=clave) for clave in claves])
+
+
+def posibles_duplicados(titulo, descripcion, ubicacion=None, latitud=None, longitud=None,
+                        queryset=None, excluir=None, limite=5):
+    """
+    Solicitudes activas de la misma zona y de las últimas semanas con texto
+    parecido: lista de (solicitud, similitud) de mayor a menor similitud.
+    'queryset' limita los candidatos (p. ej. al departamento). De cada una se
+    cargan solo los campos que se muestran para abrirla o descartarla.
+    """
+    conjunto = shingles(_texto(titulo, descripcion))
+    if not conjunto:
+        return []
+    if latitud is None or longitud is None:
+        latitud, longitud = parsear_coordenadas(ubicacion) or (None, None)
+
+    periodo = _periodo(timezone.localdate())
+    claves = _claves(firma_minhash(conjunto), _zonas_cercanas(latitud, longitud), [periodo, periodo - 1])
+    coincidencias = SolicitudFirma.objects.filter(clave__in=claves, id_solicitud__state='Activo')
+    if excluir is not None:
+        coincidencias = coincidencias.exclude(id_solicitud=excluir)
+    # Más bandas en común = más parecidas; se confirman solo las mejores
+    ids = [
+        fila['id_solicitud'] for fila in
+        coincidencias.values('id_solicitud').annotate(bandas=Count('id')).order_by('-bandas')[:limite * 4]
+    ]
+    if not ids:
+        return []
+
+    resultado = []
+    if queryset is None:
+        queryset = Solicitud.objects.all()
+    candidatas = queryset.filter(pk__in=ids).select_related('id_estado').only(
+        'titulo', 'descripcion', 'created', 'id_estado__nombre_estado'
+    )
+    for solicitud in candidatas:
+        similitud = jaccard(conjunto, shingles(_texto(solicitud.titulo, solicitud.descripcion)))
+        if similitud >= DUPLICADOS_UMBRAL:
+            resultado.append((solicitud, similitud))
+    resultado.sort(key=lambda par: par[1], reverse=True)
+    return resultado[:limite]
@@ -0,0 +1,65 @@
+# requests/exportar.py
+"""
+Exportación de Solicitudes con sus respuestas en CSV o NDJSON.
+
+Las filas salen de un único values_list con los JOIN necesarios y se recorren
+con QuerySet.iterator(chunk_size=...), así la exportación usa memoria
+constante y empieza a enviar datos apenas llega el primer bloque.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+EXPORTACION_CHUNK_SIZE = getattr(settings, 'EXPORTACION_CHUNK_SIZE', 2000)
+
+# (nombre de columna, ruta ORM). Una fila por respuesta; las solicitudes sin
+# respuestas salen una vez con las columnas de respuesta vacías (LEFT JOIN).
+COLUMNAS = [
+    ('id_solicitud', 'id_solicitud'),
+    ('titulo', 'titulo'),
+    ('descripcion', 'descripcion'),
+    ('ubicacion', 'ubicacion'),
+    ('prioridad', 'prioridad'),
+    ('estado', 'id_estado__nombre_estado'),
+    ('cuadrilla', 'id_cuadrilla__nombre_cuadrilla'),
+    ('encuesta', 'id_encuesta__titulo'),
+    ('creada', 'created'),
+    ('id_respuesta', 'respuesta__id_respuesta'),
+    ('pregunta', 'respuesta__id_pregunta__texto_pregunta'),
+    ('respuesta', 'respuesta__respuesta'),
+    ('respondida', 'respuesta__created'),
+]
+NOMBRES_COLUMNAS = [nombre for nombre, _ in COLUMNAS]
+
+
+class _Eco:
+    """ Objeto tipo archivo que devuelve lo escrito (para csv.writer en streaming). """
+
+    def write(self, value):
+        return value
+
+
+def filas_exportacion(queryset):
+    """ Itera tuplas (una por respuesta) sin cargar el resultado completo en memoria. """
+    filas = queryset.order_by('id_solicitud', 'respuesta__id_respuesta').values_list(
+        *[ruta for _, ruta in COLUMNAS]
+    )
+    return filas.iterator(chunk_size=EXPORTACION_CHUNK_SIZE)
+
+
+def _formatear(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def generar_csv(queryset):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(NOMBRES_COLUMNAS)
+    for fila in filas_exportacion(queryset):
+        yield escritor.writerow([_formatear(valor) for valor in fila])
+
+
+def generar_ndjson(queryset):
+    for fila in filas_exportacion(queryset):
+        registro = {nombre: _formatear(valor) for nombre, valor in zip(NOMBRES_COLUMNAS, fila)}
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
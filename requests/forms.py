@@ -4,6 +4,7 @@ from .models import Solicitud, Respuesta, EstadoSolicitud
 from users.models import Cuadrilla# Importar EstadoSolicitud
 from django.contrib.auth.models import User, Group # Importar User y Group
 from surveys.models import Encuesta # Importar Encuesta
+from core.widgets import AutocompleteSelect
 from .models import Multimedia
 
 class SolicitudForm(forms.ModelForm):
@@ -12,16 +13,17 @@ class SolicitudForm(forms.ModelForm):
         queryset=User.objects.filter(is_active=True, profile__group__name='Territorial'), # Filtra User por Grupo 'Territorial'
         label="Territorial Asignado",
         empty_label="Seleccione un territorial",
-        widget=forms.Select(attrs={'class': 'form-select'}) # Opcional: Estilo Bootstrap
+        # Solo se renderiza el elegido; el resto se busca al escribir (core/autocompletar.py)
+        widget=AutocompleteSelect('territoriales', attrs={'class': 'form-select'})
     )
     
     # --- CORRECCIÓN AQUÍ ---
     id_cuadrilla = forms.ModelChoiceField(
-        queryset=Cuadrilla.objects.filter(state='Activo'), # Busca en el modelo Cuadrilla
+        queryset=Cuadrilla.objects.filter(state='Activo').select_related('departamento'), # Busca en el modelo Cuadrilla
         label="Cuadrilla Asignada",
         empty_label="Seleccione una cuadrilla (Opcional)",
         required=False, 
-        widget=forms.Select(attrs={'class': 'form-select'}) 
+        widget=AutocompleteSelect('cuadrillas', attrs={'class': 'form-select'}) 
     )
     # --- FIN CORRECCIÓN ---
     
@@ -31,7 +33,7 @@ class SolicitudForm(forms.ModelForm):
         queryset=Encuesta.objects.filter(state='Activo'),
         label="Tipo de Encuesta",
         empty_label="Seleccione una encuesta",
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=AutocompleteSelect('encuestas', attrs={'class': 'form-select'})
     )
     
     id_estado = forms.ModelChoiceField(
@@ -46,17 +48,26 @@ class SolicitudForm(forms.ModelForm):
         # Lista completa de campos que el formulario manejará
         fields = [
             'titulo', 'descripcion', 'id_encuesta', 'id_territorial', 
-            'ubicacion', 'prioridad', 'id_estado', 'id_cuadrilla' 
+            'ubicacion', 'latitud', 'longitud', 'prioridad', 'id_estado', 'id_cuadrilla' 
         ]
         # Widgets para mejorar apariencia (Bootstrap opcional)
         widgets = {
             'titulo': forms.TextInput(attrs={'class': 'form-control'}),
             'descripcion': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
             'ubicacion': forms.TextInput(attrs={'class': 'form-control'}),
+            'latitud': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
+            'longitud': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
             'prioridad': forms.Select(attrs={'class': 'form-select'}),
             # Los widgets para los ForeignKey ya se definieron arriba
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Las coordenadas van juntas (o se leen de 'ubicacion' al guardar)
+        if (cleaned_data.get('latitud') is None) != (cleaned_data.get('longitud') is None):
+            raise forms.ValidationError('Indica latitud y longitud, o deja ambas vacías.')
+        return cleaned_data
+
 class RespuestaForm(forms.ModelForm):
     class Meta:
         model = Respuesta
@@ -74,4 +85,93 @@ class MultimediaForm(forms.ModelForm):
             'tipo': forms.Select(attrs={'class': 'form-select'}),
             'archivo': forms.FileInput(attrs={'class': 'form-control'}),
             'descripcion': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+class RespuestaLoteForm(forms.Form):
+    """ Respuesta a una pregunta (y adjunto opcional) dentro del formulario de toda la encuesta. """
+    pregunta = forms.IntegerField(widget=forms.HiddenInput)
+    respuesta = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 2, 'placeholder': 'Escribe tu respuesta aquí...', 'class': 'form-control'}),
+    )
+    archivo = forms.FileField(required=False, widget=forms.FileInput(attrs={'class': 'form-control'}))
+    tipo = forms.ChoiceField(
+        choices=[('', 'Tipo de archivo')] + Multimedia.TIPOS_MULTIMEDIA,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('archivo'):
+            if not cleaned_data.get('respuesta', '').strip():
+                raise forms.ValidationError('El archivo debe acompañar a una respuesta.')
+            if not cleaned_data.get('tipo'):
+                raise forms.ValidationError('Indica el tipo del archivo.')
+        return cleaned_data
+
+# Las preguntas sin texto se ignoran al guardar
+RespuestaLoteFormSet = forms.formset_factory(RespuestaLoteForm, extra=0)
+
+class FiltroSolicitudForm(forms.Form):
+    """ Filtros (GET) del listado de solicitudes. Todos los campos son opcionales. """
+    ORDEN_CHOICES = [
+        ('reciente', 'Más recientes primero'),
+        ('antiguo', 'Más antiguas primero'),
+    ]
+
+    estado = forms.ModelChoiceField(
+        queryset=EstadoSolicitud.objects.filter(state='Activo'),
+        required=False,
+        empty_label="Todos los estados",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    prioridad = forms.ChoiceField(
+        choices=[('', 'Todas las prioridades')] + Solicitud._meta.get_field('prioridad').choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    cuadrilla = forms.ModelChoiceField(
+        queryset=Cuadrilla.objects.filter(state='Activo'),
+        required=False,
+        empty_label="Todas las cuadrillas",
+        widget=AutocompleteSelect('cuadrillas', attrs={'class': 'form-select'})
+    )
+    desde = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    hasta = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    orden = forms.ChoiceField(choices=ORDEN_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+
+
+class AccionMasivaForm(forms.Form):
+    """ Acción a aplicar sobre varias solicitudes a la vez (seleccionadas o filtradas). """
+    ACCION_CHOICES = [
+        ('bloquear', 'Bloquear'),
+        ('desbloquear', 'Desbloquear'),
+        ('cambiar_estado', 'Cambiar estado'),
+        ('asignar_cuadrilla', 'Asignar cuadrilla'),
+    ]
+
+    accion = forms.ChoiceField(choices=ACCION_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    nuevo_estado = forms.ModelChoiceField(
+        queryset=EstadoSolicitud.objects.filter(state='Activo'),
+        required=False,
+        empty_label="Nuevo estado",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    nueva_cuadrilla = forms.ModelChoiceField(
+        queryset=Cuadrilla.objects.filter(state='Activo'),
+        required=False,
+        empty_label="Nueva cuadrilla",
+        widget=AutocompleteSelect('cuadrillas', attrs={'class': 'form-select'})
+    )
+    # Si se marca, la acción se aplica a todas las solicitudes que cumplen los filtros
+    todas_filtradas = forms.BooleanField(required=False, label="Aplicar a todas las filtradas")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        accion = cleaned_data.get('accion')
+        if accion == 'cambiar_estado' and not cleaned_data.get('nuevo_estado'):
+            self.add_error('nuevo_estado', 'Selecciona el estado a aplicar.')
+        if accion == 'asignar_cuadrilla' and not cleaned_data.get('nueva_cuadrilla'):
+            self.add_error('nueva_cuadrilla', 'Selecciona la cuadrilla a asignar.')
+        return cleaned_data
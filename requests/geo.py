@@ -0,0 +1,156 @@
+# requests/geo.py
+"""
+Ubicación geográfica de Solicitudes sin PostGIS.
+
+Cada Solicitud con latitud/longitud guarda en 'celda' su geohash (texto en
+base 32 donde cada carácter extra subdivide la celda). Dos puntos cercanos
+suelen compartir prefijo, así que "cerca de un punto" o "dentro de un
+rectángulo" se resuelve en tres pasos:
+
+1. Se eligen los prefijos de geohash que cubren el rectángulo buscado y se
+   consultan como rangos sobre la columna indexada 'celda'.
+2. Se filtra por rango de latitud/longitud en la misma consulta.
+3. En Python se calcula la distancia exacta (haversine) y se ordena.
+"""
+import math
+import re
+
+from django.conf import settings
+from django.db.models import Q
+
+# Precisión guardada en 'celda' (9 caracteres ~ 5 m)
+PRECISION_CELDA = 9
+# Máximo de prefijos a consultar; si se supera se usa una precisión menor
+GEO_MAX_CELDAS = getattr(settings, 'GEO_MAX_CELDAS', 32)
+GEO_MAX_RESULTADOS = getattr(settings, 'GEO_MAX_RESULTADOS', 200)
+GEO_RADIO_MAX_M = getattr(settings, 'GEO_RADIO_MAX_M', 50000)
+# Radio de "solicitudes cercanas" en el detalle de una solicitud
+GEO_RADIO_VECINAS_M = getattr(settings, 'GEO_RADIO_VECINAS_M', 200)
+
+RADIO_TIERRA_M = 6371008.8
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Mayor que cualquier carácter de _BASE32: 'abc' <= celda < 'abc~' equivale a celda que empieza con 'abc'
+_FIN_PREFIJO = '~'
+
+# "-33.4489, -70.6693" (opcionalmente con texto alrededor). Se exigen al menos
+# tres decimales en ambos números para no confundir direcciones como
+# "Pasaje 5, 120" o "Km 12, 45" con coordenadas
+_COORDENADAS = re.compile(r'(?<![\d.])(-?\d{1,2}\.\d{3,})\s*[,;]\s*(-?\d{1,3}\.\d{3,})(?![\d.])')
+
+
+def codificar_geohash(latitud, longitud, precision=PRECISION_CELDA):
+    lat_rango, lon_rango = [-90.0, 90.0], [-180.0, 180.0]
+    caracteres, bits, valor, par = [], 0, 0, True
+    while len(caracteres) < precision:
+        rango, coordenada = (lon_rango, longitud) if par else (lat_rango, latitud)
+        medio = (rango[0] + rango[1]) / 2
+        if coordenada >= medio:
+            valor = (valor << 1) | 1
+            rango[0] = medio
+        else:
+            valor <<= 1
+            rango[1] = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            caracteres.append(_BASE32[valor])
+            bits, valor = 0, 0
+    return ''.join(caracteres)
+
+
+def _tamano_celda(precision):
+    """ (alto, ancho) en grados de una celda de la precisión dada. """
+    bits = precision * 5
+    bits_lon = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lon)
+
+
+def parsear_coordenadas(texto):
+    """ Extrae (latitud, longitud) de un texto tipo "-33.45, -70.66"; None si no hay o no son válidas. """
+    coincidencia = _COORDENADAS.search(texto or '')
+    if not coincidencia:
+        return None
+    latitud, longitud = float(coincidencia.group(1)), float(coincidencia.group(2))
+    if not (-90 <= latitud <= 90 and -180 <= longitud <= 180):
+        return None
+    return latitud, longitud
+
+
+def distancia_m(lat1, lon1, lat2, lon2):
+    """ Distancia haversine en metros. """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_M * math.asin(math.sqrt(a))
+
+
+def caja_alrededor(latitud, longitud, radio_m):
+    """ Rectángulo (lat_min, lon_min, lat_max, lon_max) que contiene el círculo. """
+    delta_lat = math.degrees(radio_m / RADIO_TIERRA_M)
+    coseno = max(math.cos(math.radians(latitud)), 1e-6)
+    delta_lon = min(math.degrees(radio_m / (RADIO_TIERRA_M * coseno)), 180.0)
+    return (
+        max(latitud - delta_lat, -90.0), max(longitud - delta_lon, -180.0),
+        min(latitud + delta_lat, 90.0), min(longitud + delta_lon, 180.0),
+    )
+
+
+def prefijos_para_caja(lat_min, lon_min, lat_max, lon_max, precision=None):
+    """
+    Prefijos de geohash que cubren el rectángulo, con la mayor precisión que
+    no exceda GEO_MAX_CELDAS (o exactamente con 'precision' si se indica).
+    """
+    precisiones = [precision] if precision else range(PRECISION_CELDA, 0, -1)
+    for precision in precisiones:
+        alto, ancho = _tamano_celda(precision)
+        filas = math.floor(lat_max / alto) - math.floor(lat_min / alto) + 1
+        columnas = math.floor(lon_max / ancho) - math.floor(lon_min / ancho) + 1
+        if filas * columnas > GEO_MAX_CELDAS and len(precisiones) > 1:
+            continue
+        prefijos = set()
+        for fila in range(filas):
+            latitud = min(lat_min + fila * alto, lat_max)
+            for columna in range(columnas):
+                longitud = min(lon_min + columna * ancho, lon_max)
+                prefijos.add(codificar_geohash(latitud, longitud, precision))
+        # Las esquinas superiores pueden caer en una celda más
+        prefijos.add(codificar_geohash(lat_max, lon_max, precision))
+        prefijos.add(codificar_geohash(lat_max, lon_min, precision))
+        prefijos.add(codificar_geohash(lat_min, lon_max, precision))
+        return sorted(prefijos)
+    return []  # Caja enorme: sin poda por celda
+
+
+def _filtro_celdas(prefijos):
+    filtro = Q()
+    for prefijo in prefijos:
+        # Rango en vez de startswith: LIKE no usa el índice en SQLite
+        filtro |= Q(celda__gte=prefijo, celda__lt=prefijo + _FIN_PREFIJO)
+    return filtro
+
+
+def en_caja(queryset, lat_min, lon_min, lat_max, lon_max):
+    """ QuerySet de las Solicitudes dentro del rectángulo (poda por celda + rango exacto). """
+    queryset = queryset.filter(
+        latitud__gte=lat_min, latitud__lte=lat_max, longitud__gte=lon_min, longitud__lte=lon_max,
+    )
+    prefijos = prefijos_para_caja(lat_min, lon_min, lat_max, lon_max)
+    if prefijos:
+        queryset = queryset.filter(_filtro_celdas(prefijos))
+    return queryset
+
+
+def cercanas(queryset, latitud, longitud, radio_m, limite=GEO_MAX_RESULTADOS):
+    """
+    Lista de (solicitud, distancia_m) a menos de radio_m del punto, de la más
+    cercana a la más lejana.
+    """
+    candidatas = en_caja(queryset, *caja_alrededor(latitud, longitud, radio_m))
+    resultado = []
+    for solicitud in candidatas:
+        distancia = distancia_m(latitud, longitud, solicitud.latitud, solicitud.longitud)
+        if distancia <= radio_m:
+            resultado.append((solicitud, distancia))
+    resultado.sort(key=lambda par: par[1])
+    return resultado[:limite]
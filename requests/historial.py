@@ -0,0 +1,172 @@
+# requests/historial.py
+"""
+Historial de cambios de Solicitudes y tiempo en cada estado.
+
+Cada cambio de estado, cuadrilla o state se agrega a SolicitudEvento (solo
+inserción) y, si cambia el estado, se cierra la estadía anterior en
+SolicitudTiempoEstado (sumando sus segundos) y se abre la nueva. Así los
+reportes de SLA leen duraciones ya calculadas en vez de reconstruirlas.
+
+Los eventos se escriben siempre en la transacción del cambio que registran:
+los guardados individuales pasan por la señal post_save de Solicitud, que corre
+dentro del atomic() de Solicitud.save(); las acciones masivas y la asignación
+llaman a registrar_cambios() dentro de su propio atomic().
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from users.models import Cuadrilla
+from .models import (
+    CAMPOS_HISTORIAL, CAMPOS_ORIGINALES, EstadoSolicitud, SolicitudEvento, SolicitudTiempoEstado,
+)
+
+
+def _texto(valor):
+    return None if valor is None else str(valor)
+
+
+def cambios_de(instancia, creada=False):
+    """ Compara una Solicitud guardada con los valores leídos de la BD: [(id, campo, anterior, nuevo)]. """
+    originales = {} if creada else getattr(instancia, '_valores_originales', None)
+    if originales is None:
+        # Instancia construida a mano (no leída de la BD): no hay con qué comparar
+        return []
+    cambios = []
+    for attname, campo in CAMPOS_HISTORIAL.items():
+        nuevo = getattr(instancia, attname)
+        if creada:
+            if nuevo is not None:
+                cambios.append((instancia.pk, campo, None, nuevo))
+        elif attname in originales and originales[attname] != nuevo:
+            cambios.append((instancia.pk, campo, originales[attname], nuevo))
+    return cambios
+
+
+def tomar_valores(instancia):
+    """ Actualiza la foto de valores tras guardar, para no repetir eventos en el siguiente save(). """
+    instancia._valores_originales = {attname: getattr(instancia, attname) for attname in CAMPOS_ORIGINALES}
+
+
+def registrar_cambios(cambios, usuario=None, momento=None):
+    """
+    Registra en lote una lista de (id_solicitud, campo, anterior, nuevo):
+    un bulk_create de eventos y la actualización de los tiempos por estado.
+    Debe llamarse dentro de la transacción que aplica los cambios; el atomic()
+    interno es entonces un savepoint y no confirma nada por su cuenta.
+    """
+    if not cambios:
+        return
+    momento = momento or timezone.now()
+    usuario_id = getattr(usuario, 'pk', None)
+
+    with transaction.atomic():
+        SolicitudEvento.objects.bulk_create([
+            SolicitudEvento(
+                id_solicitud_id=solicitud_id, campo=campo, usuario_id=usuario_id, created=momento,
+                valor_anterior=_texto(anterior), valor_nuevo=_texto(nuevo),
+            )
+            for solicitud_id, campo, anterior, nuevo in cambios
+        ])
+        _actualizar_tiempos(
+            {solicitud_id: nuevo for solicitud_id, campo, anterior, nuevo in cambios if campo == 'estado'},
+            momento,
+        )
+
+
+def _actualizar_tiempos(nuevos_estados, momento):
+    """ Cierra las estadías abiertas de las solicitudes y abre la del nuevo estado. """
+    if not nuevos_estados:
+        return
+    ids = list(nuevos_estados)
+
+    # Cerrar: se suman los segundos de la estadía en curso
+    abiertas = list(
+        SolicitudTiempoEstado.objects.select_for_update()
+        .filter(id_solicitud_id__in=ids, desde__isnull=False)
+    )
+    for tiempo in abiertas:
+        tiempo.segundos += max(int((momento - tiempo.desde).total_seconds()), 0)
+        tiempo.desde = None
+    SolicitudTiempoEstado.objects.bulk_update(abiertas, ['segundos', 'desde'])
+
+    # Abrir: reutiliza la fila si la solicitud ya estuvo antes en ese estado
+    existentes = {
+        (tiempo.id_solicitud_id, tiempo.id_estado_id): tiempo
+        for tiempo in SolicitudTiempoEstado.objects.select_for_update().filter(
+            id_solicitud_id__in=ids, id_estado_id__in=set(nuevos_estados.values())
+        )
+    }
+    reabiertas, nuevas = [], []
+    for solicitud_id, estado_id in nuevos_estados.items():
+        tiempo = existentes.get((solicitud_id, estado_id))
+        if tiempo is None:
+            nuevas.append(SolicitudTiempoEstado(id_solicitud_id=solicitud_id, id_estado_id=estado_id, veces=1, desde=momento))
+        else:
+            tiempo.veces += 1
+            tiempo.desde = momento
+            reabiertas.append(tiempo)
+    SolicitudTiempoEstado.objects.bulk_update(reabiertas, ['veces', 'desde'])
+    SolicitudTiempoEstado.objects.bulk_create(nuevas)
+
+
+def historial_solicitud(solicitud):
+    """ Eventos de la solicitud con los IDs de estado y cuadrilla traducidos a nombres. """
+    # Por id: también sirve para una SolicitudArchivada (el historial no se archiva)
+    eventos = list(
+        SolicitudEvento.objects.filter(id_solicitud_id=solicitud.pk).select_related('usuario').order_by('created', 'id_evento')
+    )
+    ids = {'estado': set(), 'cuadrilla': set()}
+    for evento in eventos:
+        if evento.campo in ids:
+            ids[evento.campo].update(v for v in (evento.valor_anterior, evento.valor_nuevo) if v)
+    nombres = {
+        'estado': {str(pk): str(e) for pk, e in EstadoSolicitud.objects.in_bulk(ids['estado']).items()} if ids['estado'] else {},
+        'cuadrilla': {str(pk): str(c) for pk, c in Cuadrilla.objects.in_bulk(ids['cuadrilla']).items()} if ids['cuadrilla'] else {},
+    }
+    for evento in eventos:
+        traduccion = nombres.get(evento.campo, {})
+        evento.anterior_legible = traduccion.get(evento.valor_anterior, evento.valor_anterior)
+        evento.nuevo_legible = traduccion.get(evento.valor_nuevo, evento.valor_nuevo)
+    return eventos
+
+
+def tiempos_solicitud(solicitud, momento=None):
+    """ Segundos en cada estado (incluida la estadía en curso) de una solicitud. """
+    momento = momento or timezone.now()
+    tiempos = list(
+        SolicitudTiempoEstado.objects.filter(id_solicitud_id=solicitud.pk)
+        .select_related('id_estado').order_by('id_estado__nombre_estado')
+    )
+    for tiempo in tiempos:
+        tiempo.total_segundos = tiempo.segundos
+        if tiempo.desde:
+            tiempo.total_segundos += max(int((momento - tiempo.desde).total_seconds()), 0)
+        tiempo.total_horas = round(tiempo.total_segundos / 3600, 1)
+    return tiempos
+
+
+def resumen_sla():
+    """
+    Por estado: estadías, solicitudes que siguen en él y promedio (en horas)
+    de las estadías cerradas. Una sola consulta agregada sobre los tiempos.
+    """
+    filas = (
+        SolicitudTiempoEstado.objects.values('id_estado__nombre_estado')
+        .annotate(
+            estadias=Sum('veces'),
+            abiertas=Count('id', filter=Q(desde__isnull=False)),
+            segundos=Sum('segundos'),
+        )
+        .order_by('id_estado__nombre_estado')
+    )
+    resumen = []
+    for fila in filas:
+        cerradas = (fila['estadias'] or 0) - fila['abiertas']
+        resumen.append({
+            'estado': fila['id_estado__nombre_estado'],
+            'estadias': fila['estadias'] or 0,
+            'abiertas': fila['abiertas'],
+            'promedio_horas': round(fila['segundos'] / cerradas / 3600, 2) if cerradas else None,
+        })
+    return resumen
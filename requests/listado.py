@@ -0,0 +1,126 @@
+# requests/listado.py
+"""
+Consultas compartidas para listar Solicitudes.
+
+Centraliza el alcance por rol, los filtros del listado y la paginación por
+cursor (keyset) sobre (created, id_solicitud), de modo que pedir la página N
+cueste lo mismo que pedir la primera.
+"""
+import base64
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.roles import GRUPO_TERRITORIAL, GRUPO_CUADRILLA
+from .models import Solicitud
+
+SOLICITUDES_POR_PAGINA = getattr(settings, 'SOLICITUDES_POR_PAGINA', 50)
+
+# Claves foráneas que se muestran en los listados (evita N+1 en el template)
+RELACIONES_LISTADO = ('id_encuesta', 'id_territorial', 'id_estado', 'id_cuadrilla')
+
+
+def solicitudes_visibles(user, group_id, state='Activo', modelo=Solicitud):
+    """ Devuelve el QuerySet de Solicitudes (o de SolicitudArchivada) que el usuario puede ver según su rol. """
+    queryset = modelo.objects.filter(state=state)
+    if group_id == GRUPO_TERRITORIAL:
+        queryset = queryset.filter(id_territorial=user)
+    elif group_id == GRUPO_CUADRILLA:
+        # La cuadrilla se identifica por su jefe (User)
+        queryset = queryset.filter(id_cuadrilla__jefe=user)
+    return queryset
+
+
+def _inicio_del_dia(fecha):
+    momento = datetime.combine(fecha, time.min)
+    if settings.USE_TZ:
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def aplicar_filtros(queryset, filtros):
+    """ Aplica los filtros validados por FiltroSolicitudForm (cleaned_data). """
+    if filtros.get('estado'):
+        queryset = queryset.filter(id_estado=filtros['estado'])
+    if filtros.get('prioridad'):
+        queryset = queryset.filter(prioridad=filtros['prioridad'])
+    if filtros.get('cuadrilla'):
+        queryset = queryset.filter(id_cuadrilla=filtros['cuadrilla'])
+    # Rangos sobre la columna 'created' (sin __date) para poder usar índices
+    if filtros.get('desde'):
+        queryset = queryset.filter(created__gte=_inicio_del_dia(filtros['desde']))
+    if filtros.get('hasta'):
+        queryset = queryset.filter(created__lt=_inicio_del_dia(filtros['hasta'] + timedelta(days=1)))
+    return queryset
+
+
+def codificar_cursor(solicitud):
+    """ Convierte la última fila de una página en un cursor opaco para la URL. """
+    valor = f"{solicitud.created.isoformat()}|{solicitud.id_solicitud}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """ Devuelve (created, id_solicitud) o None si el cursor no es válido. """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor = base64.urlsafe_b64decode((cursor + relleno).encode()).decode()
+        fecha_txt, id_txt = valor.rsplit('|', 1)
+        fecha = parse_datetime(fecha_txt)
+        if fecha is None:
+            return None
+        return fecha, int(id_txt)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _consulta_keyset(queryset, cursor, ascendente, por_pagina):
+    if ascendente:
+        queryset = queryset.order_by('created', 'id_solicitud')
+    else:
+        queryset = queryset.order_by('-created', '-id_solicitud')
+
+    posicion = decodificar_cursor(cursor)
+    if posicion:
+        created, id_solicitud = posicion
+        if ascendente:
+            queryset = queryset.filter(
+                Q(created__gt=created) | Q(created=created, id_solicitud__gt=id_solicitud)
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id_solicitud__lt=id_solicitud)
+            )
+
+    # Se pide una fila extra solo para saber si existe una página siguiente
+    return queryset[:por_pagina + 1]
+
+
+def _cortar_pagina(filas, por_pagina):
+    cursor_siguiente = None
+    if len(filas) > por_pagina:
+        filas = filas[:por_pagina]
+        cursor_siguiente = codificar_cursor(filas[-1])
+    return filas, cursor_siguiente
+
+
+def paginar_keyset(queryset, cursor=None, ascendente=False, por_pagina=SOLICITUDES_POR_PAGINA):
+    """
+    Pagina por (created, id_solicitud) sin OFFSET.
+
+    Retorna (lista_de_solicitudes, cursor_siguiente). cursor_siguiente es None
+    cuando no hay más páginas.
+    """
+    filas = list(_consulta_keyset(queryset, cursor, ascendente, por_pagina))
+    return _cortar_pagina(filas, por_pagina)
+
+
+async def apaginar_keyset(queryset, cursor=None, ascendente=False, por_pagina=SOLICITUDES_POR_PAGINA):
+    """ Versión async de paginar_keyset(). """
+    filas = [fila async for fila in _consulta_keyset(queryset, cursor, ascendente, por_pagina)]
+    return _cortar_pagina(filas, por_pagina)
@@ -0,0 +1,26 @@
+# requests/management/commands/archivar_solicitudes.py
+from django.core.management.base import BaseCommand, CommandError
+
+from requests.archivo import ARCHIVO_DIAS, ARCHIVO_ESTADOS, ARCHIVO_LOTE, archivables, archivar
+
+
+class Command(BaseCommand):
+    help = 'Mueve a las tablas de archivo las solicitudes cerradas hace más de N días, con sus respuestas y multimedia.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=ARCHIVO_DIAS, help='Días desde el cierre (por defecto ARCHIVO_DIAS).')
+        parser.add_argument('--lote', type=int, default=ARCHIVO_LOTE, help='Solicitudes por transacción.')
+        parser.add_argument('--limite', type=int, help='Máximo de solicitudes a archivar en esta ejecución.')
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta las solicitudes archivables.')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1:
+            raise CommandError('--dias no puede ser negativo y --lote debe ser al menos 1.')
+        estados = ', '.join(ARCHIVO_ESTADOS)
+        if options['simular']:
+            total = archivables(options['dias']).count()
+            self.stdout.write(f'{total} solicitud(es) en {estados} cerradas hace más de {options["dias"]} días (simulación, sin cambios).')
+            return
+
+        total = archivar(dias=options['dias'], lote=options['lote'], limite=options['limite'])
+        self.stdout.write(self.style.SUCCESS(f'{total} solicitud(es) archivada(s) ({estados}, más de {options["dias"]} días).'))
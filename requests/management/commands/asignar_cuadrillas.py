@@ -0,0 +1,34 @@
+# requests/management/commands/asignar_cuadrillas.py
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from requests.asignacion import ASIGNACION_LOTE, Planificador, aplicar_plan, planificar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Asigna a las solicitudes abiertas sin cuadrilla la cuadrilla menos cargada de su departamento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, help='Máximo de solicitudes a asignar.')
+        parser.add_argument('--lote', type=int, default=ASIGNACION_LOTE, help='Solicitudes por transacción.')
+        parser.add_argument('--simular', action='store_true', help='Muestra el reparto sin guardarlo.')
+
+    def handle(self, *args, **options):
+        planificador = Planificador()
+        plan = planificar_pendientes(planificador, limite=options['limite'])
+        if not plan:
+            self.stdout.write('No hay solicitudes pendientes de asignar.')
+            return
+
+        if options['simular']:
+            cargas = planificador.cargas()
+            for cuadrilla_id, total in sorted(Counter(cuadrilla_id for _, cuadrilla_id in plan).items()):
+                self.stdout.write(f'Cuadrilla {cuadrilla_id}: +{total} (quedaría con {cargas[cuadrilla_id]} abiertas)')
+            self.stdout.write(f'{len(plan)} solicitud(es) por asignar (simulación, sin cambios).')
+            return
+
+        asignadas = aplicar_plan(plan, lote=options['lote'])
+        for cuadrilla_id, total in sorted(asignadas.items()):
+            self.stdout.write(f'Cuadrilla {cuadrilla_id}: +{total}')
+        self.stdout.write(self.style.SUCCESS(f'{sum(asignadas.values())} solicitud(es) asignada(s).'))
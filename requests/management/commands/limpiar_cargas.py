@@ -0,0 +1,20 @@
+# requests/management/commands/limpiar_cargas.py
+from django.core.management.base import BaseCommand, CommandError
+
+from requests.cargas import MULTIMEDIA_CARGAS_ABANDONO_HORAS, limpiar_abandonadas
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas por partes abandonadas y sus archivos temporales (.part).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=int, default=MULTIMEDIA_CARGAS_ABANDONO_HORAS,
+            help='Horas sin actividad para considerar abandonada una carga (por defecto MULTIMEDIA_CARGAS_ABANDONO_HORAS).',
+        )
+
+    def handle(self, *args, **options):
+        if options['horas'] < 1:
+            raise CommandError('--horas debe ser al menos 1.')
+        cargas, archivos = limpiar_abandonadas(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{cargas} carga(s) abandonada(s) y {archivos} archivo(s) temporal(es) eliminados.'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0002_alter_estadosolicitud_nombre_estado'),
+        ('surveys', '0001_initial'),
+        ('users', '0002_alter_cuadrilla_departamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='respuesta',
+            index=models.Index(fields=['id_solicitud', 'id_pregunta', 'created'], name='resp_sol_preg_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['state', 'created'], name='sol_state_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['id_territorial', 'state', 'created'], name='sol_terr_state_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['id_cuadrilla', 'state', 'created'], name='sol_cuad_state_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['id_estado', 'created'], name='sol_estado_created_idx'),
+        ),
+    ]
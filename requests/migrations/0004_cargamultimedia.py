@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:04
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0003_solicitud_respuesta_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaMultimedia',
+            fields=[
+                ('id_carga', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('imagen', 'Imagen'), ('video', 'Video'), ('audio', 'Audio')], max_length=20)),
+                ('descripcion', models.CharField(blank=True, max_length=200, null=True)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamano_total', models.PositiveBigIntegerField()),
+                ('recibido', models.PositiveBigIntegerField(default=0)),
+                ('state', models.CharField(default='Activo', max_length=20)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('id_multimedia', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='requests.multimedia')),
+                ('id_respuesta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='requests.respuesta')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0004_cargamultimedia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multimedia',
+            name='mediana',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='multimedia/derivados/'),
+        ),
+        migrations.AddField(
+            model_name='multimedia',
+            name='miniatura',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='multimedia/derivados/'),
+        ),
+    ]
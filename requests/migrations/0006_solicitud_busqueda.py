@@ -0,0 +1,111 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:14
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE requests_solicitud_fts USING fts5("
+    "documento, content='requests_solicitudbusqueda', content_rowid='id_solicitud_id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER requests_solicitud_fts_ai AFTER INSERT ON requests_solicitudbusqueda BEGIN "
+    "INSERT INTO requests_solicitud_fts(rowid, documento) VALUES (new.id_solicitud_id, new.documento); END",
+    "CREATE TRIGGER requests_solicitud_fts_ad AFTER DELETE ON requests_solicitudbusqueda BEGIN "
+    "INSERT INTO requests_solicitud_fts(requests_solicitud_fts, rowid, documento) "
+    "VALUES ('delete', old.id_solicitud_id, old.documento); END",
+    "CREATE TRIGGER requests_solicitud_fts_au AFTER UPDATE ON requests_solicitudbusqueda BEGIN "
+    "INSERT INTO requests_solicitud_fts(requests_solicitud_fts, rowid, documento) "
+    "VALUES ('delete', old.id_solicitud_id, old.documento); "
+    "INSERT INTO requests_solicitud_fts(rowid, documento) VALUES (new.id_solicitud_id, new.documento); END",
+]
+SQLITE_FTS_REVERSA = [
+    "DROP TRIGGER IF EXISTS requests_solicitud_fts_ai",
+    "DROP TRIGGER IF EXISTS requests_solicitud_fts_ad",
+    "DROP TRIGGER IF EXISTS requests_solicitud_fts_au",
+    "DROP TABLE IF EXISTS requests_solicitud_fts",
+]
+POSTGRES_FTS = [
+    "CREATE INDEX sol_busqueda_tsv_idx ON requests_solicitudbusqueda "
+    "USING GIN (to_tsvector('spanish', documento))",
+]
+POSTGRES_FTS_REVERSA = ["DROP INDEX IF EXISTS sol_busqueda_tsv_idx"]
+
+# Solicitudes por tramo al poblar el índice
+LOTE = 1000
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_FTS)
+    elif vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_FTS)
+
+
+def eliminar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_FTS_REVERSA)
+    elif vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_FTS_REVERSA)
+
+
+def _normalizar(texto):
+    # Copia de core.texto.normalizar (las migraciones no importan código de la app)
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def poblar_busqueda(apps, schema_editor):
+    Solicitud = apps.get_model('requests', 'Solicitud')
+    Respuesta = apps.get_model('requests', 'Respuesta')
+    SolicitudBusqueda = apps.get_model('requests', 'SolicitudBusqueda')
+
+    # Por tramos de LOTE solicitudes en orden de id: en memoria solo las respuestas del tramo
+    campos = ('id_solicitud', 'titulo', 'descripcion', 'ubicacion')
+    ultimo = 0
+    while True:
+        solicitudes = list(Solicitud.objects.filter(pk__gt=ultimo).order_by('pk').values_list(*campos)[:LOTE])
+        if not solicitudes:
+            break
+        ultimo = solicitudes[-1][0]
+        respuestas = {}
+        for solicitud_id, texto in (
+            Respuesta.objects.filter(id_solicitud_id__in=[fila[0] for fila in solicitudes])
+            .order_by('id_solicitud_id', 'pk').values_list('id_solicitud_id', 'respuesta').iterator()
+        ):
+            respuestas.setdefault(solicitud_id, []).append(texto)
+        SolicitudBusqueda.objects.bulk_create([
+            SolicitudBusqueda(
+                id_solicitud_id=solicitud_id,
+                documento=_normalizar(' '.join(filter(None, [*textos, *respuestas.get(solicitud_id, [])]))),
+            )
+            for solicitud_id, *textos in solicitudes
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0005_multimedia_derivados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudBusqueda',
+            fields=[
+                ('id_solicitud', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='requests.solicitud')),
+                ('documento', models.TextField(blank=True, default='')),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        # Índice de texto completo según el motor; luego se pueblan las existentes
+        migrations.RunPython(crear_indice_texto, eliminar_indice_texto),
+        migrations.RunPython(poblar_busqueda, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def abrir_estadias(apps, schema_editor):
+    """
+    Las Solicitudes existentes no tienen historial: se abre la estadía en su
+    estado actual desde la última modificación, que es la mejor fecha conocida.
+    """
+    Solicitud = apps.get_model('requests', 'Solicitud')
+    SolicitudTiempoEstado = apps.get_model('requests', 'SolicitudTiempoEstado')
+    lote = []
+    for solicitud_id, estado_id, updated in Solicitud.objects.values_list('id_solicitud', 'id_estado_id', 'updated').iterator():
+        lote.append(SolicitudTiempoEstado(id_solicitud_id=solicitud_id, id_estado_id=estado_id, veces=1, desde=updated))
+        if len(lote) >= 1000:
+            SolicitudTiempoEstado.objects.bulk_create(lote)
+            lote = []
+    SolicitudTiempoEstado.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0006_solicitud_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudEvento',
+            fields=[
+                ('id_evento', models.BigAutoField(primary_key=True, serialize=False)),
+                ('campo', models.CharField(choices=[('estado', 'Estado'), ('cuadrilla', 'Cuadrilla'), ('state', 'State')], max_length=20)),
+                ('valor_anterior', models.CharField(blank=True, max_length=50, null=True)),
+                ('valor_nuevo', models.CharField(blank=True, max_length=50, null=True)),
+                ('created', models.DateTimeField()),
+                ('id_solicitud', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='requests.solicitud')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['id_solicitud', 'created'], name='evento_sol_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SolicitudTiempoEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segundos', models.PositiveBigIntegerField(default=0)),
+                ('veces', models.PositiveIntegerField(default=0)),
+                ('desde', models.DateTimeField(blank=True, null=True)),
+                ('id_estado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='requests.estadosolicitud')),
+                ('id_solicitud', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='tiempos_estado', to='requests.solicitud')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_solicitud', 'id_estado'), name='tiempo_sol_estado_uniq')],
+            },
+        ),
+        migrations.RunPython(abrir_estadias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:22
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+def geolocalizar_existentes(apps, schema_editor):
+    """ Lee coordenadas escritas en 'ubicacion' ("-33.45, -70.66") de las solicitudes existentes. """
+    from requests.geo import codificar_geohash, parsear_coordenadas
+
+    Solicitud = apps.get_model('requests', 'Solicitud')
+    lote = []
+    for solicitud in Solicitud.objects.exclude(ubicacion__isnull=True).exclude(ubicacion='').only('pk', 'ubicacion').iterator():
+        coordenadas = parsear_coordenadas(solicitud.ubicacion)
+        if coordenadas is None:
+            continue
+        solicitud.latitud, solicitud.longitud = coordenadas
+        solicitud.celda = codificar_geohash(*coordenadas)
+        lote.append(solicitud)
+        if len(lote) >= 1000:
+            Solicitud.objects.bulk_update(lote, ['latitud', 'longitud', 'celda'])
+            lote = []
+    Solicitud.objects.bulk_update(lote, ['latitud', 'longitud', 'celda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0007_solicitud_historial'),
+        ('surveys', '0001_initial'),
+        ('users', '0002_alter_cuadrilla_departamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='celda',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['celda'], name='sol_celda_idx'),
+        ),
+        migrations.RunPython(geolocalizar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def firmar_existentes(apps, schema_editor):
+    """ Calcula las claves LSH de las solicitudes activas existentes. """
+    from django.utils import timezone
+    from requests.duplicados import claves_solicitud
+
+    Solicitud = apps.get_model('requests', 'Solicitud')
+    SolicitudFirma = apps.get_model('requests', 'SolicitudFirma')
+    campos = ('id_solicitud', 'titulo', 'descripcion', 'latitud', 'longitud', 'created')
+    lote = []
+    for solicitud_id, titulo, descripcion, latitud, longitud, created in (
+        Solicitud.objects.filter(state='Activo').values_list(*campos).iterator()
+    ):
+        claves = claves_solicitud(titulo, descripcion, latitud, longitud, timezone.localdate(created))
+        lote.extend(SolicitudFirma(id_solicitud_id=solicitud_id, clave=clave) for clave in claves)
+        if len(lote) >= 1000:
+            SolicitudFirma.objects.bulk_create(lote)
+            lote = []
+    SolicitudFirma.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0008_solicitud_ubicacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudFirma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=48)),
+                ('id_solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='firmas', to='requests.solicitud')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['clave', 'id_solicitud'], name='firma_clave_sol_idx')],
+            },
+        ),
+        migrations.RunPython(firmar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0009_solicitud_firma'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respuesta',
+            name='clave_cliente',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0010_respuesta_clave_cliente'),
+        ('surveys', '0002_autocompletar'),
+        ('users', '0003_autocompletar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudArchivada',
+            fields=[
+                ('id_solicitud', models.IntegerField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('ubicacion', models.CharField(blank=True, max_length=300, null=True)),
+                ('latitud', models.FloatField(blank=True, null=True)),
+                ('longitud', models.FloatField(blank=True, null=True)),
+                ('celda', models.CharField(blank=True, max_length=12, null=True)),
+                ('prioridad', models.CharField(choices=[('baja', 'Baja'), ('normal', 'Normal'), ('alta', 'Alta')], max_length=20)),
+                ('state', models.CharField(max_length=20)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('archivada', models.DateTimeField()),
+                ('id_cuadrilla', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='users.cuadrilla')),
+                ('id_encuesta', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='surveys.encuesta')),
+                ('id_estado', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='requests.estadosolicitud')),
+                ('id_territorial', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RespuestaArchivada',
+            fields=[
+                ('id_respuesta', models.IntegerField(primary_key=True, serialize=False)),
+                ('respuesta', models.TextField()),
+                ('clave_cliente', models.UUIDField(blank=True, null=True)),
+                ('state', models.CharField(max_length=20)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('id_pregunta', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='surveys.pregunta')),
+                ('id_solicitud', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='respuestas', to='requests.solicitudarchivada')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MultimediaArchivada',
+            fields=[
+                ('id_multimedia', models.IntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('imagen', 'Imagen'), ('video', 'Video'), ('audio', 'Audio')], max_length=20)),
+                ('archivo', models.FileField(upload_to='multimedia/')),
+                ('miniatura', models.FileField(blank=True, null=True, upload_to='multimedia/derivados/')),
+                ('mediana', models.FileField(blank=True, null=True, upload_to='multimedia/derivados/')),
+                ('descripcion', models.CharField(blank=True, max_length=200, null=True)),
+                ('state', models.CharField(max_length=20)),
+                ('created', models.DateTimeField()),
+                ('updated', models.DateTimeField()),
+                ('id_respuesta', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='multimedia_set', to='requests.respuestaarchivada')),
+                ('id_solicitud', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='multimedia_set', to='requests.solicitudarchivada')),
+            ],
+        ),
+    ]
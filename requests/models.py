@@ -1,10 +1,23 @@
 # requests/models.py
 
-from django.db import models
+import uuid
+
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models, transaction
 # Imports correctos: apuntan a User de Django y a modelos de surveys
 from surveys.models import Encuesta, Pregunta 
 from django.contrib.auth.models import User # Importar User de Django
 
+# Campos de Solicitud cuyos cambios quedan en SolicitudEvento (attname -> campo)
+CAMPOS_HISTORIAL = {
+    'id_estado_id': 'estado',
+    'id_cuadrilla_id': 'cuadrilla',
+    'state': 'state',
+}
+# Columnas cuyo valor leído de la BD se conserva en _valores_originales
+# (historial y contadores de core/contadores.py)
+CAMPOS_ORIGINALES = (*CAMPOS_HISTORIAL, 'id_encuesta_id')
+
 class EstadoSolicitud(models.Model):
     id_estado = models.AutoField(primary_key=True)
     nombre_estado = models.CharField(max_length=50, unique=True)
@@ -35,6 +48,11 @@ class Solicitud(models.Model):
     titulo = models.CharField(max_length=200, default='Sin título')
     descripcion = models.TextField(blank=True, null=True)
     ubicacion = models.CharField(max_length=300, blank=True, null=True)
+    # Coordenadas opcionales (del formulario o leídas de 'ubicacion') y su
+    # geohash para buscar solicitudes cercanas (ver requests/geo.py)
+    latitud = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitud = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    celda = models.CharField(max_length=12, blank=True, null=True, editable=False)
     prioridad = models.CharField(max_length=20, choices=[
         ('baja', 'Baja'),
         ('normal', 'Normal'), 
@@ -44,18 +62,53 @@ class Solicitud(models.Model):
     state = models.CharField(max_length=20, default='Activo')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Índices para los accesos frecuentes: listados por state ordenados por
+        # fecha, vistas por rol (territorial/cuadrilla) y filtros por estado.
+        indexes = [
+            models.Index(fields=['state', 'created'], name='sol_state_created_idx'),
+            models.Index(fields=['id_territorial', 'state', 'created'], name='sol_terr_state_created_idx'),
+            models.Index(fields=['id_cuadrilla', 'state', 'created'], name='sol_cuad_state_created_idx'),
+            models.Index(fields=['id_estado', 'created'], name='sol_estado_created_idx'),
+            models.Index(fields=['celda'], name='sol_celda_idx'),
+        ]
     
     def __str__(self):
         return f"Solicitud {self.id_solicitud} - {self.titulo}"
 
+    def save(self, *args, **kwargs):
+        # Los receptores post_save (historial, contadores, índice) escriben en la
+        # misma transacción que la fila: un save() fuera de atomic() no puede
+        # confirmarse sin su SolicitudEvento
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Se guardan los valores leídos para detectar cambios al guardar
+        instancia = super().from_db(db, field_names, values)
+        instancia._valores_originales = {
+            attname: instancia.__dict__[attname] for attname in CAMPOS_ORIGINALES if attname in instancia.__dict__
+        }
+        return instancia
+
 class Respuesta(models.Model):
     id_respuesta = models.AutoField(primary_key=True)
     id_pregunta = models.ForeignKey('surveys.Pregunta', on_delete=models.CASCADE)
     id_solicitud = models.ForeignKey('Solicitud', on_delete=models.CASCADE)
     respuesta = models.TextField()
+    # UUID generado por el dispositivo al responder sin conexión (ver requests/sincronizacion.py)
+    clave_cliente = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     state = models.CharField(max_length=20, default='Activo')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Respuestas de una solicitud agrupadas por pregunta y en orden de creación
+        indexes = [
+            models.Index(fields=['id_solicitud', 'id_pregunta', 'created'], name='resp_sol_preg_created_idx'),
+        ]
     
     def __str__(self):
         return f"Respuesta {self.id_respuesta}"
@@ -71,10 +124,195 @@ class Multimedia(models.Model):
     id_solicitud = models.ForeignKey('Solicitud', on_delete=models.CASCADE, null=True, blank=True)
     tipo = models.CharField(max_length=20, choices=TIPOS_MULTIMEDIA)
     archivo = models.FileField(upload_to='multimedia/')
+    # Versiones reducidas de las imágenes (ver requests/derivados.py)
+    miniatura = models.FileField(upload_to='multimedia/derivados/', blank=True, null=True, editable=False)
+    mediana = models.FileField(upload_to='multimedia/derivados/', blank=True, null=True, editable=False)
     descripcion = models.CharField(max_length=200, blank=True, null=True)
     state = models.CharField(max_length=20, default='Activo')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"Multimedia {self.id_multimedia} - {self.tipo}"
\ No newline at end of file
+        return f"Multimedia {self.id_multimedia} - {self.tipo}"
+
+class CargaMultimedia(models.Model):
+    """
+    Subida por partes (reanudable) de un archivo para una Respuesta.
+
+    Las partes se escriben directo a un archivo temporal en disco (ver
+    requests/cargas.py); 'recibido' es el offset confirmado desde el que el
+    cliente debe continuar tras una desconexión. Al finalizar se crea el
+    Multimedia y se enlaza en 'id_multimedia'.
+    """
+    id_carga = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id_respuesta = models.ForeignKey('Respuesta', on_delete=models.CASCADE)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=20, choices=Multimedia.TIPOS_MULTIMEDIA)
+    descripcion = models.CharField(max_length=200, blank=True, null=True)
+    nombre_archivo = models.CharField(max_length=255)
+    tamano_total = models.PositiveBigIntegerField()
+    recibido = models.PositiveBigIntegerField(default=0)
+    id_multimedia = models.OneToOneField('Multimedia', on_delete=models.SET_NULL, null=True, blank=True)
+    state = models.CharField(max_length=20, default='Activo') # 'Activo' mientras se sube, 'Completada' al finalizar
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Carga {self.id_carga} - {self.nombre_archivo} ({self.recibido}/{self.tamano_total})"
+
+class SolicitudBusqueda(models.Model):
+    """
+    Documento de búsqueda de una Solicitud: título, descripción, ubicación y
+    respuestas, en minúsculas y sin tildes. Lo mantiene requests/busqueda.py y
+    sobre él se crea el índice de texto completo (FTS5 en SQLite, tsvector en
+    PostgreSQL) en la migración 0006.
+    """
+    id_solicitud = models.OneToOneField('Solicitud', on_delete=models.CASCADE, primary_key=True, related_name='busqueda')
+    documento = models.TextField(blank=True, default='')
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Búsqueda de Solicitud {self.id_solicitud_id}"
+
+class SolicitudEvento(models.Model):
+    """
+    Historial de solo inserción de los cambios de estado, cuadrilla y state de
+    una Solicitud (ver requests/historial.py). Los valores se guardan como
+    texto (IDs para estado y cuadrilla). No tiene restricción de FK para que
+    el historial sobreviva a la Solicitud.
+    """
+    CAMPOS = [
+        ('estado', 'Estado'),
+        ('cuadrilla', 'Cuadrilla'),
+        ('state', 'State'),
+    ]
+    id_evento = models.BigAutoField(primary_key=True)
+    id_solicitud = models.ForeignKey(
+        'Solicitud', related_name='eventos', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    campo = models.CharField(max_length=20, choices=CAMPOS)
+    valor_anterior = models.CharField(max_length=50, blank=True, null=True)
+    valor_nuevo = models.CharField(max_length=50, blank=True, null=True)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_solicitud', 'created'], name='evento_sol_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('SolicitudEvento es de solo inserción.')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Evento {self.id_evento} - Solicitud {self.id_solicitud_id} {self.campo}"
+
+class SolicitudTiempoEstado(models.Model):
+    """
+    Tiempo acumulado de una Solicitud en cada EstadoSolicitud, mantenido al
+    registrar cada cambio de estado. 'segundos' suma las estadías cerradas;
+    'desde' marca el inicio de la estadía en curso (None si no está en ese estado).
+    """
+    id_solicitud = models.ForeignKey(
+        'Solicitud', related_name='tiempos_estado', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    id_estado = models.ForeignKey('EstadoSolicitud', on_delete=models.CASCADE)
+    segundos = models.PositiveBigIntegerField(default=0)
+    veces = models.PositiveIntegerField(default=0)
+    desde = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_solicitud', 'id_estado'], name='tiempo_sol_estado_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.id_solicitud_id} en {self.id_estado_id}: {self.segundos}s"
+
+class SolicitudFirma(models.Model):
+    """
+    Claves LSH de la firma MinHash de una Solicitud (ver requests/duplicados.py).
+    Cada clave combina una banda de la firma con la zona (geohash) y la semana
+    de creación, de modo que buscar posibles duplicados es un IN sobre 'clave'.
+    """
+    id_solicitud = models.ForeignKey('Solicitud', related_name='firmas', on_delete=models.CASCADE)
+    clave = models.CharField(max_length=48)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['clave', 'id_solicitud'], name='firma_clave_sol_idx'),
+        ]
+
+    def __str__(self):
+        return f"Firma {self.clave} - Solicitud {self.id_solicitud_id}"
+
+# ===================================================================
+# Archivo (tablas frías, ver requests/archivo.py)
+# ===================================================================
+# Copias de las filas con la misma PK. Las FK no tienen restricción en la BD
+# (db_constraint=False) ni relación inversa: el archivo no impide borrar
+# usuarios, encuestas o cuadrillas, y sus índices no crecen con él.
+
+class SolicitudArchivada(models.Model):
+    """ Solicitud cerrada hace más de ARCHIVO_DIAS días, movida por el comando 'archivar_solicitudes'. """
+    id_solicitud = models.IntegerField(primary_key=True)
+    id_encuesta = models.ForeignKey('surveys.Encuesta', related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    id_territorial = models.ForeignKey(User, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    id_cuadrilla = models.ForeignKey(
+        'users.Cuadrilla', related_name='+', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True
+    )
+    id_estado = models.ForeignKey('EstadoSolicitud', related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    titulo = models.CharField(max_length=200)
+    descripcion = models.TextField(blank=True, null=True)
+    ubicacion = models.CharField(max_length=300, blank=True, null=True)
+    latitud = models.FloatField(blank=True, null=True)
+    longitud = models.FloatField(blank=True, null=True)
+    celda = models.CharField(max_length=12, blank=True, null=True)
+    prioridad = models.CharField(max_length=20, choices=Solicitud._meta.get_field('prioridad').choices)
+    state = models.CharField(max_length=20)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archivada = models.DateTimeField()
+
+    def __str__(self):
+        return f"Solicitud archivada {self.id_solicitud} - {self.titulo}"
+
+class RespuestaArchivada(models.Model):
+    id_respuesta = models.IntegerField(primary_key=True)
+    id_pregunta = models.ForeignKey('surveys.Pregunta', related_name='+', on_delete=models.DO_NOTHING, db_constraint=False)
+    id_solicitud = models.ForeignKey(
+        'SolicitudArchivada', related_name='respuestas', on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    respuesta = models.TextField()
+    clave_cliente = models.UUIDField(null=True, blank=True)
+    state = models.CharField(max_length=20)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+
+    def __str__(self):
+        return f"Respuesta archivada {self.id_respuesta}"
+
+class MultimediaArchivada(models.Model):
+    """ Los archivos no se mueven: 'archivo', 'miniatura' y 'mediana' siguen apuntando a MEDIA_ROOT. """
+    id_multimedia = models.IntegerField(primary_key=True)
+    id_respuesta = models.ForeignKey(
+        'RespuestaArchivada', related_name='multimedia_set', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True
+    )
+    id_solicitud = models.ForeignKey(
+        'SolicitudArchivada', related_name='multimedia_set', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True
+    )
+    tipo = models.CharField(max_length=20, choices=Multimedia.TIPOS_MULTIMEDIA)
+    archivo = models.FileField(upload_to='multimedia/')
+    miniatura = models.FileField(upload_to='multimedia/derivados/', blank=True, null=True)
+    mediana = models.FileField(upload_to='multimedia/derivados/', blank=True, null=True)
+    descripcion = models.CharField(max_length=200, blank=True, null=True)
+    state = models.CharField(max_length=20)
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+
+    def __str__(self):
+        return f"Multimedia archivada {self.id_multimedia} - {self.tipo}"
@@ -0,0 +1,65 @@
+# requests/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .busqueda import CAMPOS_BUSQUEDA, actualizar_indice
+from .derivados import encolar_derivados
+from .duplicados import actualizar_firmas
+from .geo import codificar_geohash, parsear_coordenadas
+from .historial import cambios_de, registrar_cambios, tomar_valores
+from .models import Multimedia, Solicitud, Respuesta
+
+
+@receiver(post_save, sender=Multimedia)
+def generar_derivados_multimedia(sender, instance, created, **kwargs):
+    """ Encola miniatura y mediana para imágenes nuevas o que aún no los tienen. """
+    if created or not instance.miniatura:
+        encolar_derivados(instance)
+
+
+@receiver(pre_save, sender=Solicitud)
+def geolocalizar_solicitud(sender, instance, **kwargs):
+    """ Completa latitud/longitud desde 'ubicacion' si trae coordenadas y recalcula la celda. """
+    if instance.latitud is None or instance.longitud is None:
+        coordenadas = parsear_coordenadas(instance.ubicacion)
+        if coordenadas:
+            instance.latitud, instance.longitud = coordenadas
+    if instance.latitud is not None and instance.longitud is not None:
+        instance.celda = codificar_geohash(instance.latitud, instance.longitud)
+    else:
+        instance.celda = None
+
+
+@receiver(post_save, sender=Solicitud)
+def indexar_solicitud(sender, instance, update_fields=None, **kwargs):
+    """ Mantiene el documento de búsqueda al día con título, descripción y ubicación. """
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_BUSQUEDA):
+        return
+    actualizar_indice(instance.pk)
+
+
+@receiver(post_save, sender=Solicitud)
+def firmar_solicitud(sender, instance, update_fields=None, **kwargs):
+    """ Recalcula las claves LSH de duplicados si cambió el texto o la ubicación. """
+    if update_fields is not None and not set(update_fields) & {'titulo', 'descripcion', 'latitud', 'longitud'}:
+        return
+    actualizar_firmas(instance)
+
+
+@receiver(post_save, sender=Solicitud)
+def registrar_historial(sender, instance, created, **kwargs):
+    """ Agrega al historial los cambios de un save(), en su misma transacción (ver Solicitud.save). """
+    # Las vistas pueden indicar quién hizo el cambio con instance._usuario_cambio
+    registrar_cambios(cambios_de(instance, creada=created), usuario=getattr(instance, '_usuario_cambio', None))
+    tomar_valores(instance)
+
+
+@receiver(post_save, sender=Respuesta)
+def indexar_respuesta(sender, instance, **kwargs):
+    actualizar_indice(instance.id_solicitud_id)
+
+
+@receiver(post_delete, sender=Respuesta)
+def desindexar_respuesta(sender, instance, **kwargs):
+    # Al borrar una Solicitud sus Respuestas se eliminan en cascada: no recrear el documento
+    actualizar_indice(instance.id_solicitud_id, crear=False)
@@ -0,0 +1,348 @@
+# requests/sincronizacion.py
+"""
+Sincronización por lotes para cuadrillas que trabajan sin cobertura.
+
+El dispositivo guarda las respuestas y los adjuntos mientras no hay señal y
+después los envía todos en un POST a 'sincronizar/':
+
+    {
+      "token": "<token de la sincronización anterior o null>",
+      "respuestas": [
+        {"clave_cliente": "<uuid>", "solicitud": 12, "pregunta": 3, "respuesta": "...",
+         "adjuntos": [{"clave_cliente": "<uuid>", "nombre": "foto.jpg", "tamano": 183422,
+                       "tipo": "imagen", "descripcion": "..."}]}
+      ]
+    }
+
+- Cada respuesta y cada adjunto lleva un UUID generado en el dispositivo.
+  Reenviar el mismo lote (por ejemplo, si se cortó la respuesta del
+  servidor) no duplica nada: lo ya recibido vuelve en 'duplicadas'.
+- Las respuestas válidas se guardan en una sola transacción con un
+  bulk_create. Las inválidas vuelven en 'rechazadas' con el motivo y no
+  impiden guardar las demás.
+- Un adjunto se guarda como una CargaMultimedia cuyo id_carga es el UUID
+  del cliente. El archivo se sube después con el protocolo reanudable de
+  requests/cargas.py, usando la 'url' devuelta.
+- 'cambios' trae lo modificado en el servidor desde el token recibido:
+  solicitudes visibles, sus respuestas y las definiciones de sus encuestas.
+  Hay que guardar el 'token' nuevo para la próxima sincronización.
+- Los cambios se paginan (SYNC_MAX_CAMBIOS filas de cada tipo, por
+  updated e id). Con 'cambios.completo' en false el 'token' es de
+  continuación: hay que volver a sincronizar con él hasta que sea true.
+"""
+import base64
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from surveys.cache import definicion_encuesta
+from .busqueda import actualizar_indice
+from .cargas import ErrorCarga, iniciar_carga
+from .listado import solicitudes_visibles
+from .models import CargaMultimedia, Multimedia, Respuesta, SolicitudArchivada
+
+SYNC_MAX_RESPUESTAS = getattr(settings, 'SYNC_MAX_RESPUESTAS', 500)
+# Filas de solicitudes (y de respuestas) por página de cambios
+SYNC_MAX_CAMBIOS = getattr(settings, 'SYNC_MAX_CAMBIOS', 500)
+# Los cambios se piden desde un poco antes del token: una transacción que
+# confirma tarde con un 'updated' anterior no se pierde (el cliente deduplica por id)
+SYNC_MARGEN_SEGUNDOS = getattr(settings, 'SYNC_MARGEN_SEGUNDOS', 5)
+
+
+class ErrorSincronizacion(Exception):
+    """ El lote completo es inválido (se responde 400). """
+
+
+def codificar_token(momento, continuacion=None):
+    """
+    Token con el momento de esta sincronización. Si quedan cambios por enviar,
+    'continuacion' ({'desde', 'solicitudes', 'respuestas'}) guarda dónde seguir.
+    """
+    texto = momento.isoformat() if continuacion is None else json.dumps({'hasta': momento.isoformat(), **continuacion})
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _posicion(valor):
+    # [updated ISO 8601, id] de la última fila enviada, o None si no se envió ninguna
+    if valor is None:
+        return None
+    momento, pk = valor
+    momento = parse_datetime(momento)
+    if momento is None or not isinstance(pk, int):
+        raise ValueError
+    return momento, pk
+
+
+def decodificar_token(token):
+    """
+    (desde, continuacion): momento de la sincronización anterior (None si es
+    la primera) y, en un token de continuación, dónde retomar los cambios.
+    """
+    if not token:
+        return None, None
+    try:
+        texto = base64.urlsafe_b64decode((token + '=' * (-len(token) % 4)).encode()).decode()
+        if not texto.startswith('{'):
+            momento = parse_datetime(texto)
+            if momento is None:
+                raise ValueError
+            return momento, None
+        datos = json.loads(texto)
+        desde = parse_datetime(datos['desde']) if datos['desde'] else None
+        hasta = parse_datetime(datos['hasta'])
+        if hasta is None:
+            raise ValueError
+        continuacion = {
+            'hasta': hasta,
+            'solicitudes': _posicion(datos['solicitudes']),
+            'respuestas': _posicion(datos['respuestas']),
+        }
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise ErrorSincronizacion('Token de sincronización inválido.')
+    return desde, continuacion
+
+
+def _uuid(valor):
+    try:
+        return uuid.UUID(str(valor))
+    except ValueError:
+        raise ValueError('clave_cliente debe ser un UUID.')
+
+
+def _leer_adjunto(adjunto):
+    if not isinstance(adjunto, dict):
+        raise ValueError('Cada adjunto debe ser un objeto.')
+    if adjunto.get('tipo') not in dict(Multimedia.TIPOS_MULTIMEDIA):
+        raise ValueError('Tipo de multimedia no válido.')
+    try:
+        tamano = int(adjunto.get('tamano'))
+    except (TypeError, ValueError):
+        raise ValueError('tamano debe ser un entero.')
+    return {
+        'clave_cliente': _uuid(adjunto.get('clave_cliente')),
+        'nombre': str(adjunto.get('nombre') or 'archivo'),
+        'tamano': tamano,
+        'tipo': adjunto['tipo'],
+        'descripcion': (str(adjunto['descripcion'])[:200] if adjunto.get('descripcion') else None),
+    }
+
+
+def _leer_respuesta(item):
+    """ Valida la forma de un elemento del lote; ValueError con el motivo si no sirve. """
+    if not isinstance(item, dict):
+        raise ValueError('Cada respuesta debe ser un objeto.')
+    texto = item.get('respuesta')
+    if not isinstance(texto, str) or not texto.strip():
+        raise ValueError('La respuesta no puede estar vacía.')
+    try:
+        solicitud_id, pregunta_id = int(item.get('solicitud')), int(item.get('pregunta'))
+    except (TypeError, ValueError):
+        raise ValueError('solicitud y pregunta deben ser IDs numéricos.')
+    adjuntos = item.get('adjuntos') or []
+    if not isinstance(adjuntos, list):
+        raise ValueError('adjuntos debe ser una lista.')
+    return {
+        'clave_cliente': _uuid(item.get('clave_cliente')),
+        'solicitud': solicitud_id,
+        'pregunta': pregunta_id,
+        'respuesta': texto.strip(),
+        'adjuntos': [_leer_adjunto(adjunto) for adjunto in adjuntos],
+    }
+
+
+def _estado_carga(carga):
+    return {
+        'clave_cliente': str(carga.id_carga),
+        'id_carga': str(carga.id_carga),
+        'recibido': carga.recibido,
+        'completada': carga.state == 'Completada',
+        'url': reverse('carga_detalle', args=[carga.id_carga]),
+    }
+
+
+def _registrar_adjuntos(respuesta, adjuntos, usuario, cargas_existentes, resultado):
+    """ Crea (o devuelve, si ya existe) la carga de cada adjunto de la respuesta. """
+    for adjunto in adjuntos:
+        carga = cargas_existentes.get(adjunto['clave_cliente'])
+        if carga is not None:
+            if carga.id_respuesta_id != respuesta.pk:
+                resultado['adjuntos_rechazados'].append({
+                    'clave_cliente': str(adjunto['clave_cliente']), 'error': 'La clave ya se usó en otra respuesta.',
+                })
+                continue
+        else:
+            try:
+                carga = iniciar_carga(
+                    respuesta, usuario, adjunto['tipo'], adjunto['nombre'], adjunto['tamano'],
+                    descripcion=adjunto['descripcion'], id_carga=adjunto['clave_cliente'],
+                )
+            except ErrorCarga as error:
+                resultado['adjuntos_rechazados'].append({'clave_cliente': str(adjunto['clave_cliente']), 'error': str(error)})
+                continue
+            cargas_existentes[carga.pk] = carga
+        resultado['cargas'].append(_estado_carga(carga))
+
+
+def _aplicar(usuario, group_id, items, puede_adjuntar):
+    resultado = {'aplicadas': [], 'duplicadas': [], 'rechazadas': [], 'cargas': [], 'adjuntos_rechazados': []}
+    claves = [item['clave_cliente'] for item in items]
+    existentes = {r.clave_cliente: r for r in Respuesta.objects.filter(clave_cliente__in=claves)}
+    claves_adjuntos = [adjunto['clave_cliente'] for item in items for adjunto in item['adjuntos']]
+    cargas_existentes = CargaMultimedia.objects.in_bulk(claves_adjuntos)
+    solicitudes = solicitudes_visibles(usuario, group_id).select_related('id_cuadrilla').in_bulk(
+        {item['solicitud'] for item in items} | {respuesta.id_solicitud_id for respuesta in existentes.values()}
+    )
+
+    nuevas, duplicadas = [], []
+    for item in items:
+        clave = item['clave_cliente']
+        existente = existentes.get(clave)
+        # Un reenvío se valida contra la solicitud de la respuesta ya guardada
+        solicitud = solicitudes.get(existente.id_solicitud_id if existente else item['solicitud'])
+        definicion = definicion_encuesta(solicitud.id_encuesta_id) if solicitud and not existente else None
+        if solicitud is None:
+            error = 'La solicitud no existe o no está asignada a tu cuadrilla.'
+        elif not existente and (definicion is None or item['pregunta'] not in definicion.ids_preguntas):
+            error = 'La pregunta no pertenece a la encuesta de la solicitud.'
+        elif item['adjuntos'] and not puede_adjuntar(solicitud):
+            error = 'No tienes permiso para añadir multimedia a esta solicitud.'
+        else:
+            (duplicadas if existente else nuevas).append(item)
+            continue
+        resultado['rechazadas'].append({'clave_cliente': str(clave), 'error': error})
+
+    with transaction.atomic():
+        creadas = Respuesta.objects.bulk_create([
+            Respuesta(
+                id_solicitud_id=item['solicitud'], id_pregunta_id=item['pregunta'],
+                respuesta=item['respuesta'], clave_cliente=item['clave_cliente'],
+            )
+            for item in nuevas
+        ])
+        for respuesta, item in zip(creadas, nuevas):
+            resultado['aplicadas'].append({'clave_cliente': str(item['clave_cliente']), 'id_respuesta': respuesta.pk})
+            _registrar_adjuntos(respuesta, item['adjuntos'], usuario, cargas_existentes, resultado)
+        # Un reenvío también recibe sus cargas (el cliente pudo perder la respuesta anterior)
+        for item in duplicadas:
+            respuesta = existentes[item['clave_cliente']]
+            resultado['duplicadas'].append({'clave_cliente': str(item['clave_cliente']), 'id_respuesta': respuesta.pk})
+            _registrar_adjuntos(respuesta, item['adjuntos'], usuario, cargas_existentes, resultado)
+        # bulk_create no dispara señales: índice de búsqueda a mano
+        for solicitud_id in {item['solicitud'] for item in nuevas}:
+            actualizar_indice(solicitud_id)
+    return resultado
+
+
+def _pagina_cambios(queryset, pk, posicion, limite):
+    """ (filas, posición de la última, quedan más) por keyset sobre (updated, pk). """
+    if posicion is not None:
+        updated, ultimo = posicion
+        queryset = queryset.filter(Q(updated__gt=updated) | Q(updated=updated, **{f'{pk}__gt': ultimo}))
+    filas = list(queryset[:limite + 1])
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if filas:
+        posicion = (filas[-1]['updated'], filas[-1][pk])
+    return filas, posicion, hay_mas
+
+
+def cambios_desde(usuario, group_id, desde, continuacion=None, limite=SYNC_MAX_CAMBIOS):
+    """
+    Una página de las solicitudes visibles, sus respuestas y sus encuestas
+    modificadas desde 'desde' (todo si es None). Retorna (cambios, continuación
+    para codificar_token o None si no queda nada).
+    """
+    visibles = solicitudes_visibles(usuario, group_id)
+    solicitudes = visibles.order_by('updated', 'id_solicitud')
+    respuestas = Respuesta.objects.filter(id_solicitud__in=visibles.values('pk')).order_by('updated', 'id_respuesta')
+    retiradas = []
+    if desde is not None:
+        margen = desde - timedelta(seconds=SYNC_MARGEN_SEGUNDOS)
+        solicitudes = solicitudes.filter(updated__gte=margen)
+        respuestas = respuestas.filter(updated__gte=margen)
+        if continuacion is None:
+            # Bloqueadas o archivadas desde la última vez (solo en la primera página): el dispositivo debe quitarlas
+            retiradas = list(
+                solicitudes_visibles(usuario, group_id, state='Bloqueado').filter(updated__gte=margen).values_list('pk', flat=True)
+            )
+            retiradas += solicitudes_visibles(usuario, group_id, modelo=SolicitudArchivada).filter(
+                archivada__gte=margen
+            ).values_list('pk', flat=True)
+
+    continuacion = continuacion or {'solicitudes': None, 'respuestas': None}
+    solicitudes, posicion_solicitudes, mas_solicitudes = _pagina_cambios(solicitudes.values(
+        'id_solicitud', 'titulo', 'descripcion', 'ubicacion', 'latitud', 'longitud', 'prioridad',
+        'id_estado', 'id_encuesta', 'updated', estado_nombre=F('id_estado__nombre_estado'),
+    ), 'id_solicitud', continuacion['solicitudes'], limite)
+    respuestas, posicion_respuestas, mas_respuestas = _pagina_cambios(respuestas.values(
+        'id_respuesta', 'id_solicitud', 'id_pregunta', 'respuesta', 'clave_cliente', 'created', 'updated',
+    ), 'id_respuesta', continuacion['respuestas'], limite)
+    encuestas = {}
+    for encuesta_id in {solicitud['id_encuesta'] for solicitud in solicitudes}:
+        definicion = definicion_encuesta(encuesta_id)
+        if definicion is not None:
+            encuestas[encuesta_id] = {
+                'titulo': definicion.encuesta.titulo,
+                'preguntas': [{'id': p.pk, 'texto': p.texto_pregunta} for p in definicion.preguntas],
+            }
+    siguiente = None
+    if mas_solicitudes or mas_respuestas:
+        siguiente = {
+            'desde': desde.isoformat() if desde else None,
+            'solicitudes': [posicion_solicitudes[0].isoformat(), posicion_solicitudes[1]] if posicion_solicitudes else None,
+            'respuestas': [posicion_respuestas[0].isoformat(), posicion_respuestas[1]] if posicion_respuestas else None,
+        }
+    return {
+        'solicitudes': solicitudes,
+        'respuestas': respuestas,
+        'encuestas': encuestas,
+        'retiradas': retiradas,
+        'completo': siguiente is None,
+    }, siguiente
+
+
+def sincronizar_lote(usuario, group_id, datos, puede_adjuntar):
+    """
+    Aplica el lote enviado por el dispositivo y devuelve el resultado con los
+    cambios del servidor. 'puede_adjuntar(solicitud)' decide los permisos de multimedia.
+    """
+    if not isinstance(datos, dict):
+        raise ErrorSincronizacion('El cuerpo debe ser un objeto JSON.')
+    desde, continuacion = decodificar_token(datos.get('token'))
+    items = datos.get('respuestas') or []
+    if not isinstance(items, list):
+        raise ErrorSincronizacion('respuestas debe ser una lista.')
+    if len(items) > SYNC_MAX_RESPUESTAS:
+        raise ErrorSincronizacion(f'Máximo {SYNC_MAX_RESPUESTAS} respuestas por sincronización.')
+
+    # El token nuevo se toma antes de leer: lo que cambie durante la sincronización vuelve la próxima vez.
+    # Al paginar se conserva el de la primera página
+    ahora = continuacion['hasta'] if continuacion else timezone.now()
+    validos, rechazadas, vistas = [], [], set()
+    for item in items:
+        try:
+            leido = _leer_respuesta(item)
+        except ValueError as error:
+            clave = item.get('clave_cliente') if isinstance(item, dict) else None
+            rechazadas.append({'clave_cliente': clave, 'error': str(error)})
+            continue
+        if leido['clave_cliente'] not in vistas:  # Repetida dentro del mismo lote
+            vistas.add(leido['clave_cliente'])
+            validos.append(leido)
+
+    try:
+        resultado = _aplicar(usuario, group_id, validos, puede_adjuntar)
+    except IntegrityError:
+        # Otro envío del mismo lote se confirmó entre la lectura y el INSERT: ahora son duplicadas
+        resultado = _aplicar(usuario, group_id, validos, puede_adjuntar)
+    resultado['rechazadas'] = rechazadas + resultado['rechazadas']
+    resultado['cambios'], siguiente = cambios_desde(usuario, group_id, desde, continuacion, SYNC_MAX_CAMBIOS)
+    resultado['token'] = codificar_token(ahora, siguiente)
+    return resultado
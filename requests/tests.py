@@ -1,3 +1,814 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.contadores import obtener as obtener_contadores, verificar as verificar_contadores
+from core.roles import GRUPO_ADMIN, GRUPO_CUADRILLA, GRUPO_TERRITORIAL, invalidar_rol
+from organization.models import Direccion, Departamento
+from registration.models import Profile
+from surveys.models import TipoEncuesta, Encuesta, Pregunta
+from users.models import Cuadrilla
+from . import cargas, derivados, sincronizacion
+from .archivo import archivables, archivar, archivar_lote
+from .asignacion import Planificador, aplicar_plan, asignar_cuadrilla, planificar_pendientes
+from .busqueda import buscar_ids, buscar_solicitudes
+from .duplicados import posibles_duplicados
+from .exportar import NOMBRES_COLUMNAS
+from .geo import codificar_geohash, cercanas, en_caja, parsear_coordenadas
+from .historial import registrar_cambios
+from .listado import aplicar_filtros, decodificar_cursor, paginar_keyset, solicitudes_visibles
+from .models import (
+    Solicitud, Respuesta, EstadoSolicitud, CargaMultimedia, Multimedia, MultimediaArchivada, SolicitudArchivada, SolicitudBusqueda,
+    SolicitudEvento, SolicitudTiempoEstado,
+)
+from .sincronizacion import ErrorSincronizacion, sincronizar_lote
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class SolicitudIndexesTest(TestCase):
+    """ Verifica que el planificador de SQLite usa los índices compuestos de los listados. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('territorial_test')
+
+    def assertUsaIndice(self, queryset, nombre_indice):
+        plan = queryset.explain()
+        self.assertIn(nombre_indice, plan, f'Plan sin {nombre_indice}:\n{plan}')
+
+    def test_listado_por_state(self):
+        queryset = Solicitud.objects.filter(state='Activo').order_by('-created')
+        self.assertUsaIndice(queryset, 'sol_state_created_idx')
+
+    def test_listado_territorial(self):
+        queryset = Solicitud.objects.filter(id_territorial=self.user, state='Activo').order_by('-created')
+        self.assertUsaIndice(queryset, 'sol_terr_state_created_idx')
+
+    def test_listado_cuadrilla(self):
+        queryset = Solicitud.objects.filter(id_cuadrilla_id=1, state='Activo').order_by('-created')
+        self.assertUsaIndice(queryset, 'sol_cuad_state_created_idx')
+
+    def test_listado_por_estado(self):
+        queryset = Solicitud.objects.filter(id_estado_id=1).order_by('-created')
+        self.assertUsaIndice(queryset, 'sol_estado_created_idx')
+
+    def test_respuestas_de_solicitud(self):
+        queryset = Respuesta.objects.filter(id_solicitud_id=1).order_by('id_pregunta', 'created')
+        self.assertUsaIndice(queryset, 'resp_sol_preg_created_idx')
+
+
+class SolicitudTestCase(TestCase):
+    """ Datos mínimos (encuesta, pregunta, estados) para crear Solicitudes. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('territorial_test')
+        direccion = Direccion.objects.create(usuario=cls.user, nombre_direccion='Obras')
+        departamento = Departamento.objects.create(id_direccion=direccion, usuario=cls.user, nombre_departamento='Vialidad')
+        tipo = TipoEncuesta.objects.create(nombre_tipo='Reclamo')
+        cls.encuesta = Encuesta.objects.create(id_departamento=departamento, id_tipo_encuesta=tipo, titulo='Baches', descripcion='Reclamos de baches')
+        cls.pregunta = Pregunta.objects.create(id_encuesta=cls.encuesta, texto_pregunta='¿Detalle?')
+        cls.estado = EstadoSolicitud.objects.create(nombre_estado='Creada')
+
+    def crear_solicitud(self, **campos):
+        return Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=self.user, id_estado=self.estado, **campos
+        )
+
+    @classmethod
+    def crear_usuario(cls, username, grupo):
+        """ User con Profile del grupo indicado (ver core/roles.py). """
+        Group.objects.get_or_create(pk=grupo, defaults={'name': f'Grupo {grupo}'})
+        usuario = User.objects.create_user(username)
+        Profile.objects.create(user=usuario, group_id=grupo)
+        # El rol se cachea por id y los ids se repiten entre tests
+        invalidar_rol(usuario.pk)
+        return usuario
+
+
+class ListadoSolicitudTest(SolicitudTestCase):
+    """ Paginación por cursor, filtros y alcance por rol del listado. """
+
+    def test_cursor_recorre_todas_sin_repetir(self):
+        creadas = [self.crear_solicitud(titulo=f'S{n}') for n in range(5)]
+        # Misma fecha para todas: el desempate por id_solicitud debe mantener el orden
+        Solicitud.objects.update(created=creadas[0].created)
+        vistas, cursor = [], None
+        for _ in range(3):
+            pagina, cursor = paginar_keyset(Solicitud.objects.all(), cursor=cursor, por_pagina=2)
+            vistas += [s.pk for s in pagina]
+            if cursor is None:
+                break
+        self.assertEqual(vistas, sorted((s.pk for s in creadas), reverse=True))
+        self.assertIsNone(cursor)
+
+        ascendente, _ = paginar_keyset(Solicitud.objects.all(), ascendente=True, por_pagina=2)
+        self.assertEqual([s.pk for s in ascendente], [creadas[0].pk, creadas[1].pk])
+        self.assertIsNone(decodificar_cursor('no-es-un-cursor'))
+
+    def test_cuadrillas_del_listado_por_autocompletar(self):
+        admin = self.crear_usuario('admin_listado', GRUPO_ADMIN)
+        departamento = self.encuesta.id_departamento
+        elegida = Cuadrilla.objects.create(nombre_cuadrilla='Elegida', departamento=departamento, jefe=admin)
+        Cuadrilla.objects.create(nombre_cuadrilla='Otra', departamento=departamento, jefe=admin)
+        self.client.force_login(admin)
+        html = self.client.get(reverse('main_requests'), {'cuadrilla': elegida.pk}).content.decode()
+        # Filtro y acción masiva solo renderizan la opción elegida; el resto se busca al escribir
+        self.assertEqual(html.count('data-autocompletar="'), 2)
+        self.assertIn('Elegida', html)
+        self.assertNotIn('Otra', html)
+
+    def test_filtros_y_alcance_por_rol(self):
+        otro = User.objects.create_user('otro_territorial')
+        cuadrilla = Cuadrilla.objects.create(nombre_cuadrilla='C1', departamento=self.encuesta.id_departamento, jefe=otro)
+        propia = self.crear_solicitud(titulo='Propia', prioridad='alta')
+        self.crear_solicitud(titulo='Propia baja', prioridad='baja')
+        ajena = Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=otro, id_estado=self.estado, titulo='Ajena', id_cuadrilla=cuadrilla
+        )
+        self.crear_solicitud(titulo='Bloqueada', state='Bloqueado')
+
+        territorial = solicitudes_visibles(self.user, GRUPO_TERRITORIAL)
+        self.assertEqual(territorial.count(), 2)
+        self.assertEqual(list(aplicar_filtros(territorial, {'prioridad': 'alta'})), [propia])
+        self.assertEqual(list(solicitudes_visibles(otro, GRUPO_CUADRILLA)), [ajena])
+        self.assertEqual(solicitudes_visibles(self.user, GRUPO_ADMIN).count(), 3)
+        hoy = timezone.localdate()
+        self.assertEqual(aplicar_filtros(territorial, {'desde': hoy, 'hasta': hoy}).count(), 2)
+        self.assertFalse(aplicar_filtros(territorial, {'desde': hoy + timedelta(days=1)}).exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'La tabla FTS5 solo existe en SQLite')
+class BusquedaSolicitudTest(SolicitudTestCase):
+    """ Búsqueda de texto completo: sincronización al guardar, tildes y alcance. """
+
+    def test_busqueda_sin_tildes_y_por_prefijo(self):
+        solicitud = self.crear_solicitud(titulo='Socavón en avenida', ubicacion='Pasaje Ñuñoa 123')
+        self.assertEqual(buscar_ids('socavon'), [solicitud.pk])
+        self.assertEqual(buscar_ids('NUÑO'), [solicitud.pk])
+        self.assertEqual(buscar_ids('socavón inexistente'), [])
+
+    def test_respuestas_se_indexan_y_desindexan(self):
+        solicitud = self.crear_solicitud(titulo='Luminaria')
+        respuesta = Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=solicitud, respuesta='Poste caído')
+        self.assertEqual(buscar_ids('poste'), [solicitud.pk])
+        respuesta.delete()
+        self.assertEqual(buscar_ids('poste'), [])
+
+    def test_orden_por_relevancia_y_alcance(self):
+        poca = self.crear_solicitud(titulo='Árbol', descripcion='ramas en la vereda')
+        mucha = self.crear_solicitud(titulo='Árbol caído', descripcion='árbol sobre árbol')
+        self.assertEqual(buscar_ids('arbol'), [mucha.pk, poca.pk])
+        visibles = Solicitud.objects.exclude(pk=mucha.pk)
+        self.assertEqual(buscar_solicitudes(visibles, 'arbol'), [poca.pk])
+        # El alcance se aplica antes del tope: la más relevante no visible no ocupa el único lugar
+        self.assertEqual(buscar_ids('arbol', limite=1), [mucha.pk])
+        self.assertEqual(buscar_solicitudes(visibles, 'arbol', limite=1), [poca.pk])
+        territorial = self.crear_usuario('territorial_busca', GRUPO_TERRITORIAL)
+        self.assertEqual(buscar_solicitudes(solicitudes_visibles(territorial, GRUPO_TERRITORIAL), 'arbol'), [])
+
+    def test_eliminar_solicitud(self):
+        solicitud = self.crear_solicitud(titulo='Semáforo')
+        Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=solicitud, respuesta='apagado')
+        solicitud.delete()
+        self.assertEqual(buscar_ids('semaforo'), [])
+
+
+class HistorialSolicitudTest(SolicitudTestCase):
+    """ Eventos de solo inserción y tiempos por estado mantenidos al cambiar. """
+
+    def test_save_registra_solo_cambios(self):
+        solicitud = self.crear_solicitud(titulo='Vereda')
+        solicitud = Solicitud.objects.get(pk=solicitud.pk)
+        solicitud.titulo = 'Vereda rota'
+        solicitud.save()
+        solicitud.state = 'Bloqueado'
+        solicitud.save()
+        campos = list(SolicitudEvento.objects.filter(id_solicitud=solicitud).values_list('campo', 'valor_nuevo'))
+        self.assertEqual(campos, [('estado', str(self.estado.pk)), ('state', 'Activo'), ('state', 'Bloqueado')])
+
+    def test_save_sin_evento_no_se_confirma(self):
+        solicitud = Solicitud.objects.get(pk=self.crear_solicitud(titulo='Vereda').pk)
+        solicitud.state = 'Bloqueado'
+        with mock.patch('requests.signals.registrar_cambios', side_effect=RuntimeError('historial')):
+            with self.assertRaises(RuntimeError):
+                solicitud.save()
+        self.assertEqual(Solicitud.objects.get(pk=solicitud.pk).state, 'Activo')
+
+    def test_tiempos_por_estado(self):
+        derivada = EstadoSolicitud.objects.create(nombre_estado='Derivada')
+        solicitud = self.crear_solicitud(titulo='Poste')
+        inicio = SolicitudTiempoEstado.objects.get(id_solicitud=solicitud, id_estado=self.estado).desde
+        registrar_cambios([(solicitud.pk, 'estado', self.estado.pk, derivada.pk)], momento=inicio + timedelta(hours=3))
+        registrar_cambios([(solicitud.pk, 'estado', derivada.pk, self.estado.pk)], momento=inicio + timedelta(hours=4))
+
+        creada = SolicitudTiempoEstado.objects.get(id_solicitud=solicitud, id_estado=self.estado)
+        en_derivada = SolicitudTiempoEstado.objects.get(id_solicitud=solicitud, id_estado=derivada)
+        self.assertEqual((creada.segundos, creada.veces), (3 * 3600, 2))
+        self.assertEqual(creada.desde, inicio + timedelta(hours=4))
+        self.assertEqual((en_derivada.segundos, en_derivada.desde), (3600, None))
+
+    def test_eventos_sobreviven_y_no_se_modifican(self):
+        solicitud = self.crear_solicitud(titulo='Árbol')
+        solicitud_id = solicitud.pk
+        evento = SolicitudEvento.objects.filter(id_solicitud_id=solicitud_id).first()
+        with self.assertRaises(ValueError):
+            evento.save()
+        solicitud.delete()
+        self.assertTrue(SolicitudEvento.objects.filter(id_solicitud_id=solicitud_id).exists())
+
+
+class GeoSolicitudTest(SolicitudTestCase):
+    """ Coordenadas, celda geohash y consultas por cercanía. """
+
+    def test_geohash(self):
+        self.assertEqual(codificar_geohash(57.64911, 10.40744), 'u4pruydqq')
+
+    def test_coordenadas_desde_ubicacion(self):
+        solicitud = self.crear_solicitud(titulo='Bache', ubicacion='Av. Matta (-33.4569, -70.6483)')
+        self.assertEqual((solicitud.latitud, solicitud.longitud), (-33.4569, -70.6483))
+        self.assertEqual(solicitud.celda, codificar_geohash(-33.4569, -70.6483))
+        self.assertIsNone(self.crear_solicitud(titulo='Sin coordenadas', ubicacion='Calle 1').celda)
+
+    def test_direcciones_no_son_coordenadas(self):
+        for texto in ('Pasaje 5, 120 Santiago', 'Km 12, 45 sur', 'Block 4.5, 3.2', 'Lote 123.4567, 45.678', '-95.1234, 10.1234'):
+            with self.subTest(texto=texto):
+                self.assertIsNone(parsear_coordenadas(texto))
+        self.assertEqual(parsear_coordenadas('Plaza; -33.4489;-70.6693'), (-33.4489, -70.6693))
+        solicitud = self.crear_solicitud(titulo='Pasaje', ubicacion='Pasaje 5, 120 Santiago')
+        self.assertEqual((solicitud.latitud, solicitud.longitud, solicitud.celda), (None, None, None))
+
+    def test_cercanas_y_caja(self):
+        cerca = self.crear_solicitud(titulo='A', latitud=-33.4500, longitud=-70.6600)
+        a_300m = self.crear_solicitud(titulo='B', latitud=-33.4527, longitud=-70.6600)
+        self.crear_solicitud(titulo='Lejos', latitud=-33.5000, longitud=-70.6600)
+
+        resultado = cercanas(Solicitud.objects.all(), -33.4501, -70.6600, 400)
+        self.assertEqual([solicitud for solicitud, _ in resultado], [cerca, a_300m])
+        self.assertLess(resultado[0][1], resultado[1][1])
+
+        caja = en_caja(Solicitud.objects.all(), -33.46, -70.67, -33.44, -70.65)
+        self.assertEqual(set(caja), {cerca, a_300m})
+
+
+class DuplicadosSolicitudTest(SolicitudTestCase):
+    """ Detección de solicitudes parecidas por MinHash/LSH, zona y fecha. """
+
+    TITULO = 'Bache profundo en calzada'
+    DESCRIPCION = 'Hay un bache grande frente al número 1234 de Av. Matta, peligroso para ciclistas'
+
+    def test_detecta_texto_parecido_en_la_zona(self):
+        original = self.crear_solicitud(titulo=self.TITULO, descripcion=self.DESCRIPCION, latitud=-33.4569, longitud=-70.6483)
+        self.crear_solicitud(titulo='Luminaria apagada', descripcion='Poste sin luz en la esquina', latitud=-33.4569, longitud=-70.6483)
+        self.crear_solicitud(titulo=self.TITULO, descripcion=self.DESCRIPCION, latitud=-33.5200, longitud=-70.6483)
+
+        resultado = posibles_duplicados(
+            'Bache profundo en la calzada', 'Bache grande frente al 1234 de Av Matta, peligroso para ciclistas',
+            latitud=-33.4570, longitud=-70.6484,
+        )
+        self.assertEqual([solicitud for solicitud, _ in resultado], [original])
+        self.assertGreaterEqual(resultado[0][1], 0.5)
+
+        # Texto distinto en el mismo lugar: no es duplicado
+        self.assertEqual(posibles_duplicados('Árbol caído', 'Rama sobre la vereda', latitud=-33.4569, longitud=-70.6483), [])
+
+    def test_firmas_siguen_al_texto_y_al_state(self):
+        solicitud = self.crear_solicitud(titulo='Microbasural', descripcion='Acumulación de basura en el pasaje', ubicacion='Calle 1')
+        self.assertTrue(posibles_duplicados('Microbasural', 'Acumulación de basura en el pasaje'))
+
+        solicitud.descripcion = 'Perro abandonado en la plaza'
+        solicitud.save()
+        self.assertEqual(posibles_duplicados('Microbasural', 'Acumulación de basura en el pasaje'), [])
+
+        solicitud.state = 'Bloqueado'
+        solicitud.save(update_fields=['state'])
+        self.assertEqual(posibles_duplicados('Microbasural', 'Perro abandonado en la plaza'), [])
+
+    def test_avisa_duplicados_de_otro_territorial(self):
+        Group.objects.create(pk=GRUPO_TERRITORIAL, name='Territorial')
+        primero = self.crear_usuario('territorial_a', GRUPO_TERRITORIAL)
+        segundo = self.crear_usuario('territorial_b', GRUPO_TERRITORIAL)
+        original = Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=primero, id_estado=self.estado,
+            titulo=self.TITULO, descripcion=self.DESCRIPCION, latitud=-33.4569, longitud=-70.6483,
+        )
+        self.client.force_login(segundo)
+        respuesta = self.client.post(reverse('solicitud_crear'), {
+            'titulo': self.TITULO, 'descripcion': self.DESCRIPCION, 'id_encuesta': self.encuesta.pk,
+            'id_territorial': segundo.pk, 'latitud': -33.4570, 'longitud': -70.6484, 'prioridad': 'normal',
+            'id_estado': self.estado.pk,
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([solicitud for solicitud, _ in respuesta.context['duplicados']], [original])
+        self.assertEqual(Solicitud.objects.count(), 1)
+
+
+class AsignacionCuadrillaTest(SolicitudTestCase):
+    """ Reparto de solicitudes sin cuadrilla según la carga abierta de cada una. """
+
+    def setUp(self):
+        departamento = self.encuesta.id_departamento
+        self.ocupada = Cuadrilla.objects.create(nombre_cuadrilla='Ocupada', departamento=departamento, jefe=self.user)
+        self.libre = Cuadrilla.objects.create(nombre_cuadrilla='Libre', departamento=departamento, jefe=self.user)
+        for _ in range(2):
+            self.crear_solicitud(titulo='Asignada', id_cuadrilla=self.ocupada)
+
+    def test_asignar_cuadrilla_elige_la_menos_cargada(self):
+        solicitud = Solicitud(id_encuesta=self.encuesta, titulo='Nueva')
+        self.assertEqual(asignar_cuadrilla(solicitud), self.libre)
+
+    def test_asignacion_masiva_por_prioridad_y_carga(self):
+        baja = self.crear_solicitud(titulo='Baja', prioridad='baja')
+        alta = [self.crear_solicitud(titulo=f'Alta {n}', prioridad='alta') for n in range(3)]
+
+        plan = planificar_pendientes(Planificador())
+        # Las de prioridad alta primero; la libre las toma hasta empatar con la ocupada
+        self.assertEqual([pk for pk, _ in plan], [s.pk for s in alta] + [baja.pk])
+        self.assertEqual([c for _, c in plan][:2], [self.libre.pk, self.libre.pk])
+
+        aplicar_plan(plan)
+        self.assertFalse(Solicitud.objects.filter(id_cuadrilla__isnull=True).exists())
+        self.assertEqual(obtener_contadores('cuadrilla_abiertas'), {self.ocupada.pk: 3, self.libre.pk: 3})
+        self.assertEqual(SolicitudEvento.objects.filter(campo='cuadrilla', id_solicitud=baja).count(), 1)
+
+
+class SincronizacionTest(SolicitudTestCase):
+    """ Lote offline de las cuadrillas: idempotente por clave_cliente y con cambios desde el token. """
+
+    def sincronizar(self, respuestas, token=None, group_id=GRUPO_ADMIN):
+        datos = {'token': token, 'respuestas': respuestas}
+        return sincronizar_lote(self.user, group_id, datos, lambda solicitud: True)
+
+    def test_reenvio_no_duplica(self):
+        solicitud = self.crear_solicitud(titulo='Bache')
+        clave = str(uuid.uuid4())
+        lote = [
+            {'clave_cliente': clave, 'solicitud': solicitud.pk, 'pregunta': self.pregunta.pk, 'respuesta': 'Hondo'},
+            {'clave_cliente': clave, 'solicitud': solicitud.pk, 'pregunta': self.pregunta.pk, 'respuesta': 'Hondo'},
+            {'clave_cliente': 'no-es-uuid', 'solicitud': solicitud.pk, 'pregunta': self.pregunta.pk, 'respuesta': 'x'},
+        ]
+        primero = self.sincronizar(lote)
+        self.assertEqual(len(primero['aplicadas']), 1)
+        self.assertEqual(len(primero['rechazadas']), 1)
+
+        segundo = self.sincronizar(lote, token=primero['token'])
+        self.assertEqual(segundo['aplicadas'], [])
+        self.assertEqual(segundo['duplicadas'], primero['aplicadas'])
+        self.assertEqual(Respuesta.objects.filter(clave_cliente=clave).count(), 1)
+
+    def test_cambios_segun_visibilidad_y_token(self):
+        cuadrilla = Cuadrilla.objects.create(nombre_cuadrilla='C1', departamento=self.encuesta.id_departamento, jefe=self.user)
+        asignada = self.crear_solicitud(titulo='Asignada', id_cuadrilla=cuadrilla)
+        ajena = self.crear_solicitud(titulo='Ajena')
+
+        resultado = self.sincronizar([
+            {'clave_cliente': str(uuid.uuid4()), 'solicitud': ajena.pk, 'pregunta': self.pregunta.pk, 'respuesta': 'x'},
+        ], group_id=GRUPO_CUADRILLA)
+        self.assertEqual(len(resultado['rechazadas']), 1)
+        self.assertEqual([s['id_solicitud'] for s in resultado['cambios']['solicitudes']], [asignada.pk])
+        self.assertIn(self.encuesta.pk, resultado['cambios']['encuestas'])
+
+        # Sin cambios posteriores al margen del token: no se reenvía nada
+        Solicitud.objects.filter(pk=asignada.pk).update(updated=asignada.updated - timedelta(hours=1))
+        resultado = self.sincronizar([], token=resultado['token'], group_id=GRUPO_CUADRILLA)
+        self.assertEqual(resultado['cambios']['solicitudes'], [])
+
+    def test_reenvio_respeta_visibilidad_y_permisos(self):
+        solicitud = self.crear_solicitud(titulo='Bache')
+        clave = str(uuid.uuid4())
+        item = {'clave_cliente': clave, 'solicitud': solicitud.pk, 'pregunta': self.pregunta.pk, 'respuesta': 'Hondo'}
+        self.sincronizar([item])
+
+        # La misma clave desde una cuadrilla que no ve la solicitud: rechazada, sin revelar la respuesta
+        resultado = self.sincronizar([item], group_id=GRUPO_CUADRILLA)
+        self.assertEqual(resultado['duplicadas'], [])
+        self.assertEqual([r['clave_cliente'] for r in resultado['rechazadas']], [clave])
+
+        # Reenvío con adjuntos sin permiso de multimedia: no se crea la carga
+        adjunto = {'clave_cliente': str(uuid.uuid4()), 'nombre': 'foto.jpg', 'tamano': 10, 'tipo': 'imagen'}
+        resultado = sincronizar_lote(self.user, GRUPO_ADMIN, {'respuestas': [{**item, 'adjuntos': [adjunto]}]}, lambda solicitud: False)
+        self.assertEqual((resultado['duplicadas'], resultado['cargas']), ([], []))
+        self.assertEqual(len(resultado['rechazadas']), 1)
+        self.assertFalse(CargaMultimedia.objects.exists())
+
+    def test_cambios_paginados(self):
+        solicitudes = [self.crear_solicitud(titulo=f'S{n}') for n in range(5)]
+        # Mismo 'updated' para todas (como tras una acción masiva): el keyset desempata por id
+        Solicitud.objects.update(updated=timezone.now())
+        vistas, token = [], None
+        with mock.patch.object(sincronizacion, 'SYNC_MAX_CAMBIOS', 2):
+            for _ in range(3):
+                resultado = self.sincronizar([], token=token)
+                vistas += [s['id_solicitud'] for s in resultado['cambios']['solicitudes']]
+                token = resultado['token']
+        self.assertEqual(vistas, [s.pk for s in solicitudes])
+        self.assertTrue(resultado['cambios']['completo'])
+        # El último token vuelve a ser el de una sincronización completa
+        desde, continuacion = sincronizacion.decodificar_token(token)
+        self.assertIsNone(continuacion)
+        self.assertIsNotNone(desde)
+
+        with mock.patch.object(sincronizacion, 'SYNC_MAX_CAMBIOS', 2):
+            primera = self.sincronizar([])
+        self.assertFalse(primera['cambios']['completo'])
+        with self.assertRaises(ErrorSincronizacion):
+            self.sincronizar([], token='no-es-un-token')
+
+
+class ArchivoSolicitudTest(SolicitudTestCase):
+    """ Las solicitudes cerradas hace tiempo pasan al archivo con sus respuestas y sin descuadrar los contadores. """
+
+    def cerrar(self, solicitud, dias):
+        finalizada, _ = EstadoSolicitud.objects.get_or_create(nombre_estado='Finalizada')
+        solicitud.id_estado = finalizada
+        solicitud.save()
+        SolicitudTiempoEstado.objects.filter(id_solicitud=solicitud, id_estado=finalizada).update(
+            desde=timezone.now() - timedelta(days=dias)
+        )
+
+    def test_archiva_solo_las_cerradas_hace_tiempo(self):
+        vieja, reciente, abierta = (self.crear_solicitud(titulo=titulo) for titulo in ('Vieja', 'Reciente', 'Abierta'))
+        respuesta = Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=vieja, respuesta='Hondo')
+        Multimedia.objects.create(id_respuesta=respuesta, tipo='imagen', archivo='multimedia/foto.jpg')
+        self.cerrar(vieja, 400)
+        self.cerrar(reciente, 10)
+        por_estado = obtener_contadores('estado_solicitudes')
+
+        self.assertEqual(archivar(dias=365, lote=1), 1)
+        self.assertEqual(set(Solicitud.objects.values_list('pk', flat=True)), {reciente.pk, abierta.pk})
+        archivada = SolicitudArchivada.objects.get(pk=vieja.pk)
+        self.assertEqual(archivada.titulo, 'Vieja')
+        self.assertEqual(list(archivada.respuestas.values_list('respuesta', flat=True)), ['Hondo'])
+        self.assertEqual(MultimediaArchivada.objects.get(id_respuesta=respuesta.pk).archivo.name, 'multimedia/foto.jpg')
+        self.assertFalse(Respuesta.objects.filter(pk=respuesta.pk).exists())
+        # El historial se conserva y los contadores por estado no cambian
+        self.assertTrue(SolicitudEvento.objects.filter(id_solicitud_id=vieja.pk).exists())
+        self.assertEqual(obtener_contadores('estado_solicitudes'), por_estado)
+        self.assertEqual(verificar_contadores(), [])
+        # Una segunda pasada no encuentra nada más
+        self.assertEqual(archivar(dias=365), 0)
+
+    def test_lote_revalida_el_cierre(self):
+        solicitud = self.crear_solicitud(titulo='Reabierta y cerrada')
+        self.cerrar(solicitud, 400)
+        ids = list(archivables(365).values_list('pk', flat=True))
+        # Entre la elección del lote y el bloqueo se reabre y se vuelve a cerrar: el cierre es reciente
+        solicitud.id_estado = self.estado
+        solicitud.save()
+        self.cerrar(solicitud, 1)
+        self.assertEqual(archivar_lote(ids, dias=365), 0)
+        self.assertTrue(Solicitud.objects.filter(pk=solicitud.pk).exists())
+
+
+class AccionMasivaTest(SolicitudTestCase):
+    """ Acciones sobre muchas solicitudes: un UPDATE con historial y contadores al día. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = cls.crear_usuario('admin_masiva', GRUPO_ADMIN)
+        cls.cuadrilla = Cuadrilla.objects.create(nombre_cuadrilla='C1', departamento=cls.encuesta.id_departamento, jefe=cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def accion(self, **datos):
+        return self.client.post(reverse('solicitud_accion_masiva'), datos, HTTP_ACCEPT='application/json')
+
+    def test_asignar_cuadrilla_y_bloquear_por_ids(self):
+        solicitudes = [self.crear_solicitud(titulo=f'S{n}') for n in range(3)]
+        ids = [s.pk for s in solicitudes[:2]]
+
+        respuesta = self.accion(accion='asignar_cuadrilla', nueva_cuadrilla=self.cuadrilla.pk, ids=ids)
+        self.assertEqual(respuesta.json(), {'accion': 'asignar_cuadrilla', 'actualizadas': 2})
+        self.assertEqual(obtener_contadores('cuadrilla_abiertas'), {self.cuadrilla.pk: 2})
+        eventos = SolicitudEvento.objects.filter(campo='cuadrilla', usuario=self.admin)
+        self.assertEqual(sorted(eventos.values_list('id_solicitud', flat=True)), ids)
+
+        self.accion(accion='bloquear', ids=ids)
+        self.assertEqual(Solicitud.objects.filter(state='Bloqueado').count(), 2)
+        # Bloqueadas dejan de contar como abiertas de la cuadrilla
+        self.assertEqual(obtener_contadores('cuadrilla_abiertas').get(self.cuadrilla.pk, 0), 0)
+        self.assertEqual(verificar_contadores(), [])
+
+    def test_cambiar_estado_de_todas_las_filtradas(self):
+        for prioridad in ('alta', 'alta', 'baja'):
+            self.crear_solicitud(prioridad=prioridad)
+        finalizada = EstadoSolicitud.objects.create(nombre_estado='Finalizada')
+
+        respuesta = self.accion(accion='cambiar_estado', nuevo_estado=finalizada.pk, todas_filtradas='on', prioridad='alta')
+        self.assertEqual(respuesta.json()['actualizadas'], 2)
+        self.assertEqual(Solicitud.objects.filter(id_estado=finalizada).count(), 2)
+        self.assertEqual(SolicitudEvento.objects.filter(campo='estado', valor_nuevo=str(finalizada.pk)).count(), 2)
+        self.assertEqual(verificar_contadores(), [])
+
+    def test_requiere_datos_de_la_accion(self):
+        self.assertEqual(self.accion(accion='cambiar_estado', ids=[1]).status_code, 400)
+
+    def test_filtro_invalido_no_toca_nada(self):
+        for prioridad in ('alta', 'baja', 'baja'):
+            self.crear_solicitud(prioridad=prioridad)
+        respuesta = self.accion(accion='bloquear', todas_filtradas='on', prioridad='alta', desde='basura')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('desde', respuesta.json()['errores'])
+        self.assertFalse(Solicitud.objects.filter(state='Bloqueado').exists())
+
+        # Sin JSON: mensaje de error y vuelta al listado, también sin cambios
+        respuesta = self.client.post(reverse('solicitud_accion_masiva'), {
+            'accion': 'bloquear', 'todas_filtradas': 'on', 'desde': 'basura',
+        })
+        self.assertRedirects(respuesta, reverse('main_requests'), fetch_redirect_response=False)
+        self.assertFalse(Solicitud.objects.filter(state='Bloqueado').exists())
+
+
+class ExportacionTest(SolicitudTestCase):
+    """ Exportación en streaming: una fila por respuesta y solo las solicitudes visibles. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.territorial = cls.crear_usuario('territorial_exporta', GRUPO_TERRITORIAL)
+
+    def setUp(self):
+        self.propia = Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=self.territorial, id_estado=self.estado, titulo='Bache, "grande"'
+        )
+        for texto in ('Hondo', 'Ñandú'):
+            Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=self.propia, respuesta=texto)
+        self.crear_solicitud(titulo='Ajena')
+        self.client.force_login(self.territorial)
+
+    def test_csv(self):
+        respuesta = self.client.get(reverse('solicitud_exportar'))
+        self.assertTrue(respuesta.streaming)
+        filas = list(csv.reader(io.StringIO(b''.join(respuesta.streaming_content).decode())))
+        self.assertEqual(filas[0], NOMBRES_COLUMNAS)
+        self.assertEqual([(fila[1], fila[11]) for fila in filas[1:]], [('Bache, "grande"', 'Hondo'), ('Bache, "grande"', 'Ñandú')])
+
+    def test_ndjson_con_filtros(self):
+        respuesta = self.client.get(reverse('solicitud_exportar'), {'formato': 'ndjson'})
+        registros = [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+        self.assertEqual([r['respuesta'] for r in registros], ['Hondo', 'Ñandú'])
+        self.assertEqual({r['id_solicitud'] for r in registros}, {self.propia.pk})
+        self.assertEqual(registros[0]['estado'], 'Creada')
+
+        vacia = self.client.get(reverse('solicitud_exportar'), {'formato': 'ndjson', 'prioridad': 'alta'})
+        self.assertEqual(b''.join(vacia.streaming_content), b'')
+
+
+class CargaMultimediaTest(SolicitudTestCase):
+    """ Protocolo de subida por partes: offsets, límites, finalización única y limpieza. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = cls.crear_usuario('admin_cargas', GRUPO_ADMIN)
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        for parche in (
+            mock.patch.object(cargas, 'MULTIMEDIA_CARGAS_DIR', os.path.join(self.directorio, 'cargas')),
+            mock.patch.object(cargas, 'MULTIMEDIA_MAX_PARTE', 4),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+        media = override_settings(MEDIA_ROOT=os.path.join(self.directorio, 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+        self.respuesta = Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=self.crear_solicitud(), respuesta='Foto')
+        self.client.force_login(self.admin)
+
+    def iniciar(self, tamano_total):
+        respuesta = self.client.post(
+            reverse('carga_iniciar', args=[self.respuesta.pk]),
+            {'tipo': 'imagen', 'nombre_archivo': 'foto.jpg', 'tamano_total': tamano_total},
+        )
+        return respuesta.status_code, respuesta.json()
+
+    def parte(self, id_carga, offset, datos):
+        return self.client.put(
+            reverse('carga_detalle', args=[id_carga]), datos,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def finalizar(self, id_carga):
+        return self.client.post(reverse('carga_finalizar', args=[id_carga]))
+
+    def test_offset_invalido_y_reanudacion(self):
+        _, estado = self.iniciar(6)
+        self.assertEqual(self.parte(estado['id_carga'], 0, b'abcd').json()['recibido'], 4)
+        # Reenvío de una parte ya confirmada: 409 con el offset desde el que seguir
+        repetida = self.parte(estado['id_carga'], 0, b'abcd')
+        self.assertEqual((repetida.status_code, repetida.json()['recibido']), (409, 4))
+        self.assertEqual(self.finalizar(estado['id_carga']).status_code, 409)
+        self.assertEqual(self.parte(estado['id_carga'], 4, b'ef').status_code, 200)
+
+        self.assertEqual(self.finalizar(estado['id_carga']).status_code, 201)
+        multimedia = Multimedia.objects.get(id_respuesta=self.respuesta)
+        with multimedia.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), b'abcdef')
+        self.assertFalse(os.path.exists(cargas.ruta_temporal(CargaMultimedia.objects.get())))
+
+    def test_finalizar_dos_veces_crea_un_solo_multimedia(self):
+        _, estado = self.iniciar(3)
+        self.parte(estado['id_carga'], 0, b'xyz')
+        self.assertEqual(self.finalizar(estado['id_carga']).status_code, 201)
+        # Una instancia leída antes de la primera finalización sigue viendo 'Activo'
+        vieja = CargaMultimedia.objects.get()
+        vieja.state = 'Activo'
+        with self.assertRaises(cargas.ErrorCarga) as error:
+            cargas.finalizar_carga(vieja)
+        self.assertEqual(error.exception.status, 409)
+        self.assertEqual(self.finalizar(estado['id_carga']).status_code, 409)
+        self.assertEqual(Multimedia.objects.count(), 1)
+
+    def test_limites_de_tamano(self):
+        with mock.patch.object(cargas, 'MULTIMEDIA_MAX_BYTES', 10):
+            self.assertEqual(self.iniciar(11)[0], 413)
+        _, estado = self.iniciar(6)
+        # Parte mayor que MULTIMEDIA_MAX_PARTE y parte que excede el tamaño declarado
+        self.assertEqual(self.parte(estado['id_carga'], 0, b'abcde').status_code, 413)
+        self.parte(estado['id_carga'], 0, b'abcd')
+        self.assertEqual(self.parte(estado['id_carga'], 4, b'efg').status_code, 413)
+        self.assertEqual(CargaMultimedia.objects.get().recibido, 4)
+
+    def test_limpiar_abandonadas(self):
+        _, abandonada = self.iniciar(6)
+        _, vigente = self.iniciar(6)
+        CargaMultimedia.objects.filter(pk=abandonada['id_carga']).update(updated=timezone.now() - timedelta(hours=49))
+        huerfano = os.path.join(cargas.MULTIMEDIA_CARGAS_DIR, f'{uuid.uuid4()}.part')
+        open(huerfano, 'wb').close()
+        hace_dias = timezone.now().timestamp() - 72 * 3600
+        os.utime(huerfano, (hace_dias, hace_dias))
+        os.utime(os.path.join(cargas.MULTIMEDIA_CARGAS_DIR, f"{abandonada['id_carga']}.part"), (hace_dias, hace_dias))
+
+        salida = io.StringIO()
+        call_command('limpiar_cargas', horas=48, stdout=salida)
+        self.assertIn('1 carga(s) abandonada(s) y 2 archivo(s)', salida.getvalue())
+        self.assertEqual(list(CargaMultimedia.objects.values_list('pk', flat=True)), [uuid.UUID(vigente['id_carga'])])
+        self.assertEqual(os.listdir(cargas.MULTIMEDIA_CARGAS_DIR), [f"{vigente['id_carga']}.part"])
+
+
+@skipUnless(derivados.Image is not None, 'Los derivados requieren Pillow')
+class DerivadosMultimediaTest(SolicitudTestCase):
+    """ Miniatura y mediana de las imágenes, generadas tras el commit. """
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.directorio)
+        media.enable()
+        self.addCleanup(media.disable)
+        # El pool corre el trabajo en el mismo hilo (y la misma conexión) del test
+        executor = mock.patch.object(derivados, '_obtener_executor', return_value=mock.Mock(submit=lambda f, *a: f(*a)))
+        executor.start()
+        self.addCleanup(executor.stop)
+        self.respuesta = Respuesta.objects.create(id_pregunta=self.pregunta, id_solicitud=self.crear_solicitud(), respuesta='Foto')
+
+    def crear_multimedia(self, tipo, ancho=2000, alto=1000):
+        salida = io.BytesIO()
+        derivados.Image.new('RGB', (ancho, alto), 'red').save(salida, 'PNG')
+        multimedia = Multimedia(id_respuesta=self.respuesta, tipo=tipo)
+        multimedia.archivo.save('foto.png', ContentFile(salida.getvalue()), save=False)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            multimedia.save()
+        multimedia.refresh_from_db()
+        return multimedia, callbacks
+
+    def test_genera_miniatura_y_mediana(self):
+        multimedia, callbacks = self.crear_multimedia('imagen')
+        self.assertEqual(len(callbacks), 1)
+        _, extension = derivados._formato_salida()
+        for campo, lado in (('miniatura', 320), ('mediana', 1280)):
+            archivo = getattr(multimedia, campo)
+            self.assertTrue(archivo.name.endswith(f'foto_{campo}.{extension}'))
+            with archivo.open('rb') as contenido:
+                self.assertEqual(derivados.Image.open(contenido).size, (lado, lado // 2))
+
+        # Guardarlo de nuevo con los derivados hechos no vuelve a encolar
+        with self.captureOnCommitCallbacks() as callbacks:
+            multimedia.save()
+        self.assertEqual(callbacks, [])
+
+    def test_no_agranda_ni_procesa_otros_tipos(self):
+        pequena, _ = self.crear_multimedia('imagen', ancho=100, alto=80)
+        with pequena.mediana.open('rb') as contenido:
+            self.assertEqual(derivados.Image.open(contenido).size, (100, 80))
+
+        video, callbacks = self.crear_multimedia('video')
+        self.assertEqual(callbacks, [])
+        self.assertFalse(video.miniatura)
+
+
+class SolicitudVerTest(SolicitudTestCase):
+    """ Detalle de la solicitud con y sin RolMiddleware instalado. """
+
+    def test_sin_rol_middleware(self):
+        solicitud = self.crear_solicitud(titulo='Bache', latitud=-33.45, longitud=-70.66)
+        self.crear_solicitud(titulo='Bache vecino', latitud=-33.4501, longitud=-70.6601)
+        self.client.force_login(self.crear_usuario('admin_ver', GRUPO_ADMIN))
+        sin_middleware = [m for m in settings.MIDDLEWARE if m != 'core.middleware.RolMiddleware']
+        for middleware in (settings.MIDDLEWARE, sin_middleware):
+            with self.subTest(middleware=middleware), override_settings(MIDDLEWARE=middleware):
+                respuesta = self.client.get(reverse('solicitud_ver', args=[solicitud.pk]))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertTrue(respuesta.context['puede_adjuntar'])
+                self.assertEqual([s.titulo for s, _ in respuesta.context['cercanas']], ['Bache vecino'])
+
+
+class RespuestasLoteTest(SolicitudTestCase):
+    """ Guardado de todas las respuestas de la encuesta en un solo formulario. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.otra_pregunta = Pregunta.objects.create(id_encuesta=cls.encuesta, texto_pregunta='¿Tamaño?')
+        cls.admin = cls.crear_usuario('admin_lote', GRUPO_ADMIN)
+        cls.territorial = cls.crear_usuario('territorial_lote', GRUPO_TERRITORIAL)
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.directorio)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.solicitud = Solicitud.objects.create(
+            id_encuesta=self.encuesta, id_territorial=self.territorial, id_estado=self.estado, titulo='Bache'
+        )
+
+    def guardar(self, usuario, filas):
+        self.client.force_login(usuario)
+        datos = {'respuestas-TOTAL_FORMS': len(filas), 'respuestas-INITIAL_FORMS': len(filas)}
+        for n, fila in enumerate(filas):
+            datos.update({f'respuestas-{n}-{campo}': valor for campo, valor in fila.items()})
+        return self.client.post(
+            reverse('respuestas_guardar_lote', args=[self.solicitud.pk]), datos, HTTP_ACCEPT='application/json'
+        )
+
+    def archivo(self):
+        return ContentFile(b'datos', name='foto.jpg')
+
+    def test_guarda_todas_con_adjuntos(self):
+        respuesta = self.guardar(self.admin, [
+            {'pregunta': self.pregunta.pk, 'respuesta': ' Hondo ', 'archivo': self.archivo(), 'tipo': 'imagen'},
+            {'pregunta': self.otra_pregunta.pk, 'respuesta': 'Grande'},
+            {'pregunta': self.otra_pregunta.pk, 'respuesta': '   '},
+        ])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(len(respuesta.json()['respuestas']), 2)
+        self.assertEqual(
+            sorted(Respuesta.objects.filter(id_solicitud=self.solicitud).values_list('respuesta', flat=True)), ['Grande', 'Hondo']
+        )
+        self.assertEqual(Multimedia.objects.get().id_respuesta.respuesta, 'Hondo')
+        # Las respuestas guardadas con bulk_create también quedan en el índice de búsqueda
+        self.assertIn('grande', SolicitudBusqueda.objects.get(pk=self.solicitud.pk).documento)
+
+    def test_permisos_y_validacion(self):
+        # Sin cuadrilla asignada, un territorial no puede adjuntar: no se guarda nada
+        respuesta = self.guardar(self.territorial, [
+            {'pregunta': self.pregunta.pk, 'respuesta': 'Hondo', 'archivo': self.archivo(), 'tipo': 'imagen'},
+            {'pregunta': self.otra_pregunta.pk, 'respuesta': 'Grande'},
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Respuesta.objects.exists())
+
+        ajena = Pregunta.objects.create(id_encuesta=Encuesta.objects.create(
+            id_departamento=self.encuesta.id_departamento, id_tipo_encuesta=self.encuesta.id_tipo_encuesta, titulo='Otra', descripcion='d'
+        ), texto_pregunta='¿Ajena?')
+        self.assertEqual(self.guardar(self.admin, [{'pregunta': ajena.pk, 'respuesta': 'x'}]).status_code, 400)
+        self.assertEqual(self.guardar(self.territorial, [{'pregunta': self.pregunta.pk, 'respuesta': 'Hondo'}]).status_code, 201)
+
+        # Sin Profile, role_required cierra la sesión antes de guardar
+        sin_perfil = User.objects.create_user('sin_perfil_lote')
+        invalidar_rol(sin_perfil.pk)
+        self.assertRedirects(
+            self.guardar(sin_perfil, [{'pregunta': self.pregunta.pk, 'respuesta': 'x'}]), reverse('logout'), fetch_redirect_response=False
+        )
+        self.assertEqual(Respuesta.objects.count(), 1)
+
+    def test_solo_solicitudes_visibles(self):
+        # Solicitud de otro territorial: no existe para este usuario
+        self.solicitud = self.crear_solicitud(titulo='Ajena')
+        self.assertEqual(self.guardar(self.territorial, [{'pregunta': self.pregunta.pk, 'respuesta': 'x'}]).status_code, 404)
+
+        # Bloqueada: ni siquiera el administrador le agrega respuestas
+        self.solicitud.state = 'Bloqueado'
+        self.solicitud.save()
+        self.assertEqual(self.guardar(self.admin, [{'pregunta': self.pregunta.pk, 'respuesta': 'x'}]).status_code, 404)
+        self.assertFalse(Respuesta.objects.exists())
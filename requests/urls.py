@@ -1,22 +1,41 @@
 # requests/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views 
 
+# Con VISTAS_ASYNC = True (despliegue ASGI) el listado usa su versión async
+VISTAS_ASYNC = getattr(settings, 'VISTAS_ASYNC', False)
+
 requests_urlpatterns = [
-    path('', views.main_requests, name='main_requests'),
+    path('', views.main_requests_async if VISTAS_ASYNC else views.main_requests, name='main_requests'),
     path('crear/', views.solicitud_crear, name='solicitud_crear'),
+    path('exportar/', views.solicitud_exportar, name='solicitud_exportar'),
+    path('buscar/', views.solicitud_buscar, name='solicitud_buscar'),
+    path('cercanas/', views.solicitud_cercanas, name='solicitud_cercanas'),
+    path('reporte-sla/', views.solicitud_reporte_sla, name='solicitud_reporte_sla'),
     path('ver/<int:solicitud_id>/', views.solicitud_ver, name='solicitud_ver'),
     path('editar/<int:solicitud_id>/', views.solicitud_editar, name='solicitud_editar'),
     path('eliminar/<int:solicitud_id>/', views.solicitud_eliminar, name='solicitud_eliminar'),
     path('ver/<int:solicitud_id>/responder/<int:pregunta_id>/', views.respuesta_guardar, name='respuesta_guardar'),
+    path('ver/<int:solicitud_id>/responder/', views.respuestas_guardar_lote, name='respuestas_guardar_lote'),
     
     # --- NUEVAS URLS SOLICITUD BLOQUEO ---
     path('bloquear/<int:solicitud_id>/', views.solicitud_bloquear, name='solicitud_bloquear'),
     path('bloqueadas/', views.solicitud_list_bloqueadas, name='solicitud_list_bloqueadas'),
     path('desbloquear/<int:solicitud_id>/', views.solicitud_desbloquear, name='solicitud_desbloquear'),
+    # Acciones masivas (bloquear/desbloquear/estado/cuadrilla sobre muchas solicitudes)
+    path('accion-masiva/', views.solicitud_accion_masiva, name='solicitud_accion_masiva'),
 
     # --- NUEVA URL PARA SUBIR MULTIMEDIA ---
     path('respuesta/<int:respuesta_id>/subir-multimedia/', views.multimedia_subir, name='multimedia_subir'),
+
+    # --- SUBIDA DE MULTIMEDIA POR PARTES (REANUDABLE) ---
+    path('respuesta/<int:respuesta_id>/cargas/', views.carga_iniciar, name='carga_iniciar'),
+    path('cargas/<uuid:id_carga>/', views.carga_detalle, name='carga_detalle'),
+    path('cargas/<uuid:id_carga>/finalizar/', views.carga_finalizar, name='carga_finalizar'),
+
+    # --- SINCRONIZACIÓN OFFLINE (CUADRILLAS EN TERRENO) ---
+    path('sincronizar/', views.sincronizar, name='sincronizar'),
 ]
 
 
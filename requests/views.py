@@ -1,55 +1,192 @@
 # requests/views.py
+import json
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 # Importar User y Group de Django si necesitas verificar roles específicos aquí
 from django.contrib.auth.models import User, Group 
-from .models import Solicitud, Respuesta, Pregunta, EstadoSolicitud 
-from .forms import SolicitudForm, RespuestaForm, MultimediaForm
-from registration.models import Profile
+from collections import defaultdict
+from django.db.models import Prefetch
+from .models import Solicitud, Respuesta, Pregunta, EstadoSolicitud, Multimedia, CargaMultimedia, SolicitudArchivada, MultimediaArchivada
+from .forms import SolicitudForm, RespuestaForm, MultimediaForm, FiltroSolicitudForm, AccionMasivaForm, RespuestaLoteFormSet
+from .listado import solicitudes_visibles, aplicar_filtros, paginar_keyset, apaginar_keyset, RELACIONES_LISTADO, SOLICITUDES_POR_PAGINA
+from .busqueda import actualizar_indice, buscar_solicitudes
+from .derivados import encolar_derivados
+from .duplicados import posibles_duplicados
+from .asignacion import ASIGNACION_AUTOMATICA, asignar_cuadrilla
+from .geo import GEO_MAX_RESULTADOS, GEO_RADIO_MAX_M, GEO_RADIO_VECINAS_M, cercanas, en_caja
+from .historial import registrar_cambios, historial_solicitud, tiempos_solicitud, resumen_sla
+from .exportar import generar_csv, generar_ndjson
+from .cargas import ErrorCarga, MULTIMEDIA_MAX_PARTE, iniciar_carga, escribir_parte, finalizar_carga
+from .sincronizacion import ErrorSincronizacion, sincronizar_lote
+from core.roles import GRUPO_ADMIN, GRUPO_TERRITORIAL, obtener_rol, role_required
 from surveys.models import Encuesta, Pregunta # Corregido import Pregunta
+from surveys.cache import definicion_encuesta
 # Quitar imports de Territorial y JefeCuadrilla si ya no existen esos modelos
 # from users.models import Territorial, JefeCuadrilla 
 from django.contrib import messages
+from django.db import transaction
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST, require_http_methods
+from django.utils import timezone
+from core.contadores import CAMPOS_FILA, aplicar_actualizacion
+from core.dashboard import invalidar_resumen
+
+def _preparar_listado(request):
+    """ (filtro_form, QuerySet filtrado, ascendente) del listado; valida el formulario de filtros. """
+    # Alcance por rol: Territorial (ID 4) ve las suyas, Cuadrilla (ID 5) las asignadas
+    # a su cuadrilla, Admin (ID 1) y el resto ven todas las activas.
+    solicitud_listado = solicitudes_visibles(request.user, request.role.group_id)
+
+    filtro_form = FiltroSolicitudForm(request.GET or None)
+    filtros = filtro_form.cleaned_data if filtro_form.is_valid() else {}
+    solicitud_listado = aplicar_filtros(solicitud_listado, filtros)
+    solicitud_listado = solicitud_listado.select_related(*RELACIONES_LISTADO)
+    return filtro_form, solicitud_listado, filtros.get('orden') == 'antiguo'
+
+def _render_listado(request, filtro_form, pagina, cursor_siguiente):
+    # Conservar los filtros en los enlaces de paginación
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+
+    template_name = 'requests/main_requests.html'
+    return render(request, template_name, {
+        'solicitud_listado': pagina,
+        'filtro_form': filtro_form,
+        'cursor_siguiente': cursor_siguiente,
+        'es_primera_pagina': not request.GET.get('cursor'),
+        'parametros_filtro': parametros.urlencode(),
+        'accion_form': AccionMasivaForm() if request.role.es_admin else None,
+    })
 
 @login_required
+@role_required()
 def main_requests(request):
+    filtro_form, solicitud_listado, ascendente = _preparar_listado(request)
+    # Paginación por cursor: cada página es un rango sobre (created, id_solicitud)
+    pagina, cursor_siguiente = paginar_keyset(solicitud_listado, cursor=request.GET.get('cursor'), ascendente=ascendente)
+    return _render_listado(request, filtro_form, pagina, cursor_siguiente)
+
+@login_required
+@role_required()
+async def main_requests_async(request):
+    """ main_requests para ASGI (ver VISTAS_ASYNC en requests/urls.py). """
+    # Las opciones de los ModelChoiceField y el render del formulario consultan
+    # la BD de forma síncrona: van por sync_to_async. La página sale del ORM async.
+    filtro_form, solicitud_listado, ascendente = await sync_to_async(_preparar_listado)(request)
+    pagina, cursor_siguiente = await apaginar_keyset(solicitud_listado, cursor=request.GET.get('cursor'), ascendente=ascendente)
+    return await sync_to_async(_render_listado)(request, filtro_form, pagina, cursor_siguiente)
+
+@login_required
+@role_required()
+def solicitud_buscar(request):
+    """ Búsqueda de texto completo (título, descripción, ubicación y respuestas), ordenada por relevancia. """
+    texto = request.GET.get('q', '').strip()
+    ids = buscar_solicitudes(solicitudes_visibles(request.user, request.role.group_id), texto) if texto else []
+
+    page_obj = Paginator(ids, SOLICITUDES_POR_PAGINA).get_page(request.GET.get('page'))
+    # Solo se cargan las filas de la página, respetando el orden del ranking
+    por_id = Solicitud.objects.select_related(*RELACIONES_LISTADO).in_bulk(page_obj.object_list)
+    resultados = [por_id[i] for i in page_obj.object_list if i in por_id]
+
+    return render(request, 'requests/solicitud_buscar.html', {
+        'texto': texto,
+        'resultados': resultados,
+        'page_obj': page_obj,
+    })
+
+def _solicitud_geo_json(solicitud, distancia=None):
+    datos = {
+        'id_solicitud': solicitud.id_solicitud,
+        'titulo': solicitud.titulo,
+        'estado': solicitud.id_estado.nombre_estado,
+        'prioridad': solicitud.prioridad,
+        'latitud': solicitud.latitud,
+        'longitud': solicitud.longitud,
+    }
+    if distancia is not None:
+        datos['distancia_m'] = round(distancia, 1)
+    return datos
+
+@login_required
+@role_required()
+def solicitud_cercanas(request):
+    """
+    Solicitudes visibles cerca de un punto (?lat=&lon=&radio= en metros) o
+    dentro de un rectángulo (?bbox=lat_min,lon_min,lat_max,lon_max), en JSON.
+    """
+    solicitudes = solicitudes_visibles(request.user, request.role.group_id).select_related('id_estado')
     try:
-        profile = Profile.objects.get(user=request.user)
-    except Profile.DoesNotExist: return redirect('logout')
-
-    # Podrías filtrar solicitudes según el rol del usuario (profile.group_id)
-    # Ejemplo: Si es Territorial (ID 4), mostrar solo las suyas
-    if profile.group_id == 4:
-         solicitud_listado = Solicitud.objects.filter(state='Activo', id_territorial=request.user).order_by('-created')
-    # Ejemplo: Si es Cuadrilla (ID 5), mostrar solo las asignadas a él
-    elif profile.group_id == 5:
-         solicitud_listado = Solicitud.objects.filter(state='Activo', id_cuadrilla=request.user).order_by('-created')
-    # Si es Admin (ID 1) u otro rol, muestra todas
+        if request.GET.get('bbox'):
+            lat_min, lon_min, lat_max, lon_max = (float(valor) for valor in request.GET['bbox'].split(','))
+            if lat_min > lat_max or lon_min > lon_max:
+                raise ValueError
+            filas = en_caja(solicitudes, lat_min, lon_min, lat_max, lon_max).order_by('-created')[:GEO_MAX_RESULTADOS]
+            resultados = [_solicitud_geo_json(solicitud) for solicitud in filas]
+        else:
+            latitud, longitud = float(request.GET['lat']), float(request.GET['lon'])
+            radio = min(float(request.GET.get('radio', 500)), GEO_RADIO_MAX_M)
+            if not (-90 <= latitud <= 90 and -180 <= longitud <= 180) or radio <= 0:
+                raise ValueError
+            resultados = [
+                _solicitud_geo_json(solicitud, distancia)
+                for solicitud, distancia in cercanas(solicitudes, latitud, longitud, radio)
+            ]
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Indica lat, lon y radio (metros) o bbox=lat_min,lon_min,lat_max,lon_max.'}, status=400)
+    return JsonResponse({'resultados': resultados})
+
+@login_required
+@role_required()
+def solicitud_exportar(request):
+    """
+    Exporta (streaming) las solicitudes visibles con sus respuestas, aplicando
+    los mismos filtros que el listado. ?formato=csv (por defecto) o ?formato=ndjson
+    """
+    filtro_form = FiltroSolicitudForm(request.GET or None)
+    filtros = filtro_form.cleaned_data if filtro_form.is_valid() else {}
+    solicitudes = aplicar_filtros(solicitudes_visibles(request.user, request.role.group_id), filtros)
+
+    fecha = timezone.localdate().strftime('%Y%m%d')
+    if request.GET.get('formato') == 'ndjson':
+        response = StreamingHttpResponse(generar_ndjson(solicitudes), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="solicitudes_{fecha}.ndjson"'
     else:
-         solicitud_listado = Solicitud.objects.filter(state='Activo').order_by('-created')
-    
-    template_name = 'requests/main_requests.html'
-    return render(request, template_name, {'solicitud_listado': solicitud_listado})
+        response = StreamingHttpResponse(generar_csv(solicitudes), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="solicitudes_{fecha}.csv"'
+    return response
 
 @login_required
+# Permitir crear a Admin (1) y Territorial (4)
+@role_required(GRUPO_ADMIN, GRUPO_TERRITORIAL, mensaje='No tienes permiso para crear solicitudes.')
 def solicitud_crear(request):
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Permitir crear a Admin (1) y Territorial (4)
-        if profile.group_id not in [1, 4]: 
-             messages.error(request, 'No tienes permiso para crear solicitudes.')
-             return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
-
     if request.method == 'POST':
         # Pasar request.user a la data si necesitas auto-asignar territorial
         # post_data = request.POST.copy()
-        # if profile.group_id == 4: # Si es territorial quien crea
+        # if request.role.es_territorial: # Si es territorial quien crea
         #     post_data['id_territorial'] = request.user.id 
         # form = SolicitudForm(post_data)
         
         form = SolicitudForm(request.POST)
         if form.is_valid():
+            # Antes de crear, avisar si ya hay una solicitud parecida en la zona
+            if not request.POST.get('confirmar_duplicado'):
+                datos = form.cleaned_data
+                # Entre todas las del departamento de la encuesta, no solo las visibles:
+                # el mismo incidente pudo reportarlo otro territorial
+                encuesta = datos.get('id_encuesta')
+                duplicados = posibles_duplicados(
+                    datos.get('titulo'), datos.get('descripcion'), datos.get('ubicacion'),
+                    datos.get('latitud'), datos.get('longitud'),
+                    queryset=Solicitud.objects.filter(id_encuesta__id_departamento=encuesta.id_departamento_id) if encuesta else None,
+                )
+                if duplicados:
+                    messages.warning(request, 'Hay solicitudes parecidas en la misma zona. Revísalas antes de crear una nueva.')
+                    return render(request, 'requests/solicitud_form.html', {
+                        'form': form, 'titulo': 'Crear Solicitud', 'duplicados': duplicados,
+                    })
+
             solicitud = form.save(commit=False)
             
             # Asignar estado inicial 'Creada' si no se seleccionó
@@ -61,19 +198,28 @@ def solicitud_crear(request):
                      messages.warning(request, "Estado 'Creada' no encontrado.")
             
             # Si el usuario es Territorial, asignarlo automáticamente
-            if profile.group_id == 4:
+            if request.role.es_territorial:
                  solicitud.id_territorial = request.user
 
-            solicitud.save()
-            form.save_m2m() 
+            # Sin cuadrilla elegida: la menos cargada del departamento de la encuesta
+            cuadrilla_auto = None
+            if ASIGNACION_AUTOMATICA and not solicitud.id_cuadrilla_id:
+                cuadrilla_auto = asignar_cuadrilla(solicitud)
+
+            solicitud._usuario_cambio = request.user # Autor del evento en el historial
+            with transaction.atomic():
+                solicitud.save()
+                form.save_m2m()
             messages.success(request, 'Solicitud creada con éxito.')
+            if cuadrilla_auto:
+                messages.info(request, f'Asignada automáticamente a la cuadrilla {cuadrilla_auto}.')
             return redirect('main_requests')
         else:
              messages.error(request, 'Error en el formulario. Revisa los campos.')
     else:
         form = SolicitudForm()
         # Pre-seleccionar territorial si es él quien crea
-        if profile.group_id == 4:
+        if request.role.es_territorial:
              form.fields['id_territorial'].initial = request.user
              # Opcional: Hacer el campo readonly si es territorial
              # form.fields['id_territorial'].widget.attrs['disabled'] = True 
@@ -81,48 +227,105 @@ def solicitud_crear(request):
     template_name = 'requests/solicitud_form.html'
     return render(request, template_name, {'form': form, 'titulo': 'Crear Solicitud'})
 
+def _cercanas_de(request, solicitud, radio_m=GEO_RADIO_VECINAS_M):
+    """ Otras solicitudes visibles a menos de radio_m de esta (vacío si no tiene coordenadas). """
+    if solicitud.latitud is None or solicitud.longitud is None:
+        return []
+    visibles = solicitudes_visibles(request.user, obtener_rol(request).group_id).exclude(pk=solicitud.pk).select_related('id_estado')
+    return cercanas(visibles, solicitud.latitud, solicitud.longitud, radio_m, limite=10)
+
 @login_required
 def solicitud_ver(request, solicitud_id):
-    solicitud = get_object_or_404(Solicitud, pk=solicitud_id)
+    # Traer en una sola consulta toda la cadena que muestra el template
+    solicitud = Solicitud.objects.select_related(
+        'id_encuesta', 'id_territorial', 'id_estado', 'id_cuadrilla__jefe'
+    ).filter(pk=solicitud_id).first()
+    if solicitud is None:
+        # Cerrada hace tiempo: se lee del archivo (ver requests/archivo.py)
+        return _solicitud_archivada_ver(request, solicitud_id)
     
     # Lógica de permisos: ¿Quién puede ver esta solicitud? (ej. Admin, el Territorial, la Cuadrilla asignada)
     
-    preguntas = Pregunta.objects.filter(id_encuesta=solicitud.id_encuesta, state='Activo') # Filtrar activas
-    respuestas_list = Respuesta.objects.filter(id_solicitud=solicitud).order_by('created')
-    
-    
-    forms_respuestas = {}
-    for pregunta in preguntas:
-        forms_respuestas[pregunta.id_pregunta] = RespuestaForm() 
+    # Preguntas activas desde la caché de definiciones (cambian muy poco)
+    definicion = definicion_encuesta(solicitud.id_encuesta_id)
+    preguntas = definicion.preguntas if definicion else ()
+
+    # Todas las respuestas con su multimedia en dos consultas (sin importar cuántas sean)
+    respuestas_list = Respuesta.objects.filter(id_solicitud=solicitud).order_by('created').prefetch_related(
+        Prefetch('multimedia_set', queryset=Multimedia.objects.order_by('created'), to_attr='adjuntos')
+    )
+
+    # Agrupar las respuestas por pregunta en Python (una sola pasada)
+    respuestas_por_pregunta = defaultdict(list)
+    for respuesta_obj in respuestas_list:
+        respuestas_por_pregunta[respuesta_obj.id_pregunta_id].append(respuesta_obj)
+
+    bloques_preguntas = [
+        {
+            'pregunta': pregunta,
+            'respuestas': respuestas_por_pregunta.get(pregunta.id_pregunta, []),
+            'form': RespuestaForm(),
+        }
+        for pregunta in preguntas
+    ]
             
     # Formulario para multimedia general (si decides mantenerlo)
     multimedia_form = MultimediaForm()
+    # Un formulario con todas las preguntas, enviado de una vez (respuestas_guardar_lote)
+    formset_respuestas = RespuestaLoteFormSet(
+        prefix='respuestas', initial=[{'pregunta': bloque['pregunta'].id_pregunta} for bloque in bloques_preguntas]
+    )
+    for bloque, form in zip(bloques_preguntas, formset_respuestas):
+        form.pregunta_obj = bloque['pregunta']
             
     template_name = 'requests/solicitud_ver.html'
     return render(request, template_name, {
         'solicitud': solicitud,
-        'preguntas': preguntas,
-        'respuestas_list': respuestas_list, # Pasamos la lista
-        'forms_respuestas': forms_respuestas, # Pasamos los forms vacíos
-        'MultimediaForm': multimedia_form 
+        'bloques_preguntas': bloques_preguntas, # Pregunta + sus respuestas + form vacío
+        'MultimediaForm': multimedia_form,
+        'formset_respuestas': formset_respuestas,
+        'puede_adjuntar': _puede_adjuntar_multimedia(request, solicitud),
+        'eventos': historial_solicitud(solicitud),
+        'tiempos_estado': tiempos_solicitud(solicitud),
+        'cercanas': _cercanas_de(request, solicitud),
+    })
+
+def _solicitud_archivada_ver(request, solicitud_id):
+    """ Detalle de solo lectura de una SolicitudArchivada (sin formularios para responder). """
+    solicitud = get_object_or_404(
+        SolicitudArchivada.objects.select_related(
+            'id_encuesta', 'id_territorial', 'id_estado', 'id_cuadrilla__jefe'
+        ),
+        pk=solicitud_id
+    )
+    respuestas_list = solicitud.respuestas.select_related('id_pregunta').order_by('created').prefetch_related(
+        Prefetch('multimedia_set', queryset=MultimediaArchivada.objects.order_by('created'), to_attr='adjuntos')
+    )
+    # Las preguntas salen de las respuestas: pueden ya no estar activas en la encuesta
+    bloques = {}
+    for respuesta_obj in respuestas_list:
+        bloque = bloques.setdefault(respuesta_obj.id_pregunta_id, {'pregunta': respuesta_obj.id_pregunta, 'respuestas': []})
+        bloque['respuestas'].append(respuesta_obj)
+
+    template_name = 'requests/solicitud_ver.html'
+    return render(request, template_name, {
+        'solicitud': solicitud,
+        'archivada': True,
+        'bloques_preguntas': [bloques[pregunta_id] for pregunta_id in sorted(bloques)],
+        'eventos': historial_solicitud(solicitud),
+        'tiempos_estado': tiempos_solicitud(solicitud),
     })
     
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para editar.')
 def solicitud_editar(request, solicitud_id):
     solicitud = get_object_or_404(Solicitud, pk=solicitud_id)
     # Lógica de permisos para editar (ej. Admin, Depto a cargo?)
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Ejemplo: Solo Admin (1) puede editar todo por ahora
-        if profile.group_id != 1: 
-             messages.error(request, 'No tienes permiso para editar.')
-             return redirect('main_requests')
-    except Profile.DoesNotExist: return redirect('logout')
-
     if request.method == 'POST':
         form = SolicitudForm(request.POST, instance=solicitud)
         if form.is_valid():
+            solicitud._usuario_cambio = request.user # Autor del evento en el historial
             form.save()
             messages.success(request, 'Solicitud actualizada con éxito.')
             return redirect('main_requests')
@@ -134,18 +337,12 @@ def solicitud_editar(request, solicitud_id):
 
 # --- NUEVA VISTA SOLICITUD BLOQUEAR ---
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para bloquear solicitudes.')
 def solicitud_bloquear(request, solicitud_id):
     """ Cambia el estado de una Solicitud a 'Bloqueado'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Definir qué roles pueden bloquear (ej. Admin/SECPLA)
-        if profile.group_id != 1: 
-             messages.error(request, 'No tienes permiso para bloquear solicitudes.')
-             return redirect('main_requests') 
-    except Profile.DoesNotExist: return redirect('logout')
-
     solicitud_obj = get_object_or_404(Solicitud, pk=solicitud_id)
     solicitud_obj.state = 'Bloqueado'
+    solicitud_obj._usuario_cambio = request.user
     solicitud_obj.save()
     messages.info(request, f'Solicitud #{solicitud_obj.id_solicitud} bloqueada.')
     # Redirigir a la lista principal (donde ya no aparecerá)
@@ -153,50 +350,108 @@ def solicitud_bloquear(request, solicitud_id):
 
 # --- NUEVA VISTA SOLICITUD LISTA BLOQUEADAS ---
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para ver solicitudes bloqueadas.')
 def solicitud_list_bloqueadas(request):
     """ Muestra la lista de Solicitudes bloqueadas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Definir qué roles pueden ver bloqueadas (ej. Admin/SECPLA)
-        if profile.group_id != 1: 
-             messages.error(request, 'No tienes permiso para ver solicitudes bloqueadas.')
-             return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
-
     solicitudes_bloqueadas = Solicitud.objects.filter(state='Bloqueado').order_by('-created')
     return render(request, 'requests/solicitud_list_bloqueadas.html', {'solicitudes_bloqueadas': solicitudes_bloqueadas})
 
 # --- NUEVA VISTA SOLICITUD DESBLOQUEAR ---
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para desbloquear solicitudes.')
 def solicitud_desbloquear(request, solicitud_id):
     """ Cambia el estado de una Solicitud a 'Activo'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Definir qué roles pueden desbloquear (ej. Admin/SECPLA)
-        if profile.group_id != 1: 
-             messages.error(request, 'No tienes permiso para desbloquear solicitudes.')
-             return redirect('main_requests')
-    except Profile.DoesNotExist: return redirect('logout')
-
     solicitud_obj = get_object_or_404(Solicitud, pk=solicitud_id)
     solicitud_obj.state = 'Activo'
     # Considera añadir validación clean() aquí si es necesario antes de activar
+    solicitud_obj._usuario_cambio = request.user
     solicitud_obj.save()
     messages.success(request, f'Solicitud #{solicitud_obj.id_solicitud} desbloqueada.')
     # Vuelve a la lista de bloqueadas para ver el cambio
     return redirect('solicitud_list_bloqueadas')
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para aplicar acciones masivas.')
+def solicitud_accion_masiva(request):
+    """
+    Aplica una acción (bloquear, desbloquear, cambiar estado, asignar cuadrilla)
+    a muchas solicitudes con un único UPDATE dentro de una transacción.
+    Recibe una lista de 'ids' o, con 'todas_filtradas', los mismos filtros del listado.
+    """
+    if request.method != 'POST':
+        return redirect('main_requests')
+
+    responde_json = 'application/json' in request.headers.get('Accept', '')
+    form = AccionMasivaForm(request.POST)
+    filtro_form = None
+    if form.is_valid() and form.cleaned_data['todas_filtradas']:
+        # Un filtro inválido no puede caer en "sin filtro": la acción tocaría todas las solicitudes
+        filtro_form = FiltroSolicitudForm(request.POST)
+    for formulario in (form, filtro_form):
+        if formulario is not None and not formulario.is_valid():
+            if responde_json:
+                return JsonResponse({'errores': formulario.errors}, status=400)
+            messages.error(request, f'Error en la acción masiva: {formulario.errors.as_text()}')
+            return redirect('main_requests')
+
+    accion = form.cleaned_data['accion']
+    # Desbloquear actúa sobre las bloqueadas; el resto sobre las activas
+    state_origen = 'Bloqueado' if accion == 'desbloquear' else 'Activo'
+
+    if form.cleaned_data['todas_filtradas']:
+        seleccion = aplicar_filtros(
+            solicitudes_visibles(request.user, request.role.group_id, state=state_origen), filtro_form.cleaned_data
+        )
+    else:
+        ids = [int(valor) for valor in request.POST.getlist('ids') if valor.isdigit()]
+        seleccion = Solicitud.objects.filter(pk__in=ids, state=state_origen)
+
+    nueva_cuadrilla = form.cleaned_data['nueva_cuadrilla']
+    nuevo_estado = form.cleaned_data['nuevo_estado']
+    # (campo del historial, columna, valor nuevo)
+    campo, attname, valor = {
+        'bloquear': ('state', 'state', 'Bloqueado'),
+        'desbloquear': ('state', 'state', 'Activo'),
+        'cambiar_estado': ('estado', 'id_estado_id', nuevo_estado.pk if nuevo_estado else None),
+        'asignar_cuadrilla': ('cuadrilla', 'id_cuadrilla_id', nueva_cuadrilla.pk if nueva_cuadrilla else None),
+    }[accion]
+    # update() no pasa por save(): hay que mantener 'updated' a mano
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        # Valores previos (bloqueados hasta el commit) para el historial y los contadores
+        filas = {
+            pk: tuple(fila)
+            for pk, *fila in seleccion.select_for_update(of=('self',)).values_list('pk', *CAMPOS_FILA)
+        }
+        actualizadas = Solicitud.objects.filter(pk__in=list(filas)).update(**{attname: valor, 'updated': ahora})
+        # update() no dispara señales: eventos y contadores se registran en lote en la misma transacción
+        indice = CAMPOS_FILA.index(attname)
+        registrar_cambios(
+            [(pk, campo, fila[indice], valor) for pk, fila in filas.items() if fila[indice] != valor],
+            usuario=request.user, momento=ahora,
+        )
+        aplicar_actualizacion(list(filas.values()), attname, valor)
+
+    # Por lo mismo se invalida el dashboard explícitamente
+    invalidar_resumen()
+
+    if responde_json:
+        return JsonResponse({'accion': accion, 'actualizadas': actualizadas})
+    messages.success(request, f'Acción "{dict(AccionMasivaForm.ACCION_CHOICES)[accion]}" aplicada a {actualizadas} solicitud(es).')
+    return redirect('solicitud_list_bloqueadas' if accion == 'desbloquear' else 'main_requests')
+
+@login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para ver reportes.')
+def solicitud_reporte_sla(request):
+    """ Tiempo promedio por estado, leído de los tiempos precalculados (SolicitudTiempoEstado). """
+    return render(request, 'requests/solicitud_reporte_sla.html', {'resumen': resumen_sla()})
+
+@login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_requests', mensaje='No tienes permiso para eliminar.')
 def solicitud_eliminar(request, solicitud_id):
     solicitud = get_object_or_404(Solicitud, pk=solicitud_id)
     # Lógica de permisos para eliminar (ej. Solo Admin?)
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-             messages.error(request, 'No tienes permiso para eliminar.')
-             return redirect('main_requests')
-    except Profile.DoesNotExist: return redirect('logout')
-
     titulo_solicitud = solicitud.titulo    
     solicitud.delete()
     messages.success(request, f'Solicitud "{titulo_solicitud}" eliminada.')
@@ -229,34 +484,89 @@ def respuesta_guardar(request, solicitud_id, pregunta_id):
     else:
         return redirect('solicitud_ver', solicitud_id=solicitud_id)
 
+def _puede_adjuntar_multimedia(request, solicitud):
+    """ Admin o jefe de la cuadrilla asignada a la solicitud. """
+    cuadrilla = solicitud.id_cuadrilla
+    es_cuadrilla_asignada = cuadrilla is not None and cuadrilla.jefe_id == request.user.id
+    return obtener_rol(request).es_admin or es_cuadrilla_asignada
+
+@login_required
+@role_required()
+@require_POST
+def respuestas_guardar_lote(request, solicitud_id):
+    """
+    Guarda de una vez las respuestas (y adjuntos) a todas las preguntas de la
+    encuesta: un bulk_create de Respuesta y otro de Multimedia en una sola
+    transacción. Las preguntas sin texto se ignoran.
+    """
+    # Solo solicitudes activas al alcance del rol (como en el listado)
+    visibles = solicitudes_visibles(request.user, obtener_rol(request).group_id)
+    solicitud = get_object_or_404(visibles.select_related('id_cuadrilla'), pk=solicitud_id)
+    responde_json = 'application/json' in request.headers.get('Accept', '')
+    formset = RespuestaLoteFormSet(request.POST, request.FILES, prefix='respuestas')
+
+    error = None
+    if not formset.is_valid():
+        error = ' '.join(
+            [mensaje for form in formset for errores in form.errors.values() for mensaje in errores]
+            + list(formset.non_form_errors())
+        )
+    else:
+        datos = [form.cleaned_data for form in formset if form.cleaned_data.get('respuesta', '').strip()]
+        definicion = definicion_encuesta(solicitud.id_encuesta_id)
+        validas = definicion.ids_preguntas if definicion else frozenset()
+        if any(dato['pregunta'] not in validas for dato in datos):
+            error = 'Alguna pregunta no pertenece a la encuesta de esta solicitud.'
+        elif any(dato.get('archivo') for dato in datos) and not _puede_adjuntar_multimedia(request, solicitud):
+            error = 'No tienes permiso para añadir multimedia a esta solicitud.'
+        elif not datos:
+            error = 'No se ingresó ninguna respuesta.'
+
+    if error:
+        if responde_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, f'Error al guardar respuestas: {error}')
+        return redirect('solicitud_ver', solicitud_id=solicitud_id)
+
+    with transaction.atomic():
+        # bulk_create asigna las PK (PostgreSQL/SQLite), necesarias para enlazar los adjuntos
+        respuestas = Respuesta.objects.bulk_create([
+            Respuesta(id_solicitud=solicitud, id_pregunta_id=dato['pregunta'], respuesta=dato['respuesta'].strip())
+            for dato in datos
+        ])
+        adjuntos = Multimedia.objects.bulk_create([
+            Multimedia(id_respuesta=respuesta, tipo=dato['tipo'], archivo=dato['archivo'])
+            for respuesta, dato in zip(respuestas, datos) if dato.get('archivo')
+        ])
+        # bulk_create no dispara señales: índice de búsqueda y derivados a mano
+        actualizar_indice(solicitud.pk)
+        for multimedia in adjuntos:
+            encolar_derivados(multimedia)
+
+    if responde_json:
+        return JsonResponse({'respuestas': [r.pk for r in respuestas], 'multimedia': [m.pk for m in adjuntos]}, status=201)
+    messages.success(request, f'{len(respuestas)} respuesta(s) guardada(s).')
+    return redirect('solicitud_ver', solicitud_id=solicitud_id)
+
 @login_required
+@role_required()
 def multimedia_subir(request, respuesta_id):
     """ 
     Gestiona la subida de archivos multimedia para una RESPUESTA específica.
     Recibe el ID de la Respuesta desde la URL.
     """
-    # Obtener la respuesta a la que se adjuntará el archivo
-    respuesta = get_object_or_404(Respuesta, pk=respuesta_id)
+    # Obtener la respuesta a la que se adjuntará el archivo (con su solicitud y cuadrilla)
+    respuesta = get_object_or_404(Respuesta.objects.select_related('id_solicitud__id_cuadrilla'), pk=respuesta_id)
     # Obtener la solicitud asociada para poder redirigir de vuelta
     solicitud_id = respuesta.id_solicitud_id 
     
     # --- Lógica de Permisos ---
     # ¿Quién puede subir archivos a esta respuesta? 
-    # Ejemplo: Solo el admin (SECPLA) o la cuadrilla asignada a la solicitud.
-    try:
-        profile = Profile.objects.get(user=request.user)
-        # Verificar si es admin O si es la cuadrilla asignada a la solicitud de la respuesta
-        es_admin = profile.group_id == 1
-        es_cuadrilla_asignada = (respuesta.id_solicitud.id_cuadrilla == request.user)
-        
-        if not (es_admin or es_cuadrilla_asignada):
-             messages.error(request, 'No tienes permiso para añadir multimedia a esta respuesta.')
-             # Redirigir a la vista de la solicitud
-             return redirect('solicitud_ver', solicitud_id=solicitud_id) 
-             
-    except Profile.DoesNotExist: 
-        messages.error(request, 'Tu perfil no está configurado.')
-        return redirect('logout')
+    # Solo el admin (SECPLA) o el jefe de la cuadrilla asignada a la solicitud.
+    if not _puede_adjuntar_multimedia(request, respuesta.id_solicitud):
+         messages.error(request, 'No tienes permiso para añadir multimedia a esta respuesta.')
+         # Redirigir a la vista de la solicitud
+         return redirect('solicitud_ver', solicitud_id=solicitud_id) 
     # --- Fin Lógica de Permisos ---
 
     if request.method == 'POST':
@@ -285,4 +595,109 @@ def multimedia_subir(request, respuesta_id):
         # Si alguien intenta acceder a esta URL directamente con GET, 
         # no tiene sentido mostrar un formulario aquí. Lo redirigimos
         # a la vista de detalles de la solicitud donde SÍ está el formulario.
-        return redirect('solicitud_ver', solicitud_id=solicitud_id)
\ No newline at end of file
+        return redirect('solicitud_ver', solicitud_id=solicitud_id)
+
+# ===================================================================
+# Subida de multimedia por partes (reanudable) - ver requests/cargas.py
+# ===================================================================
+
+def _estado_carga(carga):
+    return {
+        'id_carga': str(carga.id_carga),
+        'recibido': carga.recibido,
+        'tamano_total': carga.tamano_total,
+        'completada': carga.state == 'Completada',
+        'id_multimedia': carga.id_multimedia_id,
+        'tamano_parte': MULTIMEDIA_MAX_PARTE,
+    }
+
+def _puede_usar_carga(request, carga):
+    # Solo quien inició la carga (o un Admin) puede continuarla
+    return carga.usuario_id == request.user.id or obtener_rol(request).es_admin
+
+_SIN_PERMISO_CARGA = 'No tienes permiso sobre esta carga.'
+
+@login_required
+@role_required()
+@require_POST
+def carga_iniciar(request, respuesta_id):
+    """ Crea una carga por partes para adjuntar un archivo a la Respuesta. """
+    respuesta = get_object_or_404(Respuesta.objects.select_related('id_solicitud__id_cuadrilla'), pk=respuesta_id)
+    if not _puede_adjuntar_multimedia(request, respuesta.id_solicitud):
+        return JsonResponse({'error': 'No tienes permiso para añadir multimedia a esta respuesta.'}, status=403)
+
+    tipo = request.POST.get('tipo')
+    if tipo not in dict(Multimedia.TIPOS_MULTIMEDIA):
+        return JsonResponse({'error': 'Tipo de multimedia no válido.'}, status=400)
+    try:
+        tamano_total = int(request.POST.get('tamano_total', ''))
+    except ValueError:
+        return JsonResponse({'error': 'tamano_total debe ser un entero.'}, status=400)
+    nombre_archivo = request.POST.get('nombre_archivo') or 'archivo'
+
+    try:
+        carga = iniciar_carga(respuesta, request.user, tipo, nombre_archivo, tamano_total,
+                              descripcion=request.POST.get('descripcion') or None)
+    except ErrorCarga as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(_estado_carga(carga), status=201)
+
+@login_required
+@role_required()
+@require_http_methods(['GET', 'PUT'])
+def carga_detalle(request, id_carga):
+    """ GET: offset confirmado para reanudar. PUT: escribe una parte (header Upload-Offset). """
+    carga = get_object_or_404(CargaMultimedia, pk=id_carga)
+    if not _puede_usar_carga(request, carga):
+        return JsonResponse({'error': _SIN_PERMISO_CARGA}, status=403)
+    if request.method == 'GET':
+        return JsonResponse(_estado_carga(carga))
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.GET.get('offset', '')))
+        largo = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset y Content-Length deben ser enteros.'}, status=400)
+    try:
+        escribir_parte(carga, offset, request, largo)
+    except ErrorCarga as e:
+        respuesta_error = _estado_carga(CargaMultimedia.objects.get(pk=carga.pk))
+        respuesta_error['error'] = str(e)
+        return JsonResponse(respuesta_error, status=e.status)
+    return JsonResponse(_estado_carga(carga))
+
+@login_required
+@role_required()
+@require_POST
+def carga_finalizar(request, id_carga):
+    """ Ensambla el archivo y lo adjunta a la Respuesta como Multimedia. """
+    carga = get_object_or_404(CargaMultimedia, pk=id_carga)
+    if not _puede_usar_carga(request, carga):
+        return JsonResponse({'error': _SIN_PERMISO_CARGA}, status=403)
+    try:
+        finalizar_carga(carga)
+    except ErrorCarga as e:
+        return JsonResponse({'error': str(e), **_estado_carga(carga)}, status=e.status)
+    return JsonResponse(_estado_carga(carga), status=201)
+
+# ===================================================================
+# Sincronización offline de cuadrillas - ver requests/sincronizacion.py
+# ===================================================================
+
+@login_required
+@role_required()
+@require_POST
+def sincronizar(request):
+    """ Aplica el lote de respuestas del dispositivo y devuelve los cambios del servidor. """
+    try:
+        datos = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': 'El cuerpo debe ser JSON válido.'}, status=400)
+    try:
+        resultado = sincronizar_lote(
+            request.user, request.role.group_id, datos,
+            lambda solicitud: _puede_adjuntar_multimedia(request, solicitud),
+        )
+    except ErrorSincronizacion as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(resultado)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SurveysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'surveys'
+
+    def ready(self):
+        # Registra los receptores que invalidan la caché de definiciones de encuesta
+        from . import signals  # noqa: F401
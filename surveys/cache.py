@@ -0,0 +1,110 @@
+# surveys/cache.py
+"""
+Caché de definiciones de encuesta (Encuesta + sus Preguntas activas en orden).
+
+Cada encuesta tiene un número de versión guardado en la caché de Django, que
+comparten todos los procesos. Las señales de surveys/signals.py lo cambian
+cuando se guarda o elimina la Encuesta o una de sus Preguntas. La definición
+se guarda bajo la clave (encuesta, versión) en dos niveles:
+
+1. Un LRU local por proceso, que evita deserializar en cada request.
+2. La caché de Django, para que un proceso aproveche lo que calculó otro.
+
+Una lectura consulta primero la versión vigente, así que nunca se sirve una
+definición vieja aunque siga en el LRU de otro proceso.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Encuesta, Pregunta
+
+ENCUESTAS_CACHE_SEGUNDOS = getattr(settings, 'ENCUESTAS_CACHE_SEGUNDOS', 3600)
+ENCUESTAS_CACHE_LOCAL = getattr(settings, 'ENCUESTAS_CACHE_LOCAL', 128)
+
+_local = OrderedDict()
+_bloqueo = threading.Lock()
+
+
+class DefinicionEncuesta:
+    """ Encuesta y sus preguntas activas, ordenadas como se muestran. """
+
+    def __init__(self, encuesta, preguntas):
+        self.encuesta = encuesta
+        self.preguntas = tuple(preguntas)
+        self.ids_preguntas = frozenset(pregunta.pk for pregunta in self.preguntas)
+
+
+def _clave_version(encuesta_id):
+    return f'surveys:encuesta:{encuesta_id}:version'
+
+
+def _version_inicial():
+    # Distinta en cada inicialización: si la caché pierde la versión no se reutiliza una antigua
+    return time.time_ns()
+
+
+def version_encuesta(encuesta_id):
+    clave = _clave_version(encuesta_id)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _version_inicial(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar_version(encuesta_id):
+    clave = _clave_version(encuesta_id)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La clave no existe (o expiró)
+        cache.set(clave, _version_inicial(), timeout=None)
+
+
+def invalidar_encuesta(encuesta_id):
+    """
+    Cambia la versión de la encuesta: las definiciones guardadas dejan de usarse.
+    Se cambia otra vez al confirmar la transacción, por si otro proceso guardó
+    la definición leyendo datos previos al commit.
+    """
+    _incrementar_version(encuesta_id)
+    transaction.on_commit(lambda: _incrementar_version(encuesta_id))
+
+
+def _cargar(encuesta_id):
+    encuesta = Encuesta.objects.select_related('id_departamento', 'id_tipo_encuesta').filter(pk=encuesta_id).first()
+    if encuesta is None:
+        return None
+    preguntas = Pregunta.objects.filter(id_encuesta_id=encuesta_id, state='Activo').order_by('created', 'id_pregunta')
+    return DefinicionEncuesta(encuesta, preguntas)
+
+
+def definicion_encuesta(encuesta_id):
+    """ DefinicionEncuesta vigente de la encuesta, o None si no existe. """
+    version = version_encuesta(encuesta_id)
+    clave_local = (encuesta_id, version)
+    with _bloqueo:
+        definicion = _local.get(clave_local)
+        if definicion is not None:
+            _local.move_to_end(clave_local)
+            return definicion
+
+    clave = f'surveys:encuesta:{encuesta_id}:{version}'
+    definicion = cache.get(clave)
+    if definicion is None:
+        definicion = _cargar(encuesta_id)
+        if definicion is None:
+            return None
+        cache.set(clave, definicion, ENCUESTAS_CACHE_SEGUNDOS)
+
+    with _bloqueo:
+        _local[clave_local] = definicion
+        _local.move_to_end(clave_local)
+        while len(_local) > ENCUESTAS_CACHE_LOCAL:
+            _local.popitem(last=False)
+    return definicion
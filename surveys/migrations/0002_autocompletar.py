@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+def normalizar_existentes(apps, schema_editor):
+    """ Completa los títulos de encuesta normalizados de las filas existentes. """
+    from core.texto import normalizar
+
+    Encuesta = apps.get_model('surveys', 'Encuesta')
+    filas = list(Encuesta.objects.only('pk', 'titulo'))
+    for fila in filas:
+        fila.titulo_normalizado = normalizar(fila.titulo)
+    Encuesta.objects.bulk_update(filas, ['titulo_normalizado'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encuesta',
+            name='titulo_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(normalizar_existentes, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from organization.models import Departamento
+from core.texto import NormalizadoMixin
 
 class TipoEncuesta(models.Model):
     id_tipo_encuesta = models.AutoField(primary_key=True)
@@ -12,11 +13,15 @@ class TipoEncuesta(models.Model):
     def __str__(self):
         return self.nombre_tipo
 
-class Encuesta(models.Model):
+class Encuesta(NormalizadoMixin, models.Model):
+    CAMPOS_NORMALIZADOS = {'titulo': 'titulo_normalizado'}
+
     id_encuesta = models.AutoField(primary_key=True)
     id_departamento = models.ForeignKey('organization.Departamento', on_delete=models.CASCADE)
     id_tipo_encuesta = models.ForeignKey('TipoEncuesta', on_delete=models.CASCADE)
     titulo = models.CharField(max_length=200)
+    # Para el autocompletado (ver core/autocompletar.py)
+    titulo_normalizado = models.CharField(max_length=200, default='', editable=False, db_index=True)
     descripcion = models.TextField()
     # Campos de auditoría
     state = models.CharField(max_length=20, default='Activo')
@@ -0,0 +1,37 @@
+# surveys/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidar_encuesta
+from organization.models import Departamento
+from .models import Encuesta, Pregunta, TipoEncuesta
+
+
+@receiver([post_save, post_delete], sender=Encuesta)
+def invalidar_definicion_encuesta(sender, instance, **kwargs):
+    invalidar_encuesta(instance.pk)
+
+
+@receiver(pre_save, sender=Pregunta)
+def encuesta_anterior_pregunta(sender, instance, **kwargs):
+    # Encuesta actual en la BD: si la pregunta se mueve, la anterior también cambia
+    instance._encuesta_anterior = None if instance._state.adding else (
+        sender.objects.filter(pk=instance.pk).values_list('id_encuesta_id', flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Pregunta)
+def invalidar_definicion_pregunta(sender, instance, **kwargs):
+    invalidar_encuesta(instance.id_encuesta_id)
+    anterior = getattr(instance, '_encuesta_anterior', None)
+    if anterior is not None and anterior != instance.id_encuesta_id:
+        invalidar_encuesta(anterior)
+
+
+@receiver(post_save, sender=Departamento)
+@receiver(post_save, sender=TipoEncuesta)
+def invalidar_definiciones_relacionadas(sender, instance, **kwargs):
+    """ La definición incluye el nombre del departamento y del tipo de encuesta. """
+    campo = 'id_departamento' if sender is Departamento else 'id_tipo_encuesta'
+    for encuesta_id in Encuesta.objects.filter(**{campo: instance.pk}).values_list('pk', flat=True):
+        invalidar_encuesta(encuesta_id)
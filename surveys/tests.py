@@ -1,3 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from organization.models import Direccion, Departamento
+from . import cache as cache_encuestas
+from .cache import definicion_encuesta
+from .models import TipoEncuesta, Encuesta, Pregunta
+
+
+class DefinicionEncuestaCacheTest(TestCase):
+    """ Caché versionada de encuesta + preguntas activas. """
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create_user('admin_test')
+        direccion = Direccion.objects.create(usuario=usuario, nombre_direccion='Obras')
+        departamento = Departamento.objects.create(id_direccion=direccion, usuario=usuario, nombre_departamento='Vialidad')
+        tipo = TipoEncuesta.objects.create(nombre_tipo='Reclamo')
+        cls.encuesta = Encuesta.objects.create(id_departamento=departamento, id_tipo_encuesta=tipo, titulo='Baches', descripcion='d')
+        cls.primera = Pregunta.objects.create(id_encuesta=cls.encuesta, texto_pregunta='¿Dónde?')
+        Pregunta.objects.create(id_encuesta=cls.encuesta, texto_pregunta='Eliminada', state='Inactivo')
+
+    def setUp(self):
+        # La caché sobrevive al rollback de cada test
+        cache.clear()
+        cache_encuestas._local.clear()
+
+    def test_sin_consultas_mientras_no_cambie(self):
+        definicion = definicion_encuesta(self.encuesta.pk)
+        self.assertEqual(list(definicion.preguntas), [self.primera])
+        with self.assertNumQueries(0):
+            self.assertIs(definicion_encuesta(self.encuesta.pk), definicion)
+            self.assertEqual(definicion.encuesta.id_departamento.nombre_departamento, 'Vialidad')
+
+    def test_guardar_o_eliminar_invalida(self):
+        definicion_encuesta(self.encuesta.pk)
+        segunda = Pregunta.objects.create(id_encuesta=self.encuesta, texto_pregunta='¿Cuándo?')
+        self.assertEqual(list(definicion_encuesta(self.encuesta.pk).preguntas), [self.primera, segunda])
+
+        self.primera.delete()
+        self.assertEqual(list(definicion_encuesta(self.encuesta.pk).preguntas), [segunda])
+
+        self.encuesta.titulo = 'Baches y veredas'
+        self.encuesta.save()
+        self.assertEqual(definicion_encuesta(self.encuesta.pk).encuesta.titulo, 'Baches y veredas')
+        self.assertIsNone(definicion_encuesta(0))
+
+    def test_mover_pregunta_invalida_ambas_encuestas(self):
+        otra = Encuesta.objects.create(
+            id_departamento=self.encuesta.id_departamento, id_tipo_encuesta=self.encuesta.id_tipo_encuesta, titulo='Veredas', descripcion='d'
+        )
+        definicion_encuesta(self.encuesta.pk)
+        definicion_encuesta(otra.pk)
+
+        self.primera.id_encuesta = otra
+        self.primera.save()
+        self.assertEqual(list(definicion_encuesta(self.encuesta.pk).preguntas), [])
+        self.assertEqual(list(definicion_encuesta(otra.pk).preguntas), [self.primera])
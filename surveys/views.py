@@ -1,41 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import Http404
 from .models import TipoEncuesta, Encuesta, Pregunta
+from .cache import definicion_encuesta
 from organization.models import Departamento
-from registration.models import Profile
+from core.roles import GRUPO_ADMIN, role_required
 
 # ===================================================================
 # CRUD para TIPO ENCUESTA
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)  # Solo administradores
 def main_tipo_encuesta(request):
     """Vista principal de tipos de encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        messages.error(request, 'Error de perfil de usuario')
-        return redirect('login')
-    
-    if profile.group_id == 1:  # Solo administradores
-        tipo_encuesta_listado = TipoEncuesta.objects.filter(state='Activo').order_by('nombre_tipo')
-        template_name = 'surveys/main_tipo_encuesta.html'
-        return render(request, template_name, {'tipo_encuesta_listado': tipo_encuesta_listado})
-    else:
-        return redirect('logout')
+    tipo_encuesta_listado = TipoEncuesta.objects.filter(state='Activo').order_by('nombre_tipo')
+    template_name = 'surveys/main_tipo_encuesta.html'
+    return render(request, template_name, {'tipo_encuesta_listado': tipo_encuesta_listado})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def tipo_encuesta_crear(request):
     """Vista para crear tipo de encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     if request.method == 'POST':
         nombre_tipo = request.POST.get('nombre_tipo')
         
@@ -52,16 +40,10 @@ def tipo_encuesta_crear(request):
     return render(request, template_name)
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def tipo_encuesta_editar(request, tipo_encuesta_id):
     """Vista para editar tipo de encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     tipo_encuesta = get_object_or_404(TipoEncuesta, id_tipo_encuesta=tipo_encuesta_id)
     
     if request.method == 'POST':
@@ -80,17 +62,11 @@ def tipo_encuesta_editar(request, tipo_encuesta_id):
     return render(request, template_name, {'tipo_encuesta': tipo_encuesta})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_tipo_encuesta', mensaje=None)
 def tipo_encuesta_eliminar(request, tipo_encuesta_id):
     """Vista para eliminar tipo de encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id == 1:
-        TipoEncuesta.objects.filter(id_tipo_encuesta=tipo_encuesta_id).delete()
-        messages.success(request, 'Tipo de encuesta eliminado exitosamente')
-    
+    TipoEncuesta.objects.filter(id_tipo_encuesta=tipo_encuesta_id).delete()
+    messages.success(request, 'Tipo de encuesta eliminado exitosamente')
     return redirect('main_tipo_encuesta')
 
 # ===================================================================
@@ -98,32 +74,18 @@ def tipo_encuesta_eliminar(request, tipo_encuesta_id):
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def main_encuesta(request):
     """Vista principal de encuestas"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        messages.error(request, 'Error de perfil de usuario')
-        return redirect('login')
-    
-    if profile.group_id == 1:
-        encuesta_listado = Encuesta.objects.filter(state='Activo').order_by('titulo')
-        template_name = 'surveys/main_encuesta.html'
-        return render(request, template_name, {'encuesta_listado': encuesta_listado})
-    else:
-        return redirect('logout')
+    encuesta_listado = Encuesta.objects.filter(state='Activo').order_by('titulo')
+    template_name = 'surveys/main_encuesta.html'
+    return render(request, template_name, {'encuesta_listado': encuesta_listado})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def encuesta_crear(request):
     """Vista para crear encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     if request.method == 'POST':
         titulo = request.POST.get('titulo')
         descripcion = request.POST.get('descripcion')
@@ -162,18 +124,16 @@ def encuesta_crear(request):
 
 # --- NUEVA VISTA ENCUESTA VER ---
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje='Acceso denegado.')
 def encuesta_ver(request, encuesta_id):
     """ Muestra los detalles de una Encuesta específica. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'Acceso denegado.')
-            return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
-
-    encuesta_data = get_object_or_404(Encuesta, pk=encuesta_id)
-    # Obtener las preguntas asociadas a esta encuesta
-    preguntas_asociadas = Pregunta.objects.filter(id_encuesta=encuesta_data, state='Activo')
+
+    # Encuesta y preguntas activas desde la caché de definiciones (ver surveys/cache.py)
+    definicion = definicion_encuesta(encuesta_id)
+    if definicion is None:
+        raise Http404('Encuesta no encontrada.')
+    encuesta_data = definicion.encuesta
+    preguntas_asociadas = definicion.preguntas
     
     template_name = 'surveys/encuesta_ver.html' # Necesitas crear este template
     return render(request, template_name, {
@@ -183,16 +143,10 @@ def encuesta_ver(request, encuesta_id):
 
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def encuesta_editar(request, encuesta_id):
     """Vista para editar encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     encuesta = get_object_or_404(Encuesta, id_encuesta=encuesta_id)
     
     if request.method == 'POST':
@@ -232,13 +186,9 @@ def encuesta_editar(request, encuesta_id):
 
 # --- NUEVA VISTA ENCUESTA BLOQUEAR ---
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def encuesta_bloquear(request, encuesta_id):
     """ Cambia el estado de una Encuesta a 'Bloqueado'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
-        
     encuesta_obj = get_object_or_404(Encuesta, pk=encuesta_id)
     encuesta_obj.state = 'Bloqueado'
     encuesta_obj.save()
@@ -247,12 +197,9 @@ def encuesta_bloquear(request, encuesta_id):
 
 # --- NUEVA VISTA ENCUESTA DESBLOQUEAR ---
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def encuesta_desbloquear(request, encuesta_id):
     """ Cambia el estado de una Encuesta a 'Activo'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('logout')
-    except Profile.DoesNotExist: return redirect('login')
 
     encuesta_obj = get_object_or_404(Encuesta, pk=encuesta_id)
     encuesta_obj.state = 'Activo'
@@ -264,14 +211,9 @@ def encuesta_desbloquear(request, encuesta_id):
 
 # --- NUEVA VISTA ENCUESTA LISTA BLOQUEADAS ---
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def encuesta_list_bloqueadas(request):
     """ Muestra la lista de Encuestas bloqueadas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     encuestas_bloqueadas = Encuesta.objects.filter(state='Bloqueado').order_by('titulo')
     return render(request, 'surveys/encuesta_list_bloqueadas.html', {'encuestas_bloqueadas': encuestas_bloqueadas}) # Necesitas crear este template
@@ -280,17 +222,11 @@ def encuesta_list_bloqueadas(request):
 
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_encuesta', mensaje=None)
 def encuesta_eliminar(request, encuesta_id):
     """Vista para eliminar encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id == 1:
-        Encuesta.objects.filter(id_encuesta=encuesta_id).delete()
-        messages.success(request, 'Encuesta eliminada exitosamente')
-    
+    Encuesta.objects.filter(id_encuesta=encuesta_id).delete()
+    messages.success(request, 'Encuesta eliminada exitosamente')
     return redirect('main_encuesta')
 
 # ===================================================================
@@ -298,36 +234,22 @@ def encuesta_eliminar(request, encuesta_id):
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def main_pregunta(request, encuesta_id):
     """Vista principal de preguntas de una encuesta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        messages.error(request, 'Error de perfil de usuario')
-        return redirect('login')
-    
-    if profile.group_id == 1:
-        encuesta = get_object_or_404(Encuesta, id_encuesta=encuesta_id)
-        pregunta_listado = Pregunta.objects.filter(id_encuesta=encuesta_id, state='Activo').order_by('created')
-        template_name = 'surveys/main_pregunta.html'
-        return render(request, template_name, {
-            'pregunta_listado': pregunta_listado,
-            'encuesta': encuesta
-        })
-    else:
-        return redirect('logout')
+    encuesta = get_object_or_404(Encuesta, id_encuesta=encuesta_id)
+    pregunta_listado = Pregunta.objects.filter(id_encuesta=encuesta_id, state='Activo').order_by('created')
+    template_name = 'surveys/main_pregunta.html'
+    return render(request, template_name, {
+        'pregunta_listado': pregunta_listado,
+        'encuesta': encuesta
+    })
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def pregunta_crear(request, encuesta_id):
     """Vista para crear pregunta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     encuesta = get_object_or_404(Encuesta, id_encuesta=encuesta_id)
     
     if request.method == 'POST':
@@ -349,16 +271,10 @@ def pregunta_crear(request, encuesta_id):
     return render(request, template_name, {'encuesta': encuesta})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='logout', mensaje=None)
 def pregunta_editar(request, pregunta_id):
     """Vista para editar pregunta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id != 1:
-        return redirect('logout')
-    
+
     pregunta = get_object_or_404(Pregunta, id_pregunta=pregunta_id)
     
     if request.method == 'POST':
@@ -377,18 +293,11 @@ def pregunta_editar(request, pregunta_id):
     return render(request, template_name, {'pregunta': pregunta})
 
 @login_required
+@role_required(GRUPO_ADMIN, redirect_url='main_encuesta', mensaje=None)
 def pregunta_eliminar(request, pregunta_id):
     """Vista para eliminar pregunta"""
-    try:
-        profile = Profile.objects.get(user_id=request.user.id)
-    except Profile.DoesNotExist:
-        return redirect('login')
-    
-    if profile.group_id == 1:
-        pregunta = get_object_or_404(Pregunta, id_pregunta=pregunta_id)
-        encuesta_id = pregunta.id_encuesta.id_encuesta
-        pregunta.delete()
-        messages.success(request, 'Pregunta eliminada exitosamente')
-        return redirect('main_pregunta', encuesta_id=encuesta_id)
-    
-    return redirect('main_encuesta')
\ No newline at end of file
+    pregunta = get_object_or_404(Pregunta, id_pregunta=pregunta_id)
+    encuesta_id = pregunta.id_encuesta_id
+    pregunta.delete()
+    messages.success(request, 'Pregunta eliminada exitosamente')
+    return redirect('main_pregunta', encuesta_id=encuesta_id)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # Registra el receptor que mantiene UsuarioBusqueda (autocompletado)
+        from . import signals  # noqa: F401
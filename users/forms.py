@@ -1,10 +1,12 @@
 # users/forms.py
 from django import forms
 from registration.models import Profile 
+from core.roles import invalidar_rol
 from django.contrib.auth.models import User, Group
 from .models import Cuadrilla 
 from organization.models import Departamento
 from django.contrib.auth.forms import UserCreationForm
+from core.widgets import AutocompleteSelect
 
 
 class UserProfileForm(forms.ModelForm):
@@ -55,6 +57,8 @@ class UserProfileForm(forms.ModelForm):
         profile.phone = self.cleaned_data['phone']
         if commit:
             profile.save()
+            # El grupo puede haber cambiado: descartar el rol cacheado del usuario
+            invalidar_rol(user.pk)
         return user
     
 class UserCreationAdminForm(UserCreationForm):
@@ -101,6 +105,7 @@ class UserCreationAdminForm(UserCreationForm):
             profile.phone = self.cleaned_data.get("phone")
             profile.group = self.cleaned_data["group"]
             profile.save()
+            invalidar_rol(user.pk)
         return user
 
 # --- Formulario para Crear/Editar Cuadrilla ---
@@ -110,14 +115,14 @@ class CuadrillaForm(forms.ModelForm):
         queryset=Departamento.objects.filter(state='Activo'), # Solo Departamentos activos
         label="Departamento al que Pertenece",
         empty_label="Seleccione un departamento",
-        widget=forms.Select(attrs={'class': 'form-select'}) # Estilo opcional
+        widget=AutocompleteSelect('departamentos', attrs={'class': 'form-select'}) # Busca al escribir
     )
     
     jefe = forms.ModelChoiceField(
         queryset=User.objects.filter(is_active=True, profile__group__name='Cuadrilla'), # Solo Users activos con rol 'Cuadrilla'
         label="Jefe de Cuadrilla",
         empty_label="Seleccione un jefe ",
-        widget=forms.Select(attrs={'class': 'form-select'}) # Estilo opcional
+        widget=AutocompleteSelect('jefes_cuadrilla', attrs={'class': 'form-select'}) # Busca al escribir
     )
 
     class Meta:
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalizar_existentes(apps, schema_editor):
+    """ Completa los nombres normalizados de cuadrillas y usuarios existentes. """
+    from core.texto import normalizar
+
+    Cuadrilla = apps.get_model('users', 'Cuadrilla')
+    cuadrillas = list(Cuadrilla.objects.only('pk', 'nombre_cuadrilla'))
+    for cuadrilla in cuadrillas:
+        cuadrilla.nombre_normalizado = normalizar(cuadrilla.nombre_cuadrilla)
+    Cuadrilla.objects.bulk_update(cuadrillas, ['nombre_normalizado'], batch_size=1000)
+
+    User = apps.get_model('auth', 'User')
+    UsuarioBusqueda = apps.get_model('users', 'UsuarioBusqueda')
+    UsuarioBusqueda.objects.bulk_create(
+        [
+            UsuarioBusqueda(
+                user_id=pk, nombre=normalizar(f'{nombre} {apellido}'.strip()), username=normalizar(username),
+            )
+            for pk, nombre, apellido, username in User.objects.values_list('pk', 'first_name', 'last_name', 'username')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_alter_cuadrilla_departamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsuarioBusqueda',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='nombre_busqueda', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('nombre', models.CharField(db_index=True, max_length=300)),
+                ('username', models.CharField(db_index=True, max_length=150)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cuadrilla',
+            name='nombre_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(normalizar_existentes, migrations.RunPython.noop),
+    ]
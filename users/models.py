@@ -3,9 +3,12 @@ from django.db import models
 from django.contrib.auth.models import User
 # Importar Departamento usando string para evitar importación circular
 from organization.models import Departamento 
+from core.texto import NormalizadoMixin
 
 # Modelo Cuadrilla (vinculado a Departamento y a un User como Jefe)
-class Cuadrilla(models.Model):
+class Cuadrilla(NormalizadoMixin, models.Model):
+    CAMPOS_NORMALIZADOS = {'nombre_cuadrilla': 'nombre_normalizado'}
+
     id_cuadrilla = models.AutoField(primary_key=True)
     nombre_cuadrilla = models.CharField(max_length=100, default='') 
     departamento = models.ForeignKey('organization.Departamento', on_delete=models.CASCADE, related_name='cuadrilla') 
@@ -22,6 +25,9 @@ class Cuadrilla(models.Model):
     )
     # --- FIN CAMBIOS ---
 
+    # Nombre sin tildes ni mayúsculas, indexado para el autocompletado (ver core/autocompletar.py)
+    nombre_normalizado = models.CharField(max_length=100, default='', editable=False, db_index=True)
+
     state = models.CharField(max_length=20, default='Activo')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -29,3 +35,13 @@ class Cuadrilla(models.Model):
     def __str__(self):
         dep_nombre = self.departamento.nombre_departamento if self.departamento else 'Sin Depto.'
         return f"{self.nombre_cuadrilla} ({dep_nombre})"
+
+
+class UsuarioBusqueda(models.Model):
+    """ Nombre y usuario normalizados de cada User, para el autocompletado. Se mantiene con users/signals.py. """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='nombre_busqueda')
+    nombre = models.CharField(max_length=300, db_index=True)  # "nombre apellido"
+    username = models.CharField(max_length=150, db_index=True)
+
+    def __str__(self):
+        return self.nombre or self.username
@@ -0,0 +1,26 @@
+# users/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.texto import normalizar
+from .models import UsuarioBusqueda
+
+
+# Campos de User que forman el texto buscable
+CAMPOS_BUSQUEDA = {'first_name', 'last_name', 'username'}
+
+
+@receiver(post_save, sender=User)
+def actualizar_usuario_busqueda(sender, instance, update_fields=None, **kwargs):
+    """ Mantiene el nombre normalizado del usuario para el autocompletado. """
+    # El login guarda solo 'last_login': no hay nada que reindexar
+    if update_fields is not None and not CAMPOS_BUSQUEDA.intersection(update_fields):
+        return
+    UsuarioBusqueda.objects.update_or_create(
+        user=instance,
+        defaults={
+            'nombre': normalizar(f'{instance.first_name} {instance.last_name}'.strip()),
+            'username': normalizar(instance.username),
+        },
+    )
@@ -3,6 +3,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User, Group
 from registration.models import Profile
+from core.roles import GRUPO_ADMIN, role_required
 # Importar los formularios de esta app
 from .forms import UserProfileForm, CuadrillaForm, UserCreationAdminForm
 from django.contrib import messages
@@ -19,16 +20,8 @@ from django import forms
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para gestionar usuarios.')
 def user_list(request):
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso para gestionar usuarios.')
-            return redirect('main_admin') 
-    except Profile.DoesNotExist:
-        messages.error(request, 'Tu perfil no está configurado.')
-        return redirect('logout')
-
     # --- INICIO DE CÁLCULOS PARA TARJETAS ---
     
     # 1. Lista de usuarios para la tabla (los activos)
@@ -59,16 +52,9 @@ def user_list(request):
     return render(request, 'users/user_list.html', context) # <-- Pasar el nuevo context
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def user_crear(request):
     """ Permite al Admin (SECPLA) crear un nuevo usuario y asignarle grupo, teléfono, etc. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1:  # Solo SECPLA/Admin
-            messages.error(request, "No tienes permiso para crear usuarios.")
-            return redirect('main_admin')
-    except Profile.DoesNotExist:
-        messages.error(request, "Tu perfil no está configurado.")
-        return redirect('logout')
 
     from .forms import UserCreationAdminForm
     if request.method == "POST":
@@ -85,14 +71,8 @@ def user_crear(request):
     return render(request, 'users/user_create_form.html', {'form': form})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def user_ver(request, user_id):
-    try:
-        admin_profile = Profile.objects.get(user=request.user)
-        if admin_profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
-
     user_data = get_object_or_404(User, pk=user_id)
     try:
         # Usamos select_related para traer el grupo en la misma consulta
@@ -105,16 +85,8 @@ def user_ver(request, user_id):
     return render(request, template_name, {'user_data': user_data, 'profile_data': profile_data})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para editar usuarios.')
 def user_edit(request, user_id):
-    try:
-        admin_profile = Profile.objects.get(user=request.user)
-        if admin_profile.group_id != 1:
-            messages.error(request, 'No tienes permiso para editar usuarios.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist:
-        messages.error(request, 'Tu perfil no está configurado.')
-        return redirect('logout')
-
     user_to_edit = get_object_or_404(User, pk=user_id)
 
     if request.method == 'POST':
@@ -155,12 +127,8 @@ def user_edit(request, user_id):
     return render(request, 'users/user_edit_form.html', {'form': form, 'user_to_edit': user_to_edit})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def user_bloquear(request, user_id):
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin') 
-    except Profile.DoesNotExist: return redirect('logout')
-
     user_to_block = get_object_or_404(User, pk=user_id)
     if user_to_block == request.user:
         messages.error(request, 'No puedes bloquear tu propia cuenta.')
@@ -172,24 +140,14 @@ def user_bloquear(request, user_id):
     return redirect('user_list')
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def user_list_bloqueados(request):
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
-
     users_bloqueados = User.objects.filter(is_active=False).order_by('username')
     return render(request, 'users/user_list_bloqueados.html', {'users_bloqueados': users_bloqueados})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def user_desbloquear(request, user_id):
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
-
     user_to_unblock = get_object_or_404(User, pk=user_id)
     user_to_unblock.is_active = True 
     user_to_unblock.save()
@@ -197,16 +155,8 @@ def user_desbloquear(request, user_id):
     return redirect('user_list_bloqueados')
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para eliminar usuarios.')
 def user_delete(request, user_id):
-    try:
-        admin_profile = Profile.objects.get(user=request.user)
-        if admin_profile.group_id != 1:
-            messages.error(request, 'No tienes permiso para eliminar usuarios.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist:
-        messages.error(request, 'Tu perfil no está configurado.')
-        return redirect('logout')
-
     user_to_delete = get_object_or_404(User, pk=user_id)
     if user_to_delete == request.user:
         messages.error(request, 'No puedes eliminar tu propia cuenta.')
@@ -222,25 +172,17 @@ def user_delete(request, user_id):
 # ===================================================================
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para ver cuadrillas.')
 def cuadrilla_list(request):
     """ Muestra la lista de Cuadrillas activas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: # Solo Admin/SECPLA
-            messages.error(request, 'No tienes permiso para ver cuadrillas.')
-            return redirect('main_admin') 
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrillas = Cuadrilla.objects.filter(state='Activo').order_by('nombre_cuadrilla')
     return render(request, 'users/cuadrilla_list.html', {'cuadrillas': cuadrillas})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def cuadrilla_crear(request):
     """ Muestra y procesa el formulario para crear una Cuadrilla. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
     
     if request.method == 'POST':
         form = CuadrillaForm(request.POST)
@@ -256,26 +198,18 @@ def cuadrilla_crear(request):
     return render(request, 'users/cuadrilla_form.html', {'form': form, 'titulo': 'Crear Nueva Cuadrilla'})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def cuadrilla_ver(request, cuadrilla_id):
     """ Muestra los detalles de una Cuadrilla específica. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: # Solo Admin/SECPLA
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrilla_data = get_object_or_404(Cuadrilla, pk=cuadrilla_id)
     template_name = 'users/cuadrilla_ver.html' 
     return render(request, template_name, {'cuadrilla_data': cuadrilla_data})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def cuadrilla_editar(request, cuadrilla_id):
     """ Muestra y procesa el formulario para editar una Cuadrilla. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
     
     cuadrilla = get_object_or_404(Cuadrilla, pk=cuadrilla_id)
     if request.method == 'POST':
@@ -292,12 +226,9 @@ def cuadrilla_editar(request, cuadrilla_id):
     return render(request, 'users/cuadrilla_form.html', {'form': form, 'titulo': 'Editar Cuadrilla', 'cuadrilla': cuadrilla})
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def cuadrilla_bloquear(request, cuadrilla_id):
     """ Cambia el estado de una Cuadrilla a 'Bloqueado'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin') 
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrilla_obj = get_object_or_404(Cuadrilla, pk=cuadrilla_id)
     cuadrilla_obj.state = 'Bloqueado'
@@ -307,26 +238,18 @@ def cuadrilla_bloquear(request, cuadrilla_id):
 
 # --- NUEVA VISTA CUADRILLA BLOQUEADAS ---
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso.')
 def cuadrilla_list_bloqueadas(request):
     """ Muestra la lista de Cuadrillas bloqueadas. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrillas_bloqueadas = Cuadrilla.objects.filter(state='Bloqueado').order_by('nombre_cuadrilla')
     return render(request, 'users/cuadrilla_list_bloqueadas.html', {'cuadrillas_bloqueadas': cuadrillas_bloqueadas})
 
 # --- NUEVA VISTA CUADRILLA DESBLOQUEAR ---
 @login_required
+@role_required(GRUPO_ADMIN, mensaje=None)
 def cuadrilla_desbloquear(request, cuadrilla_id):
     """ Cambia el estado de una Cuadrilla a 'Activo'. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrilla_obj = get_object_or_404(Cuadrilla, pk=cuadrilla_id)
     cuadrilla_obj.state = 'Activo'
@@ -336,14 +259,9 @@ def cuadrilla_desbloquear(request, cuadrilla_id):
     return redirect('cuadrilla_list_bloqueadas') # Vuelve a la lista de bloqueadas
 
 @login_required
+@role_required(GRUPO_ADMIN, mensaje='No tienes permiso para eliminar.')
 def cuadrilla_eliminar(request, cuadrilla_id):
     """ Elimina permanentemente una Cuadrilla. """
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.group_id != 1: 
-            messages.error(request, 'No tienes permiso para eliminar.')
-            return redirect('main_admin')
-    except Profile.DoesNotExist: return redirect('logout')
 
     cuadrilla_obj = get_object_or_404(Cuadrilla, pk=cuadrilla_id)
     nombre_cuadrilla = cuadrilla_obj.nombre_cuadrilla 